@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# name:    cxs_reader.py
+# author:  nbehrnd@yahoo.com
+# license: GPL version 2
+# date:    2026-10-16 (YYYY-MM-DD)
+#
+""" Indexed reader of the data sections in CrystalExplorer's .cxs files.
+
+A .cxs file organizes its content in blocks opened by a line in pattern of
+'begin <section> <count>' and closed by 'end <section>'.  Already one
+Hirshfeld surface computed at very high resolution spans about 550k lines;
+yet the normalization of a 2D fingerprint requires only four of them:
+
++ vertices: Cartesian coordinates, three floats per row,
++ indices:  the (0-based) vertices of a surface triangle, three integers,
++ d_i:      distance of a vertex to the closest atom inside the surface,
++ d_e:      distance of a vertex to the closest atom outside the surface.
+
+Instead of collecting the file's content as a list of strings, the file is
+memory-mapped.  One pass over the map records for each block the byte
+offsets of its body; blocks with a count (e.g., 'begin vertices 35792')
+are skipped as a whole, container blocks (e.g., 'begin surface') are
+entered.  Only the sections a caller asks for are decoded, each into one
+typed array (module array of the Python standard library) sized by the
+count declared.  Rows of more than one column are stored flat (e.g., x_0,
+y_0, z_0, x_1, ...).  Text columns, like the element symbols of the atoms
+in 'unit_cell', are kept as bytes (see TEXT_COLUMNS).  If a section name
+occurs more than once, the first occurrence is used, as fingerprint.f90
+does.
+
+Like its callers, this module only uses Python's standard library. """
+
+import array
+import mmap
+
+# typecode and number of columns per row of the sections understood:
+SECTION_LAYOUT = {
+    "vertices": ("d", 3),
+    "indices": ("i", 3),
+    "vertex_normals": ("d", 3),
+    "d_i": ("d", 1),
+    "d_e": ("d", 1),
+    "d_norm_i": ("d", 1),
+    "d_norm_e": ("d", 1),
+    "d_norm": ("d", 1),
+    "shape_index": ("d", 1),
+    "curvedness": ("d", 1),
+    "atoms_inside_surface": ("i", 4),
+    "atoms_outside_surface": ("i", 4),
+    "d_i_face_atoms": ("i", 1),
+    "d_e_face_atoms": ("i", 1),
+}
+
+# sections derived from one text column of an other section, stored as
+# the bytes of the column's entries joined by blanks:
+TEXT_COLUMNS = {
+    "unit_cell_elements": ("unit_cell", 1),
+}
+
+FINGERPRINT_SECTIONS = ("vertices", "indices", "d_i", "d_e")
+DECOMPOSITION_SECTIONS = ("unit_cell_elements", "atoms_inside_surface",
+                          "atoms_outside_surface", "d_i_face_atoms",
+                          "d_e_face_atoms")
+PROPERTY_SECTIONS = ("d_norm", "shape_index", "curvedness")
+
+
+def _convert(typecode):
+    """ Map the typecode of an array to the conversion of a token. """
+    if typecode in ("d", "f"):
+        return float
+    return int
+
+
+def _find_end(buffer, name, position):
+    """ Locate the line 'end <name>' after position; return its offset. """
+    marker = b"\nend " + name
+    while True:
+        found = buffer.find(marker, position)
+        if found == -1:
+            return -1
+        following = buffer[found + len(marker):found + len(marker) + 1]
+        if following in (b"", b" ", b"\t", b"\r", b"\n"):
+            return found + 1
+        position = found + len(marker)
+
+
+def index_sections(buffer):
+    """ Map section name -> (count, first byte, end byte) of its body.
+
+    The count is None for container blocks like 'begin surface' or for
+    blocks labeled by a name instead of a count (e.g., 'begin CIF'). """
+    index = {}
+    position = 0
+    while True:
+        start = buffer.find(b"begin ", position)
+        if start == -1:
+            break
+        line_end = buffer.find(b"\n", start)
+        if line_end == -1:
+            line_end = len(buffer)
+        if start > 0 and buffer[start - 1:start] != b"\n":
+            position = line_end  # 'begin' not at the start of a line
+            continue
+
+        fields = buffer[start:line_end].split()
+        position = line_end
+        if len(fields) < 2:
+            continue
+        name = fields[1]
+        count = None
+        if len(fields) > 2 and fields[2].isdigit():
+            count = int(fields[2])
+
+        end = _find_end(buffer, name, line_end)
+        if end == -1:
+            continue  # unterminated block, likely a truncated file
+        index.setdefault(name.decode(), (count, line_end + 1, end))
+
+        if count is not None:
+            position = end  # skip the data rows as a whole
+    return index
+
+
+class CxsFile():
+    """ A memory-mapped .cxs file with its index of sections. """
+
+    def __init__(self, cxs_file):
+        """ Map the file and index its sections. """
+        self.cxs_file = cxs_file
+        self._source = open(cxs_file, mode="rb")
+        try:
+            self._buffer = mmap.mmap(self._source.fileno(), 0,
+                                     access=mmap.ACCESS_READ)
+        except ValueError:
+            self._source.close()
+            raise ValueError("File {} is empty.".format(cxs_file))
+        self.index = index_sections(self._buffer)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """ Release the map and the file handle. """
+        self._buffer.close()
+        self._source.close()
+
+    def count(self, name):
+        """ Report the number of rows declared for a section. """
+        return self.index[name][0]
+
+    def read(self, name):
+        """ Decode one section into a typed array. """
+        if name in TEXT_COLUMNS:
+            return self._read_column(*TEXT_COLUMNS[name])
+        if name not in self.index:
+            raise ValueError("Section '{}' is missing in {}.".format(
+                name, self.cxs_file))
+        count, start, end = self.index[name]
+        typecode, width = SECTION_LAYOUT[name]
+        values = array.array(
+            typecode, map(_convert(typecode), self._buffer[start:end].split()))
+        if len(values) != count * width:
+            raise ValueError("Section '{}' in {} is incomplete.".format(
+                name, self.cxs_file))
+        return values
+
+    def _read_column(self, section, column):
+        """ Collect one text column of a section, e.g. the elements. """
+        if section not in self.index:
+            raise ValueError("Section '{}' is missing in {}.".format(
+                section, self.cxs_file))
+        count, start, end = self.index[section]
+        entries = [
+            row.split()[column]
+            for row in self._buffer[start:end].splitlines() if row.strip()
+        ]
+        if len(entries) != count:
+            raise ValueError("Section '{}' in {} is incomplete.".format(
+                section, self.cxs_file))
+        return array.array("B", b" ".join(entries))
+
+
+def text_entries(values):
+    """ Decode a section of TEXT_COLUMNS into a list of strings. """
+    return values.tobytes().decode().split()
+
+
+def read_cxs(cxs_file, sections=FINGERPRINT_SECTIONS):
+    """ Read the sections requested of a .cxs file into typed arrays.
+
+    Returns a dictionary section name -> array.  A section requested, but
+    missing in the file, or a section shorter than its declared count
+    raises a ValueError. """
+    with CxsFile(cxs_file) as surface:
+        return dict((name, surface.read(name)) for name in sections)
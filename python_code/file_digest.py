@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+# name:    file_digest.py
+# author:  nbehrnd@yahoo.com
+# license: GPL version 2
+# date:    2026-10-16 (YYYY-MM-DD)
+#
+""" Identify files by their content, and notice when they change.
+
+The cache of parsed .cxs (surface_cache.py), the cache of rendered images
+(render_cache.py) and the .fpb written by fingerprint_kahan.py identify a
+file by the SHA-256 hash of its content.  Hashing a file of several MB on
+each run is avoided by a stamp of its size and modification time: a hash
+recorded together with a stamp remains valid as long as the stamp is the
+same.
+
+This module only uses Python's standard library. """
+
+import hashlib
+import os
+
+
+def content_hash(file_name):
+    """ Compute the SHA-256 hex digest of a file's content. """
+    digest = hashlib.sha256()
+    with open(file_name, mode="rb") as source:
+        for chunk in iter(lambda: source.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def stamp(file_name):
+    """ Report size and modification time (in microseconds) of a file. """
+    status = os.stat(file_name)
+    return [status.st_size, int(status.st_mtime * 1e6)]
@@ -0,0 +1,460 @@
+#!/usr/bin/env python
+# name:    fingerprint_engine.py
+# author:  nbehrnd@yahoo.com
+# license: GPL version 2
+# date:    2026-10-16 (YYYY-MM-DD)
+#
+""" Array-based computations shared by the fingerprint_*.py scripts.
+
+The triangle areas of a Hirshfeld surface are computed in passes over
+the flat typed arrays of cxs_reader.py rather than triangle by triangle
+in the reader of the .cxs.  In a first pass, the side lengths of each
+triangle ABC are computed
+
++ l1 = |AB|, l2 = |AC|, l3 = |BC|, and the scalar product AB . AC,
+
+following the labels used by fingerprint.f90.  As in fingerprint.f90, a
+triangle with any side shorter than 1e-5 A is considered degenerate; its
+area is set to zero.  In a second pass, the area is computed by one of the
+following methods:
+
++ kahan:  Kahan's formula working equally well on needle-like triangles
+          (see fingerprint_kahan.py, the default),
++ heron:  Heron's formula based on the semi-perimeter
+          (see fingerprint_heron.py),
++ rr:     the cosine approach by Andrew Rohl and Paolo Raiteri, i.e.
+          area = 0.5 * l1 * l2 * sin(theta) (see fingerprint.f90 and
+          fingerprint_rr.py).
+
+The areas then are tallied into a dense square grid of (d_i, d_e) bins by
+index arithmetic, the same way fingerprint.f90 fills its array dist(idi,
+ide).  By default, the grid spans the extended map range 0.40(0.01)3.00
+A; class Grid allows other ranges and bin widths (e.g., a coarse 0.05 A
+screening of a large library).  The tally is one flat array of nbin *
+nbin floats with d_i as the slow and d_e as the fast running index; this
+equally is the order of lines in the .dat files.  Contrasting to
+fingerprint.f90 truncating the bin index, the Python scripts assign a
+triangle to the nearest grid point (e.g., d_i = 0.4049 A to 0.40 A).  On
+grids of 0.01 A (or any other power of ten) this is done as by the
+original scripts, rounding d_i and d_e to the decimals of the labels
+(e.g., "{:3.2f}"); on other grids (e.g., 0.05 A), the grid point nearest
+to the raw value is taken, rounding once.
+
+For a decomposition by element pairs (e.g., O...H contacts), each triangle
+is labeled by the elements of the atoms closest to it inside and outside
+the surface (face_pairs); the same pass tallying the map then sums the
+areas per label into maps of their own (bin_areas_by_label).
+
+Other properties of the vertices (d_norm, shape index, curvedness) may be
+averaged per triangle like d_i and d_e, and their area-weighted
+histograms tallied in one pass over the triangles (property_histograms).
+
+Once computed, a map may be cut to a sub-range, or summed up into a grid
+of an integer multiple of its bin width (crop, rebin, pyramid) without
+reading the .cxs again.
+
+This module only uses Python's standard library.  Thus, rather than with
+numpy arrays, each pass is a loop of Python over the arrays (map, zip,
+list comprehensions); these are not vectorized, but avoid the attribute
+lookups and intermediate lists of the original scripts.  For BZAMID01
+(73,332 triangles, CPython 3.11), triangle_areas takes 0.105 s (kahan), or
+0.086 s (heron, rr), of which the side lengths take 0.065 s; areas and
+the averages of d_i and d_e take 0.14 s, compared to 0.50 s by the
+triangle loop of the original fingerprint_kahan.py.  Running the scripts
+with pypy, which compiles these loops, is faster still. """
+
+import array
+import functools
+import math
+
+MIN_SIDE = 1e-5  # shortest triangle side accepted, as in fingerprint.f90
+PYRAMID_LEVELS = 3  # i.e., 0.01 -> 0.02 -> 0.04 -> 0.08 A
+
+
+class Grid():
+    """ A square grid of (d_i, d_e) bins, xmin(dx)xmax in A for both. """
+
+    def __init__(self, xmin=0.40, xmax=3.00, dx=0.01):
+        """ Define the grid; xmax is lowered to the last full bin. """
+        if dx <= 0 or xmax <= xmin:
+            raise ValueError(
+                "A grid needs xmin < xmax and a positive bin width.")
+        self.xmin = float(xmin)
+        self.dx = float(dx)
+        self.nbin = int(math.floor((xmax - xmin) / dx + 1e-9)) + 1
+        self.xmax = self.xmin + self.dx * (self.nbin - 1)
+        self.digits = decimals(self.dx)
+
+    def __eq__(self, other):
+        return isinstance(other, Grid) and (self.nbin == other.nbin) and (
+            abs(self.xmin - other.xmin) < 1e-9) and (abs(self.dx - other.dx) <
+                                                     1e-9)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "Grid({}, {}, {})".format(self.label(0),
+                                         self.label(self.nbin - 1),
+                                         self.dx)
+
+    def label(self, index):
+        """ Format the coordinate of a bin as written into .dat files. """
+        return "{:.{}f}".format(self.xmin + self.dx * index, self.digits)
+
+    def labels(self):
+        """ Report the labels of all bins along one axis. """
+        return [self.label(index) for index in range(self.nbin)]
+
+    def indices(self, lower, upper):
+        """ Convert a range lower...upper in A into bin indices first:last.
+
+        Bins whose coordinate (label) is within the range are included;
+        the range is clipped to the grid. """
+        first = int(math.ceil((lower - self.xmin) / self.dx - 1e-6))
+        last = int(math.floor((upper - self.xmin) / self.dx + 1e-6)) + 1
+        return max(first, 0), min(max(last, 0), self.nbin)
+
+
+def decimals(dx):
+    """ Report the number of decimals needed to label a grid of width dx. """
+    for digits in range(2, 10):
+        if abs(round(dx, digits) - dx) < 1e-12:
+            return digits
+    return 10
+
+
+# The map ranges known to fingerprint.f90, each at 0.01 A:
+MAP_RANGES = {
+    "standard": Grid(0.40, 2.60, 0.01),
+    "translated": Grid(0.80, 3.00, 0.01),
+    "extended": Grid(0.40, 3.00, 0.01),
+}
+EXTENDED = MAP_RANGES["extended"]
+
+# Axes of the histograms of vertex properties (see property_histograms):
+PROPERTY_AXES = {
+    "d_norm": Grid(-1.00, 2.00, 0.01),
+    "shape_index": Grid(-1.00, 1.00, 0.01),
+    "curvedness": Grid(-4.00, 1.00, 0.01),
+}
+
+
+def _snapper(grid):
+    """ Report the function applied to values prior to binning them.
+
+    If dx is a power of ten, values are rounded to the decimals of the
+    labels, as the original scripts do; else, they are binned as such. """
+    if abs(grid.dx - 10.0**-grid.digits) < 1e-12:
+        return functools.partial(round, ndigits=grid.digits)
+    return float
+
+
+def triangle_sides(vertices, indices):
+    """ Report side lengths l1, l2, l3 and AB . AC of all triangles. """
+    xs, ys, zs = vertices[0::3], vertices[1::3], vertices[2::3]
+    sqrt = math.sqrt
+    side_1 = array.array("d")
+    side_2 = array.array("d")
+    side_3 = array.array("d")
+    products = array.array("d")
+
+    for index_A, index_B, index_C in zip(indices[0::3], indices[1::3],
+                                         indices[2::3]):
+        x_A, y_A, z_A = xs[index_A], ys[index_A], zs[index_A]
+        # vectors AB (v1), AC (v2) and BC (v3):
+        x_1, y_1, z_1 = xs[index_B] - x_A, ys[index_B] - y_A, zs[index_B] - z_A
+        x_2, y_2, z_2 = xs[index_C] - x_A, ys[index_C] - y_A, zs[index_C] - z_A
+        x_3, y_3, z_3 = x_2 - x_1, y_2 - y_1, z_2 - z_1
+
+        side_1.append(sqrt(x_1 * x_1 + y_1 * y_1 + z_1 * z_1))
+        side_2.append(sqrt(x_2 * x_2 + y_2 * y_2 + z_2 * z_2))
+        side_3.append(sqrt(x_3 * x_3 + y_3 * y_3 + z_3 * z_3))
+        products.append(x_1 * x_2 + y_1 * y_2 + z_1 * z_2)
+    return side_1, side_2, side_3, products
+
+
+def _kahan_area(l1, l2, l3, _):
+    """ Kahan's formula with sides sorted such that a >= b >= c. """
+    c, b, a = sorted((l1, l2, l3))
+    condition = c - (a - b)
+    if condition < 0:
+        return 0.0  # 'not side-lengths of a real triangle'
+    return 0.25 * math.sqrt(
+        (a + (b + c)) * condition * (c + (a - b)) * (a + (b - c)))
+
+
+def _heron_area(l1, l2, l3, _):
+    """ Heron's formula with the semi-perimeter s. """
+    s = (l1 + l2 + l3) * 0.5
+    product = s * (s - l1) * (s - l2) * (s - l3)
+    if product <= 0:
+        return 0.0
+    return math.sqrt(product)
+
+
+def _cosine_area(l1, l2, _, product):
+    """ The approach by fingerprint.f90, with angle theta between AB, AC. """
+    cost = product / l1 / l2
+    sint = 1.0 - cost**2
+    if sint > 1.0:
+        sint = 1.0
+    if sint < 0.0:
+        sint = 0.0
+    return 0.5 * l1 * l2 * math.sqrt(sint)
+
+
+AREA_METHODS = {
+    "kahan": _kahan_area,
+    "heron": _heron_area,
+    "rr": _cosine_area,
+}
+
+
+def triangle_areas(vertices, indices, method="kahan"):
+    """ Compute the area of all triangles by the method selected.
+
+    This is one loop of Python over the side lengths, not a vectorized
+    computation (see the timings in the docstring of this module). """
+    try:
+        formula = AREA_METHODS[method]
+    except KeyError:
+        raise ValueError("Unknown area method '{}', use one of {}.".format(
+            method, ", ".join(sorted(AREA_METHODS))))
+
+    def guarded(l1, l2, l3, product):
+        if (l1 < MIN_SIDE) or (l2 < MIN_SIDE) or (l3 < MIN_SIDE):
+            return 0.0
+        return formula(l1, l2, l3, product)
+
+    return array.array("d", map(guarded,
+                                *triangle_sides(vertices, indices)))
+
+
+def triangle_means(values, indices):
+    """ Average a property per vertex (e.g., d_i) over each triangle. """
+    return array.array(
+        "d", [(values[index_A] + values[index_B] + values[index_C]) / 3.0
+              for index_A, index_B, index_C in zip(
+                  indices[0::3], indices[1::3], indices[2::3])])
+
+
+def bin_areas(average_di, average_de, areas, grid=EXTENDED):
+    """ Tally triangle areas into a flat nbin x nbin array of (d_i, d_e).
+
+    Triangles outside the grid are not considered. """
+    xmin, dx, nbin, snap = grid.xmin, grid.dx, grid.nbin, _snapper(grid)
+    tally = array.array("d", bytes(8 * nbin * nbin))
+    for di, de, area in zip(average_di, average_de, areas):
+        idi = int(round((snap(di) - xmin) / dx))
+        ide = int(round((snap(de) - xmin) / dx))
+        if (0 <= idi < nbin) and (0 <= ide < nbin):
+            tally[idi * nbin + ide] += area
+    return tally
+
+
+def face_pairs(elements, atoms_inside, atoms_outside, di_face_atoms,
+               de_face_atoms):
+    """ Label each triangle by the pair of elements closest to it.
+
+    The atoms inside and outside the surface are rows of a (1-based)
+    index into the list of elements and a cell translation; the face
+    atoms are (1-based) indices into these rows, one per triangle.
+    Report an array of label indices, and the labels like 'O...H' (inside
+    ... outside) in order of their first occurrence. """
+    inside = [elements[atom - 1] for atom in atoms_inside[0::4]]
+    outside = [elements[atom - 1] for atom in atoms_outside[0::4]]
+    known = {}
+    labels = array.array("i")
+    for atom_i, atom_e in zip(di_face_atoms, de_face_atoms):
+        pair = "{}...{}".format(inside[atom_i - 1], outside[atom_e - 1])
+        labels.append(known.setdefault(pair, len(known)))
+    return labels, sorted(known, key=known.__getitem__)
+
+
+def bin_areas_by_label(average_di, average_de, areas, labels, count,
+                       grid=EXTENDED):
+    """ Tally triangle areas like bin_areas, and per label in one pass.
+
+    Labels are integers 0...count - 1 (see face_pairs).  Report the flat
+    map of all triangles and the list of count maps, one per label; the
+    latter sum up to the former. """
+    xmin, dx, nbin, snap = grid.xmin, grid.dx, grid.nbin, _snapper(grid)
+    tally = array.array("d", bytes(8 * nbin * nbin))
+    tallies = [array.array("d", bytes(8 * nbin * nbin)) for _ in range(count)]
+    for di, de, area, label in zip(average_di, average_de, areas, labels):
+        idi = int(round((snap(di) - xmin) / dx))
+        ide = int(round((snap(de) - xmin) / dx))
+        if (0 <= idi < nbin) and (0 <= ide < nbin):
+            tally[idi * nbin + ide] += area
+            tallies[label][idi * nbin + ide] += area
+    return tally, tallies
+
+
+def property_histograms(properties, areas, axes=PROPERTY_AXES):
+    """ Tally triangle areas by their mean of properties, in one pass.
+
+    Properties maps a name (e.g., "d_norm") to the means per triangle
+    (see triangle_means).  Report name -> (histogram along its axis,
+    area-weighted mean over all triangles); triangles beyond the axis are
+    not binned, yet contribute to the mean. """
+    names = sorted(properties)
+    histograms = [array.array("d", bytes(8 * axes[name].nbin))
+                  for name in names]
+    scales = [(axes[name].xmin, axes[name].dx, axes[name].nbin,
+               _snapper(axes[name])) for name in names]
+    sums = [0.0] * len(names)
+    total = 0.0
+    columns = [properties[name] for name in names]
+    for area, values in zip(areas, zip(*columns)):
+        total += area
+        for k, value in enumerate(values):
+            sums[k] += area * value
+            xmin, dx, nbin, snap = scales[k]
+            index = int(round((snap(value) - xmin) / dx))
+            if 0 <= index < nbin:
+                histograms[k][index] += area
+    return dict(
+        (name, (histogram, weighted / total if total > 0.0 else 0.0))
+        for name, histogram, weighted in zip(names, histograms, sums))
+
+
+def normalize(grid):
+    """ Scale a grid such that its entries sum up to 100 (percent). """
+    total = sum(grid)
+    if total <= 0.0:
+        return array.array("d", grid)
+    factor = 100.0 / total
+    return array.array("d", [value * factor for value in grid])
+
+
+def difference_summary(difference):
+    """ Characterize a difference map in one pass over its bins.
+
+    Report the difference number (the sum of absolute differences), the
+    sums of the positive and of the negative differences, and the largest
+    absolute difference. """
+    positive = 0.0
+    negative = 0.0
+    largest = 0.0
+    for value in difference:
+        if value > 0.0:
+            positive += value
+            if value > largest:
+                largest = value
+        elif value < 0.0:
+            negative += value
+            if -value > largest:
+                largest = -value
+    return positive - negative, positive, negative, largest
+
+
+def block_sums(values, nbin, factor):
+    """ Sum a flat nbin x nbin map over blocks of factor x factor bins.
+
+    Report the coarse flat map and its number of bins per side; blocks at
+    the upper edges may be smaller.  As |sum(a - b)| <= sum(|a - b|), the
+    L1 distance of two coarse maps is a lower bound of the one of the
+    maps they derive from. """
+    coarse_nbin = (nbin + factor - 1) // factor
+    coarse = array.array("d", bytes(8 * coarse_nbin * coarse_nbin))
+    for idi in range(nbin):
+        row = values[idi * nbin:(idi + 1) * nbin]
+        offset = (idi // factor) * coarse_nbin
+        for column in range(coarse_nbin):
+            coarse[offset + column] += sum(
+                row[column * factor:(column + 1) * factor])
+    return coarse, coarse_nbin
+
+
+def pyramid(values, nbin, levels=PYRAMID_LEVELS):
+    """ Coarsen a flat map repeatedly by summing 2 x 2 bins.
+
+    Report a list of (coarse map, nbin), finest level first; on the
+    extended grid, this are bins of 0.02, 0.04 and 0.08 A.  Each level
+    sums up to the same total as the map; the L1 distance of two maps on
+    a coarse level is a lower bound of the one on a finer level. """
+    levels_computed = []
+    for _ in range(levels):
+        values, nbin = block_sums(values, nbin, 2)
+        levels_computed.append((values, nbin))
+    return levels_computed
+
+
+def crop(values, grid, xmin, xmax):
+    """ Cut the bins of xmin...xmax in A (for d_i and d_e) out of a map.
+
+    Report the grid of the sub-range and its flat map.  The values are
+    not normalized again (see normalize). """
+    first, last = grid.indices(xmin, xmax)
+    if last <= first:
+        raise ValueError("{}...{} A is outside of {}.".format(
+            xmin, xmax, grid))
+    nbin = grid.nbin
+    sub_grid = Grid(grid.xmin + grid.dx * first,
+                    grid.xmin + grid.dx * (last - 1), grid.dx)
+    cropped = array.array("d")
+    for idi in range(first, last):
+        cropped.extend(values[idi * nbin + first:idi * nbin + last])
+    return sub_grid, cropped
+
+
+def _coarse_shares(nbin, factor, first, coarse_nbin):
+    """ Assign each fine bin of an axis to the coarse bins nearest to it.
+
+    Coarse bin j is centered on fine bin first + j * factor.  With an even
+    factor, a fine bin on the border of two coarse bins is shared half and
+    half.  Report per fine bin a list of (coarse bin, weight). """
+    shares = []
+    for index in range(nbin):
+        coarse, rest = divmod(index - first, factor)
+        if 2 * rest < factor:
+            candidates = [(coarse, 1.0)]
+        elif 2 * rest == factor:
+            candidates = [(coarse, 0.5), (coarse + 1, 0.5)]
+        else:
+            candidates = [(coarse + 1, 1.0)]
+        shares.append([(j, weight) for j, weight in candidates
+                       if 0 <= j < coarse_nbin])
+    return shares
+
+
+def rebin(values, grid, factor, xmin=None, xmax=None):
+    """ Sum up the bins of a map into a grid of factor times their width.
+
+    The coarse grid spans xmin...xmax in A (by default, the range of the
+    map); xmin needs to be a bin of the map.  As in bin_areas, a coarse
+    bin collects the area nearest to its grid point, i.e. within half a
+    coarse bin width: for an odd factor, factor x factor fine bins; for an
+    even one, the fine bins on its borders are shared with the neighbours
+    half and half.  Thus, the coarse map matches (for an odd factor
+    exactly) the one binned from the .cxs on the coarse grid, apart from
+    the area beyond the fine map at its edges.  Report the coarse grid and
+    map. """
+    if int(factor) != factor or factor < 1:
+        raise ValueError("Rebinning needs a positive integer factor.")
+    factor = int(factor)
+    xmin = grid.xmin if xmin is None else xmin
+    xmax = grid.xmax if xmax is None else xmax
+    first = (xmin - grid.xmin) / grid.dx
+    if abs(first - round(first)) > 1e-6:
+        raise ValueError("{} A is not a bin of {}.".format(xmin, grid))
+    coarse_grid = Grid(xmin, xmax, grid.dx * factor)
+    nbin, coarse_nbin = grid.nbin, coarse_grid.nbin
+    shares = _coarse_shares(nbin, factor, int(round(first)), coarse_nbin)
+
+    coarse = array.array("d", bytes(8 * coarse_nbin * coarse_nbin))
+    for idi in range(nbin):
+        if not shares[idi]:
+            continue
+        # sum up the row along d_e first, then spread it along d_i:
+        columns = [0.0] * coarse_nbin
+        for ide, value in enumerate(values[idi * nbin:(idi + 1) * nbin]):
+            if value:
+                for j, weight in shares[ide]:
+                    columns[j] += weight * value
+        for i, weight in shares[idi]:
+            offset = i * coarse_nbin
+            for j, value in enumerate(columns):
+                coarse[offset + j] += weight * value
+    return coarse_grid, coarse
@@ -0,0 +1,498 @@
+#!/usr/bin/env python
+# name:    fingerprint_io.py
+# author:  nbehrnd@yahoo.com
+# license: GPL version 2
+# date:    2026-10-16 (YYYY-MM-DD)
+#
+""" Read and write normalized 2D fingerprints and difference maps.
+
+Three formats are understood:
+
++ .dat, the dense format of fingerprint.f90 and fingerprint_kahan.py, one
+  line 'd_i d_e value' per bin of the grid (blank lines between the blocks
+  of constant d_i are optional).  The grid is recognized by the labels.
++ .sdat, a sparse format listing only the bins with a non-zero value.  The
+  grid is defined by a leading comment line, e.g.
+
+  # grid xmin=0.40 xmax=3.00 dx=0.01
+  0.52 1.31 0.00123456
+  ...
+
+  Typically, a normalized fingerprint populates a few thousand out of
+  68,121 bins of the extended map range.  As gnuplot skips the comment,
+  .sdat files can be plotted like .dat files.
+
++ .fpb, a binary format of a single buffer.  A header of fixed size
+  (struct BINARY_HEADER) records the grid (xmin, dx, nbin), the name of
+  the map range ("standard", "translated", "extended", or "custom"), the
+  total surface area of the triangles binned, the area method, and the
+  SHA-256 hash of the source .cxs.  It is followed by the nbin * nbin
+  values as little-endian float64 in the order of the .dat lines.
+  Loading such a fingerprint is one read instead of 68k line parses.
+  Since version 2, the matrix may be followed by a pyramid of coarsened
+  maps (bins of 0.02, 0.04, 0.08 A for the default grid, see
+  fingerprint_engine.pyramid) to screen for similar fingerprints.
+  Other than .dat and .sdat, gnuplot can not plot a .fpb itself; the
+  moderator reads it here and pipes the map to gnuplot as a datablock
+  (see gnuplot_session.py).
+
+Histograms of other properties of the surface (e.g., d_norm) are written
+as plain two-column text, one line 'value share' per bin.
+
+In memory, a sparse map is a dictionary flat bin index -> value on a
+fingerprint_engine.Grid; with d_i as the slow, and d_e as the fast running
+index, bin (idi, ide) is index idi * nbin + ide.  Difference maps of two
+sparse maps and their difference number thus only visit the bins populated
+in either of them; pairs of .sdat are compared this way.  Other pairs are
+compared on a FingerprintStack of dense arrays, as are the library, the
+region sums and the plots, which expand a .sdat on reading.
+
+A FingerprintStack compared by a pool of processes (fingerprint_pairs.py)
+may be placed into shared memory right away; its values then are a view
+of the block of shared memory rather than an array of its own, and each
+map read is copied once into its row.
+
+This module only uses Python's standard library (multiprocessing.
+shared_memory requires Python 3.8, or later). """
+
+import array
+import operator
+import struct
+import sys
+from multiprocessing import shared_memory
+
+import fingerprint_engine
+
+DAT_SUFFIX = ".dat"
+SPARSE_SUFFIX = ".sdat"
+BINARY_SUFFIX = ".fpb"
+# the suffixes of maps, in order of preference if a map exists in several:
+MAP_SUFFIXES = (BINARY_SUFFIX, SPARSE_SUFFIX, DAT_SUFFIX)
+
+BINARY_VERSION = 2
+# magic, version, header size, xmin, dx, nbin, total area, map range,
+# area method, SHA-256 digest of the source .cxs, levels of the pyramid
+# (version 2 only):
+BINARY_HEADER = struct.Struct("<4sHHddId16s16s32sH")
+
+_DAT_TEMPLATES = {}  # (xmin, dx, nbin, value format) -> str.format template
+
+
+def grid_from_labels(first, second, count):
+    """ Define the grid of a dense map by its first two d_e labels. """
+    digits = len(first.split(".")[-1]) if "." in first else 0
+    xmin = float(first)
+    dx = round(float(second) - xmin, max(digits, 2))
+    nbin = int(round(count**0.5))
+    if nbin * nbin != count:
+        raise ValueError("A map of {} entries is not square.".format(count))
+    return fingerprint_engine.Grid(xmin, xmin + dx * (nbin - 1), dx)
+
+
+class SparseMap():
+    """ The non-zero bins of a fingerprint or difference map. """
+
+    def __init__(self, grid, bins=None):
+        self.grid = grid
+        self.bins = bins if bins is not None else {}
+
+    @classmethod
+    def from_dense(cls, grid, values):
+        """ Collect the non-zero entries of a flat array. """
+        return cls(grid, dict(
+            (index, value) for index, value in enumerate(values) if value))
+
+    def to_dense(self):
+        """ Expand into a flat array of nbin * nbin values. """
+        values = array.array("d", bytes(8 * self.grid.nbin * self.grid.nbin))
+        for index, value in self.bins.items():
+            values[index] = value
+        return values
+
+    def _check_grid(self, other):
+        if self.grid != other.grid:
+            raise ValueError("Maps on {} and {} are not comparable.".format(
+                self.grid, other.grid))
+
+    def difference(self, other):
+        """ Subtract an other map of the same grid, bin by bin. """
+        self._check_grid(other)
+        bins = dict(self.bins)
+        for index, value in other.bins.items():
+            bins[index] = bins.get(index, 0.0) - value
+        return SparseMap(self.grid,
+                         dict((index, value) for index, value in bins.items()
+                              if value))
+
+    def difference_number(self, other=None):
+        """ Sum up the absolute values of all bins.
+
+        With an other map of the same grid, sum up the absolute values of
+        the difference of both, without building the difference map. """
+        if other is None:
+            return sum(abs(value) for value in self.bins.values())
+        self._check_grid(other)
+        theirs = other.bins
+        total = sum(abs(value - theirs.get(index, 0.0))
+                    for index, value in self.bins.items())
+        mine = self.bins
+        return total + sum(abs(value) for index, value in theirs.items()
+                           if index not in mine)
+
+
+def range_name(grid):
+    """ Name the map range of a grid, "custom" if not known by name. """
+    for name, known in sorted(fingerprint_engine.MAP_RANGES.items()):
+        if grid == known:
+            return name
+    return "custom"
+
+
+def read_binary_header(source):
+    """ Read the header of an open .fpb; report grid and metadata. """
+    try:
+        (magic, version, size, xmin, dx, nbin, total_area, map_range,
+         area_method, digest, levels) = BINARY_HEADER.unpack(
+             source.read(BINARY_HEADER.size))
+    except struct.error:
+        raise ValueError("{} is not a binary fingerprint.".format(
+            source.name))
+    if version == 1:
+        levels = 0  # i.e., the field is the start of the values
+    if (magic != b"HSFP") or (version not in (1, BINARY_VERSION)):
+        raise ValueError(
+            "{} is not a binary fingerprint of version {}.".format(
+                source.name, BINARY_VERSION))
+    source.seek(size)
+    grid = fingerprint_engine.Grid(xmin, xmin + dx * (nbin - 1), dx)
+    metadata = {
+        "map_range": map_range.rstrip(b"\0").decode(),
+        "total_area": total_area,
+        "area_method": area_method.rstrip(b"\0").decode(),
+        "source_hash": "".join("{:02x}".format(byte)
+                               for byte in bytearray(digest)),
+        "header_size": size,
+        "pyramid_levels": levels,
+    }
+    return grid, metadata
+
+
+def _read_values(source, count):
+    """ Read count little-endian float64 from an open file. """
+    values = array.array("d")
+    try:
+        values.fromfile(source, count)
+    except EOFError:
+        raise ValueError("{} is incomplete.".format(source.name))
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def read_binary(file_name):
+    """ Read a .fpb; report its grid, a flat array and the metadata. """
+    with open(file_name, mode="rb") as source:
+        grid, metadata = read_binary_header(source)
+        values = _read_values(source, grid.nbin * grid.nbin)
+    return grid, values, metadata
+
+
+def read_pyramid(file_name, levels=fingerprint_engine.PYRAMID_LEVELS):
+    """ Report the pyramid of a map of any format, finest level first.
+
+    A .fpb recording enough levels is read, else the pyramid is computed
+    from the map.  Returns the grid and a list of (coarse map, nbin). """
+    if file_name.endswith(BINARY_SUFFIX):
+        with open(file_name, mode="rb") as source:
+            grid, metadata = read_binary_header(source)
+            if metadata["pyramid_levels"] >= levels:
+                source.seek(8 * grid.nbin * grid.nbin, 1)
+                pyramid = []
+                nbin = grid.nbin
+                for _ in range(levels):
+                    nbin = (nbin + 1) // 2
+                    pyramid.append((_read_values(source, nbin * nbin), nbin))
+                return grid, pyramid
+    grid, values = read_dense(file_name)
+    return grid, fingerprint_engine.pyramid(values, grid.nbin, levels)
+
+
+def write_binary(file_name, grid, values, total_area=0.0,
+                 area_method="", source_hash="",
+                 levels=fingerprint_engine.PYRAMID_LEVELS):
+    """ Write a flat array, its metadata and pyramid as binary .fpb. """
+    if len(values) != grid.nbin * grid.nbin:
+        raise ValueError("{} values do not match {}.".format(
+            len(values), grid))
+    blocks = [array.array("d", values)] + [
+        coarse for coarse, _ in fingerprint_engine.pyramid(
+            values, grid.nbin, levels)
+    ]
+    with open(file_name, mode="wb") as newfile:
+        newfile.write(
+            BINARY_HEADER.pack(b"HSFP", BINARY_VERSION, BINARY_HEADER.size,
+                               grid.xmin, grid.dx, grid.nbin, total_area,
+                               range_name(grid).encode(),
+                               area_method.encode(),
+                               bytes(bytearray.fromhex(source_hash)),
+                               levels))
+        for block in blocks:
+            if sys.byteorder == "big":
+                block.byteswap()
+            block.tofile(newfile)
+
+
+class FingerprintStack():
+    """ Fingerprints of one grid, loaded once into one flat array.
+
+    The k-th fingerprint occupies entries k * nbin**2 to (k + 1) * nbin**2
+    of values, in the order of the lines of a .dat.  With count, the
+    values of count fingerprints are allocated in shared memory (see
+    release). """
+
+    def __init__(self, grid, count=None):
+        self.grid = grid
+        self.size = grid.nbin * grid.nbin
+        self.names = []
+        self.memory = None
+        if count is None:
+            self.values = array.array("d")
+        else:
+            self.memory = shared_memory.SharedMemory(
+                create=True, size=max(8 * self.size * count, 1))
+            self.values = self.memory.buf[:8 * self.size * count].cast("d")
+
+    def __len__(self):
+        return len(self.names)
+
+    def append(self, name, values):
+        """ Add a fingerprint (a flat array on the stack's grid). """
+        if len(values) != self.size:
+            raise ValueError("{} does not match {}.".format(name, self.grid))
+        if self.memory is None:
+            self.values.extend(values)
+        else:
+            start = len(self.names) * self.size
+            self.values[start:start + self.size] = values
+        self.names.append(name)
+
+    def release(self):
+        """ Free the shared memory of the stack, if any. """
+        if self.memory is not None:
+            self.values.release()
+            self.values = array.array("d")
+            self.memory.close()
+            self.memory.unlink()
+            self.memory = None
+
+    def position(self, name):
+        """ Report the index of a fingerprint on the stack. """
+        return self.names.index(name)
+
+    def fingerprint(self, k):
+        """ Copy the k-th fingerprint into a flat array. """
+        return self.values[k * self.size:(k + 1) * self.size]
+
+    def difference(self, i, j):
+        """ Subtract the j-th from the i-th fingerprint, bin by bin. """
+        size = self.size
+        with memoryview(self.values) as view:
+            return array.array(
+                "d", map(operator.sub, view[i * size:(i + 1) * size],
+                         view[j * size:(j + 1) * size]))
+
+    def difference_number(self, i, j):
+        """ Sum up the absolute differences of two fingerprints. """
+        size = self.size
+        with memoryview(self.values) as view:
+            return sum(
+                map(abs,
+                    map(operator.sub, view[i * size:(i + 1) * size],
+                        view[j * size:(j + 1) * size])))
+
+
+def load_stacks(file_names, shared=False):
+    """ Read maps of any format once; stack those sharing a grid.
+
+    Returns a dictionary file name -> FingerprintStack; maps of the same
+    grid refer to the same stack.  If shared, the grids are read first
+    (see read_grid) to place each stack into shared memory of its final
+    size; the caller frees it by FingerprintStack.release. """
+    if shared:
+        groups = []  # [grid, file names]
+        for file_name in file_names:
+            grid = read_grid(file_name)
+            for group in groups:
+                if group[0] == grid:
+                    group[1].append(file_name)
+                    break
+            else:
+                groups.append([grid, [file_name]])
+        by_file = {}
+        for grid, names in groups:
+            stack = FingerprintStack(grid, len(names))
+            try:
+                for file_name in names:
+                    stack.append(file_name, read_dense(file_name)[1])
+                    by_file[file_name] = stack
+            except BaseException:
+                release_stacks(by_file)
+                stack.release()
+                raise
+        return by_file
+
+    stacks = []
+    by_file = {}
+    for file_name in file_names:
+        grid, values = read_dense(file_name)
+        for stack in stacks:
+            if stack.grid == grid:
+                break
+        else:
+            stack = FingerprintStack(grid)
+            stacks.append(stack)
+        stack.append(file_name, values)
+        by_file[file_name] = stack
+    return by_file
+
+
+def release_stacks(stacks):
+    """ Free the shared memory of the stacks of load_stacks. """
+    for stack in set(stacks.values()):
+        stack.release()
+
+
+def read_dense(file_name):
+    """ Read a map of any format, report its grid and a flat array. """
+    if file_name.endswith(BINARY_SUFFIX):
+        grid, values, _ = read_binary(file_name)
+        return grid, values
+
+    if file_name.endswith(SPARSE_SUFFIX):
+        sparse = read_sparse(file_name)
+        return sparse.grid, sparse.to_dense()
+
+    labels = []
+    values = array.array("d")
+    with open(file_name, mode="r") as source:
+        for line in source:
+            fields = line.split()
+            if len(fields) == 3:
+                if len(labels) < 2:
+                    labels.append(fields[1])
+                values.append(float(fields[2]))
+    if len(labels) < 2:
+        raise ValueError("{} is not a fingerprint map.".format(file_name))
+    return grid_from_labels(labels[0], labels[1], len(values)), values
+
+
+def read_grid(file_name):
+    """ Report the grid of a map of any format without keeping its values.
+
+    For a .fpb or .sdat, only the header is read; a .dat is scanned for
+    its first labels and number of lines. """
+    if file_name.endswith(BINARY_SUFFIX):
+        with open(file_name, mode="rb") as source:
+            return read_binary_header(source)[0]
+
+    if file_name.endswith(SPARSE_SUFFIX):
+        with open(file_name, mode="r") as source:
+            for line in source:
+                if line.startswith("# grid"):
+                    settings = dict(
+                        field.split("=") for field in line.split()[2:])
+                    return fingerprint_engine.Grid(float(settings["xmin"]),
+                                                   float(settings["xmax"]),
+                                                   float(settings["dx"]))
+        raise ValueError("{} lacks its grid definition.".format(file_name))
+
+    labels = []
+    count = 0
+    with open(file_name, mode="r") as source:
+        for line in source:
+            fields = line.split()
+            if len(fields) == 3:
+                if len(labels) < 2:
+                    labels.append(fields[1])
+                count += 1
+    if len(labels) < 2:
+        raise ValueError("{} is not a fingerprint map.".format(file_name))
+    return grid_from_labels(labels[0], labels[1], count)
+
+
+def read_sparse(file_name):
+    """ Read a map of any format as SparseMap. """
+    if not file_name.endswith(SPARSE_SUFFIX):
+        grid, values = read_dense(file_name)
+        return SparseMap.from_dense(grid, values)
+
+    grid = None
+    bins = {}
+    with open(file_name, mode="r") as source:
+        for line in source:
+            if line.startswith("# grid"):
+                settings = dict(
+                    field.split("=") for field in line.split()[2:])
+                grid = fingerprint_engine.Grid(float(settings["xmin"]),
+                                               float(settings["xmax"]),
+                                               float(settings["dx"]))
+                continue
+            fields = line.split()
+            if len(fields) != 3 or line.startswith("#"):
+                continue
+            if grid is None:
+                raise ValueError("{} lacks its grid definition.".format(
+                    file_name))
+            idi = int(round((float(fields[0]) - grid.xmin) / grid.dx))
+            ide = int(round((float(fields[1]) - grid.xmin) / grid.dx))
+            bins[idi * grid.nbin + ide] = float(fields[2])
+    if grid is None:
+        raise ValueError("{} lacks its grid definition.".format(file_name))
+    return SparseMap(grid, bins)
+
+
+def _dat_template(grid, value_format):
+    """ Build (once per grid) a template formatting a whole dense map.
+
+    All labels are fixed; thus, writing a .dat is one call of str.format
+    with the flat array of values instead of a format per line. """
+    key = (grid.xmin, grid.dx, grid.nbin, value_format)
+    if key not in _DAT_TEMPLATES:
+        labels = grid.labels()
+        _DAT_TEMPLATES[key] = "".join("".join(
+            "{} {} {}\n".format(di_label, de_label, value_format)
+            for de_label in labels) + "\n" for di_label in labels)
+    return _DAT_TEMPLATES[key]
+
+
+def write_dat(file_name, grid, values, value_format="{:9.8f}"):
+    """ Write a flat array as dense .dat, blank line after each d_i block. """
+    template = _dat_template(grid, value_format)
+    with open(file_name, mode="w") as newfile:
+        newfile.write(template.format(*values))
+
+
+def write_histogram(file_name, axis, values, value_format="{:9.8f}"):
+    """ Write a histogram along a Grid's axis, one line 'label value'. """
+    with open(file_name, mode="w") as newfile:
+        newfile.write("".join(
+            "{} {}\n".format(label, value_format.format(value))
+            for label, value in zip(axis.labels(), values)))
+
+
+def write_sparse(file_name, sparse, value_format="{:9.8f}"):
+    """ Write the bins of a SparseMap not vanishing in the format used. """
+    grid = sparse.grid
+    labels = grid.labels()
+    zero = value_format.format(0.0)
+    with open(file_name, mode="w") as newfile:
+        newfile.write("# grid xmin={} xmax={} dx={}\n".format(
+            grid.label(0), grid.label(grid.nbin - 1), grid.dx))
+        for index in sorted(sparse.bins):
+            value = value_format.format(sparse.bins[index])
+            if value.strip() in (zero.strip(), "-" + zero.strip()):
+                continue
+            idi, ide = divmod(index, grid.nbin)
+            newfile.write("{} {} {}\n".format(labels[idi], labels[ide],
+                                                value))
+
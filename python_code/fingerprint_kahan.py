@@ -2,7 +2,7 @@
 # name:   fingerprint_kahan.py
 # author: nbehrnd@yahoo.com
 # date:   2020-01-30 (YYYY-MM-DD)
-# edit:   2020-04-21 (YYYY-MM-DD)
+# edit:   2026-10-16 (YYYY-MM-DD)
 #
 """ Normalized 2D Hirshfeld surface fingerprints by Kahan formula.
 
@@ -34,142 +34,153 @@ algorithm consists of the following steps:
 To compare the results, there is both an implementation of the Heron
 formula (fingerprint_heron.py), as well as of the algorithm used by Andrew
 Rohl and Paolo Raiteri (fingerprint_rr.py) in fingerprint.f90 as well.
-If used to assists hirshfeld_surface.py, deposit this file in the same
+All three share the computation of side lengths and areas for all
+triangles at once in fingerprint_engine.py.  If used to assists
+hirshfeld_surface.py, deposit this file, cxs_reader.py, surface_cache.py,
+file_digest.py, fingerprint_engine.py and fingerprint_io.py in the same
 folder as the moderator; then, the moderator script will call its action.
 
-If to be used independently, deposit this file into the folder with the
-.cxs files of interest.  Launch its action from the CLI with
+If to be used independently, deposit this file together with these five
+modules into the folder with the .cxs files of interest.  Launch its
+action from the CLI with
 
 python fingerprint_heron.py
 
-to write for each example.cxs a fingerprint example.dat.
+to write for each example.cxs a fingerprint example.dat.  Sections once
+parsed from a .cxs are kept in a binary cache (see surface_cache.py) to
+skip the parsing of unchanged files in later runs.
+
+On request (main(decompose=True)), the same pass over the triangles
+equally yields the fingerprints decomposed by the pair of elements closest
+to a triangle inside and outside the surface (e.g., O...H), written into
+the sub-folder 'decomposed' as example_O-H.dat, etc., together with a
+table example.csv of their contributions to the surface in percent.
+Equally on request (main(properties=True)), the area-weighted histograms
+of d_norm, shape index and curvedness are written into the sub-folder
+'properties' as example_d_norm.dat, etc.
+
+The script uses only modules of Python's standard library, and requires
+Python 3.8, or later.  For batch-wise scrutinies, an increase of
+performance is achieved by using pypy (implementing Python 3.8, or
+later). """
+
+import array
+import contextlib
+import io
+import multiprocessing
+import os
+import sys
 
-The script uses only modules of Python's standard library.  For batch-wise
-scrutinies, an increase of performance is achieved by using either Python2
-(instead of Python3), or pypy. """
+import cxs_reader
+import file_digest
+import fingerprint_engine
+import fingerprint_io
+import surface_cache
 
-import itertools
-import math
-import os
+DECOMPOSED_FOLDER = "decomposed"
+PROPERTIES_FOLDER = "properties"
 
 
 class Worker():
     """ Work on an .cxs to yield normalized 2D fingerprints. """
 
-    def __init__(self, cxs_file):
-        """ Initiate the work session. """
+    area_method = "kahan"  # see fingerprint_engine.AREA_METHODS
+
+    def __init__(self, cxs_file, cache=None, grid=None, decompose=False,
+                 properties=False):
+        """ Initiate the work session (optionally with a SurfaceCache).
+
+        Without an explicit fingerprint_engine.Grid, the fingerprint spans
+        the extended map range 0.40(0.01)3.00 A.  With decompose, the
+        areas are tallied per pair of elements, too; with properties,
+        by d_norm, shape index and curvedness. """
         self.cxs_file = cxs_file
-        self.cxs_content = []
+        self.cache = cache
+        self.grid = grid or fingerprint_engine.EXTENDED
+        self.decompose = decompose
+        self.properties = properties
         self.vertices_count = 0
-        self.vertices_coordinates = []
+        self.vertices_coordinates = array.array("d")
         self.indices_count = 0
-        self.indices_list = []
+        self.indices_list = array.array("i")
         self.di_count = 0
-        self.di_list = []
+        self.di_list = array.array("d")
         self.de_count = 0
-        self.de_list = []
-        self.recorder_register = []
-        self.normalized_register = []
-        self.computed_triangles = []
+        self.de_list = array.array("d")
+        self.triangle_areas = array.array("d")
+        self.triangle_di = array.array("d")
+        self.triangle_de = array.array("d")
+        self.area_grid = array.array("d")
+        self.integral_area = 0.0
+        self.normalized_grid = array.array("d")
+        self.triangle_pairs = array.array("i")
+        self.pair_names = []
+        self.pair_grids = []
+        self.vertex_properties = {}
+        self.triangle_properties = {}
+        self.property_histograms = {}
+        self.source_hash = None
 
     def file_list(self):
         """ Report to the CLI the .cxs file identified. """
         print("{}:".format(self.cxs_file))
 
     def file_reader(self):
-        """Read the .cxs file content. """
-        file = open(self.cxs_file, mode="r")
-        self.cxs_content = file.readlines()
-        file.close()
-
-    def readout_vertices_count(self):
-        """Report .cxs' number of vertices and vertices' coordinates. """
-        tester = False
-
-        # for line in per_file_register:
-        for line in self.cxs_content:
-            if line.startswith("begin vertices "):
-                vertices_count = int(line.split()[2])
-                report_start = str("{:<21}".format("Number of vertices:"))
-                report_end = str("{:>10}".format(vertices_count))
-                print("{}{}".format(report_start, report_end))
-                tester = True  # start word collecting coordinates
-            if line.startswith("end vertices"):
-                tester = False
-                break
-
-            if tester:
-                self.vertices_coordinates.append(str(line.strip()))
-        del self.vertices_coordinates[0]  # remove the start line's entry.
-
-    def readout_indices_count(self):
-        """ State .cxs' indices number, list triangles by their indices. """
-        tester = False  # assume the line is not of interest
-
-        for line in self.cxs_content:
-            if line.startswith("begin indices "):
-                indices_count = int(line.split()[2])
-                report_start = str("{:<21}".format("Number of indices:"))
-                report_end = str("{:>10}".format(indices_count))
-                print("{}{}".format(report_start, report_end))
-                tester = True  # start collecting indices
-            if line.startswith("end indices"):
-                tester = False
-                break
-
-            if tester:
-                self.indices_list.append(str(line.strip()))
-        del self.indices_list[0]  # remove the start line's entry.
-
-    def readout_di_count(self):
-        """ Report .cxs' number of d_i points, collect the entries. """
-        tester = False  # assume the line is not of interest
-
-        for _, line in enumerate(self.cxs_content):
-            if line.startswith("begin d_i "):
-                di_count = int(line.split()[2])
-                report_start = str("{:<21}".format("Number of di:"))
-                report_end = str("{:>10}".format(di_count))
-                print("{}{}".format(report_start, report_end))
-                tester = True
-            if line.startswith("end d_i"):
-                tester = False
-                break
-
-            if tester is True:
-                self.di_list.append(str(line.strip()))
-        del self.di_list[0]  # remove the start line's entry.
-
-    def readout_de_count(self):
-        """ Report .cxs' number of d_e points, collect the entries. """
-        tester = False  # assume the line is not of interest
-
-        for line in self.cxs_content:
-            if line.startswith("begin d_e "):
-                de_count = int(line.split()[2])
-                report_start = str("{:<21}".format("Number of de:"))
-                report_end = str("{:>10}".format(de_count))
-                print("{}{}".format(report_start, report_end))
-                tester = True
-            if line.startswith("end d_e"):
-                tester = False
-                break
-
-            if tester:
-                self.de_list.append(str(line.strip()))
-        del self.de_list[0]  # remove the start line's entry
+        """ Decode only vertices, indices, d_i and d_e of the mapped .cxs.
+
+        If a cache is known, previously parsed sections are used.  For a
+        decomposition, the elements and the atoms closest to each triangle
+        are read, too; for histograms, the properties of the vertices. """
+        sections = cxs_reader.FINGERPRINT_SECTIONS
+        if self.decompose:
+            sections += cxs_reader.DECOMPOSITION_SECTIONS
+        if self.properties:
+            sections += cxs_reader.PROPERTY_SECTIONS
+        surface = surface_cache.read_surface(self.cxs_file, sections,
+                                             cache=self.cache)
+        self.vertices_coordinates = surface["vertices"]
+        self.indices_list = surface["indices"]
+        self.di_list = surface["d_i"]
+        self.de_list = surface["d_e"]
+
+        self.vertices_count = len(self.vertices_coordinates) // 3
+        self.indices_count = len(self.indices_list) // 3
+        self.di_count = len(self.di_list)
+        self.de_count = len(self.de_list)
+
+        for label, count in [("Number of vertices:", self.vertices_count),
+                             ("Number of indices:", self.indices_count),
+                             ("Number of di:", self.di_count),
+                             ("Number of de:", self.de_count)]:
+            report_start = str("{:<21}".format(label))
+            report_end = str("{:>10}".format(count))
+            print("{}{}".format(report_start, report_end))
+
+        self.vertex_properties = dict(
+            (name, surface[name]) for name in cxs_reader.PROPERTY_SECTIONS
+            if name in surface)
+
+        if self.decompose:
+            elements = cxs_reader.text_entries(surface["unit_cell_elements"])
+            pairs = fingerprint_engine.face_pairs(
+                elements, surface["atoms_inside_surface"],
+                surface["atoms_outside_surface"], surface["d_i_face_atoms"],
+                surface["d_e_face_atoms"])
+            self.triangle_pairs, self.pair_names = pairs
+            if len(self.triangle_pairs) != self.indices_count:
+                raise ValueError(
+                    "The face atoms of {} do not match its triangles.".format(
+                        self.cxs_file))
 
     def triangle_surfaces(self):
         """ Compute the surface of the surface triangles (Kahan formula)
 
-        The distance d between points A(x_1, y_1, z_1) and B(x_2, y_2, z_2)
-        equals to
-
-        d = sqrt[(x_2 - x_1)^2 + (y_2 - y_1)^2 + (z_2 - z_1)^2].
-
-        The triangle side lengths are sorted in decreasing order, labeled
-        newly as to match the condition of a >= b >= c.  The individual
-        triangle area then is computed by
+        The side lengths and areas of all triangles are computed at once
+        by fingerprint_engine.py; the formula used is set by the class
+        attribute area_method.  With Kahan's formula, the triangle side
+        lengths are sorted in decreasing order, labeled newly as to match
+        the condition of a >= b >= c.  The individual triangle area then
+        is computed by
 
         area = 0.25 * \sqrt(A * B * C * D) where /these/ ABCD stand for
 
@@ -178,232 +189,258 @@ class Worker():
         C = (c + (a - b)), and
         D = (a + (b - c)).
 
-        The side length constraint present in Fortran code fingerprint.f90
-        -- all sides at least 10E-5 A -- thus is not applied here. """
-
-        # Each line in 'indices_list' is one triangle to consider here.
-        for triangle in self.indices_list:
-            # define a triangle by indices of points A, B, and C:
-            index_A = int(triangle.split()[0])
-            index_B = int(triangle.split()[1])
-            index_C = int(triangle.split()[2])
-
-            # define a triangle by coordinates of point A, B, and C:
-            point_A = (float(self.vertices_coordinates[index_A].split()[0]),
-                       float(self.vertices_coordinates[index_A].split()[1]),
-                       float(self.vertices_coordinates[index_A].split()[2]))
-
-            point_B = (float(self.vertices_coordinates[index_B].split()[0]),
-                       float(self.vertices_coordinates[index_B].split()[1]),
-                       float(self.vertices_coordinates[index_B].split()[2]))
-
-            point_C = (float(self.vertices_coordinates[index_C].split()[0]),
-                       float(self.vertices_coordinates[index_C].split()[1]),
-                       float(self.vertices_coordinates[index_C].split()[2]))
-
-            # compute the distance BC, i.e. dist_a
-            delta_x_a_squared = (point_B[0] - point_C[0])**2
-            delta_y_a_squared = (point_B[1] - point_C[1])**2
-            delta_z_a_squared = (point_B[2] - point_C[2])**2
-            dist_a = math.sqrt(
-                delta_x_a_squared + delta_y_a_squared + delta_z_a_squared)
-
-            # compute the distance AC, i.e. dist_b
-            delta_x_b_squared = (point_A[0] - point_C[0])**2
-            delta_y_b_squared = (point_A[1] - point_C[1])**2
-            delta_z_b_squared = (point_A[2] - point_C[2])**2
-            dist_b = math.sqrt(
-                delta_x_b_squared + delta_y_b_squared + delta_z_b_squared)
-
-            # compute the distance AB, i.e. dist_c
-            delta_x_c_squared = (point_A[0] - point_B[0])**2
-            delta_y_c_squared = (point_A[1] - point_B[1])**2
-            delta_z_c_squared = (point_A[2] - point_B[2])**2
-            dist_c = math.sqrt(
-                delta_x_c_squared + delta_y_c_squared + delta_z_c_squared)
-
-            # sort the triangle side lengths:
-            length_register = [dist_a, dist_b, dist_c]
-            length_register.sort()
-            Kahan_a = float(length_register[2])
-            Kahan_b = float(length_register[1])
-            Kahan_c = float(length_register[0])
-
-            # if passing the triangle condition, compute the triangle area
-            if (Kahan_c - (Kahan_a - Kahan_b)) < 0:
-                print("This is not a valid triangle.")
-                continue  # equates to 'start with the next triangle instead'
-            else:
-                Kahan_A = Kahan_a + (Kahan_b + Kahan_c)
-                Kahan_B = Kahan_c - (Kahan_a - Kahan_b)
-                Kahan_C = Kahan_c + (Kahan_a - Kahan_b)
-                Kahan_D = Kahan_a + (Kahan_b - Kahan_c)
-
-                area = 0.25 * math.sqrt(Kahan_A * Kahan_B * Kahan_C * Kahan_D)
-
-                # collect d_e of A, B, C for triangle's average:
-                de_A = float(self.de_list[index_A])
-                de_B = float(self.de_list[index_B])
-                de_C = float(self.de_list[index_C])
-                average_de = (de_A + de_B + de_C) / float(3)
-
-                # collect d_i of A, B, C for triangle's average:
-                di_A = float(self.di_list[index_A])
-                di_B = float(self.di_list[index_B])
-                di_C = float(self.di_list[index_C])
-                average_di = (di_A + di_B + di_C) / float(3)
-
-                # concatenate the results about the individual triangle:
-                retain = str("{} {} {}".format(average_de, average_di, area))
-                self.computed_triangles.append(retain)
-        self.computed_triangles.sort()
+        As in fingerprint.f90, triangles with a side shorter than 1e-5 A
+        are not considered. """
+        self.triangle_areas = fingerprint_engine.triangle_areas(
+            self.vertices_coordinates, self.indices_list, self.area_method)
+        self.triangle_di = fingerprint_engine.triangle_means(
+            self.di_list, self.indices_list)
+        self.triangle_de = fingerprint_engine.triangle_means(
+            self.de_list, self.indices_list)
+        self.triangle_properties = dict(
+            (name, fingerprint_engine.triangle_means(values,
+                                                     self.indices_list))
+            for name, values in self.vertex_properties.items())
 
     def numpy_free_area_binning(self):
-        """ A two-step binning without numpy; 1) de, di, 2) surfaces.
+        """ A binning without numpy; tally of areas per (de, di) bin.
 
         For this type of analysis, Rohl et al. recommend a grid increment
         of 0.01 A during work with CrystalExplorer.  Thus, this binning
-        uses a grid of this granularity, (di, de) = 0.40(0.01)3.00 A, too.
-
-        The subsequent, bin-wise addition of individual triangle surfaces
-        equally was tested both with a three-column np.array, as well as
-        with a square-matrix like array approach, too.  The approach here
-        -- independent on numpy -- however retains best the portability of
-        the script with an acceptable rate of processing (e.g., pypy). """
-
-        # binning along de and di:
-        pre_binned = []
-        for ready_triangle in self.computed_triangles:
-            new_di = float(ready_triangle.split()[1])
-            new_de = float(ready_triangle.split()[0])
-            area = str(ready_triangle.split()[2])
-
-            retain = str("{:3.2f} {:3.2f} {}".format(new_di, new_de, area))
-            pre_binned.append(retain)
-        pre_binned.sort()
-
-        # binning the surfaces of individual triangles:
-        local_area = 0.0  # collect surface specific to (de,di) bin
-        integral_area = 0.0  # to sum up all triangles' surfaces
-        old_key = ""
-        pre_binned.append("0 0 0")  # the STOP word to process the data
-
-        for entry in pre_binned:
-            key = ' '.join([entry.split()[0], entry.split()[1]])
-            if key == old_key:
-                local_area += float(entry.split()[2])
-            if key != old_key:
-                # save the information collected so far:
-                retain = str("{} {:9.8f}".format(old_key, local_area))
-                integral_area += local_area
-                self.recorder_register.append(retain)
-                # initiate the collection of new information:
-                local_area = 0.0
-                local_area += float(entry.split()[2])
-                old_key = key
-
-        del self.recorder_register[0]  # delete the heading zero entry
-        #     # test deposit as permanent file, only non-zero (de,di) bins:
-        #     with open("sparse_export.txt", mode="w") as newfile:
-        #         for entry in self.recorder_register:
-        #             newfile.write("{}\n".format(entry))
+        uses a grid of this granularity, (di, de) = 0.40(0.01)3.00 A, too,
+        unless an other grid was defined for the Worker.
+
+        The triangles' average di and de are converted into the indices
+        of a flat array by arithmetic (see fingerprint_engine.bin_areas),
+        which equally is the approach of fingerprint.f90.  As there, the
+        map is normalized by the area of the triangles within the map.
+        For a decomposition, the same pass tallies the areas per pair of
+        elements, too.  The histograms of other properties are tallied in
+        one pass over the triangles already known. """
+        if self.decompose:
+            self.area_grid, self.pair_grids = (
+                fingerprint_engine.bin_areas_by_label(
+                    self.triangle_di, self.triangle_de, self.triangle_areas,
+                    self.triangle_pairs, len(self.pair_names), self.grid))
+        else:
+            self.area_grid = fingerprint_engine.bin_areas(
+                self.triangle_di, self.triangle_de, self.triangle_areas,
+                self.grid)
+        self.integral_area = sum(self.area_grid)
+        self.normalized_grid = fingerprint_engine.normalize(self.area_grid)
+        if self.triangle_properties:
+            self.property_histograms = fingerprint_engine.property_histograms(
+                self.triangle_properties, self.triangle_areas)
+
+        non_zero = sum(1 for value in self.area_grid if value > 0.0)
         report_start = str("{:<21}".format("non-zero (de,di)-bins:"))
-        report_end = str("{:>9}".format(len(self.recorder_register)))
+        report_end = str("{:>9}".format(non_zero))
         print("\n{}{}".format(report_start, report_end))
 
         # report integral_area:
         report_start = str("{:<21}".format("Total surface area:"))
-        report_end = str("{:>10}".format(round(integral_area, 5)))
+        report_end = str("{:>10}".format(round(self.integral_area, 5)))
         print("{}{}\n".format(report_start, report_end))
 
-        # normalization of the results
-        for entry in self.recorder_register:
-            normalized_entry = (
-                float(entry.split()[2]) / integral_area) * 100.00
-            retain = ' '.join([
-                entry.split()[0],
-                entry.split()[1], "{:9.8f}".format(normalized_entry)
-            ])
-            self.normalized_register.append(retain)
-
     def dat_file_generation(self):
         """ Prepare a .dat file / the Hirshfeld surface 2D fingerprint map.
 
         To map their differences, 2D fingerprints need to share a uniform
-        dimension, i.e., (0.40,0.01,3.00) A for de and di.  Thus, zero-
-        entry (di,de)-bins are added to already recorded (di,de)-bins. """
-        # prepare blank lists:
-        assistance = []
-        blank_list = []
-
-        for i in range(40, 301, 1):
-            retain = float(i) / float(100)
-            assistance.append("{:3.2f}".format(retain))
-
-        for entry in itertools.product(assistance, assistance):
-            retain = ' '.join([entry[0], entry[1], "0.0"])
-            blank_list.append(retain)
-
-        # join blank_list and recorded list about normalized (di,de)-bins:
-        raw_sum_list = self.normalized_register + blank_list
-        raw_sum_list.sort()
-
-        # If known to both lists now merged, bins with non-zero entries
-        # are sorted after those by the blank list.  Areas will thus be
-        # added locally until the key (di,de) of next entry changes; this
-        # then triggers the deposit in the dat_register eventually  used
-        # to write .dat about the normalized 2D fingerprints. """
-        dat_register = []
-        local_area = 0.0
-        old_key = ""
-        raw_sum_list.append("0 0 0")  # the STOP word to process the data
-
-        for entry in raw_sum_list:
-            key = ' '.join([entry.split()[0], entry.split()[1]])
-            if key == old_key:
-                local_area += float(str(entry.split()[2]))
-            if key != old_key:
-                # save the information collected so far:
-                retain = str("{} {:9.8f}".format(old_key, local_area))
-                dat_register.append(retain)
-                # initiate the collection of new information:
-                local_area = 0.0
-                local_area += float(str(entry.split()[2]))
-                old_key = key
-
-        del dat_register[0]  # delete the heading zero entry:
-
-        # permanent record as .dat file:
-        output_file = str(self.cxs_file)[:-4] + str(".dat")
-        with open(output_file, mode="w") as newfile:
-            for entry in dat_register:
-                if str("3.00") in entry.split()[1]:
-                    retain = str("{}\n\n".format(entry))
-                else:
-                    retain = str("{}\n".format(entry))
-                newfile.write(retain)
-
-
-def main():
-    """ Process the .cxs files identified in the current directory. """
+        dimension, e.g., (0.40,0.01,3.00) A for de and di.  Thus, zero-
+        entry (di,de)-bins are written, too.  A blank line separates the
+        blocks of constant di (the format of pm3d in gnuplot). """
+        output_file = str(self.cxs_file)[:-4] + fingerprint_io.DAT_SUFFIX
+        fingerprint_io.write_dat(output_file, self.grid, self.normalized_grid)
+
+    def sparse_file_generation(self):
+        """ Prepare a sparse .sdat file listing only the non-zero bins.
+
+        The grid is recorded in a leading comment line; see the format's
+        description in fingerprint_io.py. """
+        output_file = str(self.cxs_file)[:-4] + fingerprint_io.SPARSE_SUFFIX
+        fingerprint_io.write_sparse(
+            output_file,
+            fingerprint_io.SparseMap.from_dense(self.grid,
+                                                self.normalized_grid))
+
+    def cxs_hash(self):
+        """ Report the SHA-256 hash of the .cxs, computed once. """
+        if self.source_hash is None:
+            self.source_hash = file_digest.content_hash(self.cxs_file)
+        return self.source_hash
+
+    def binary_file_generation(self):
+        """ Prepare a binary .fpb file of the fingerprint and its metadata.
+
+        Besides the grid, the header records the total surface area, the
+        area method and the hash of the .cxs (see fingerprint_io.py). """
+        output_file = str(self.cxs_file)[:-4] + fingerprint_io.BINARY_SUFFIX
+        fingerprint_io.write_binary(
+            output_file, self.grid, self.normalized_grid,
+            total_area=self.integral_area, area_method=self.area_method,
+            source_hash=self.cxs_hash())
+
+    def decomposition_file_generation(self, output_format="dat"):
+        """ Write the fingerprints per pair of elements, and their shares.
+
+        Each map is scaled by the same factor as the fingerprint; thus its
+        bins sum up to the contribution of the pair to the surface within
+        the map, in percent.  The maps are written into the sub-folder
+        'decomposed' (e.g., example_O-H.dat for O...H) in the format of
+        the fingerprint; example.csv lists the contributions. """
+        os.makedirs(DECOMPOSED_FOLDER, exist_ok=True)  # workers may race
+        stem = os.path.join(DECOMPOSED_FOLDER, str(self.cxs_file)[:-4])
+        factor = 0.0
+        if self.integral_area > 0.0:
+            factor = 100.0 / self.integral_area
+
+        shares = []
+        for name, pair_grid in zip(self.pair_names, self.pair_grids):
+            values = array.array("d", [value * factor for value in pair_grid])
+            output_file = "{}_{}".format(stem, name.replace("...", "-"))
+            if output_format == "sparse":
+                fingerprint_io.write_sparse(
+                    output_file + fingerprint_io.SPARSE_SUFFIX,
+                    fingerprint_io.SparseMap.from_dense(self.grid, values))
+            elif output_format == "binary":
+                fingerprint_io.write_binary(
+                    output_file + fingerprint_io.BINARY_SUFFIX, self.grid,
+                    values, total_area=sum(pair_grid),
+                    area_method=self.area_method,
+                    source_hash=self.cxs_hash())
+            else:
+                fingerprint_io.write_dat(
+                    output_file + fingerprint_io.DAT_SUFFIX, self.grid,
+                    values)
+            shares.append((sum(pair_grid) * factor, sum(pair_grid), name))
+
+        shares.sort(key=lambda share: (-share[0], share[2]))
+        with open(stem + ".csv", mode="w") as newfile:
+            newfile.write("pair,area,contribution\n")
+            for share, area, name in shares:
+                newfile.write("{},{:.5f},{:.2f}\n".format(name, area, share))
+                print("{:<21}{:>9.2f} %".format(name, share))
+        print("")
+
+    def property_file_generation(self):
+        """ Write the area-weighted histograms of d_norm, etc., in percent.
+
+        Each histogram is normalized by the area of all triangles, and
+        written into the sub-folder 'properties' (e.g., as
+        example_d_norm.dat); the area-weighted means are reported. """
+        os.makedirs(PROPERTIES_FOLDER, exist_ok=True)  # workers may race
+        stem = os.path.join(PROPERTIES_FOLDER, str(self.cxs_file)[:-4])
+        total = sum(self.triangle_areas)
+        factor = 100.0 / total if total > 0.0 else 0.0
+
+        for name in sorted(self.property_histograms):
+            histogram, mean = self.property_histograms[name]
+            fingerprint_io.write_histogram(
+                "{}_{}{}".format(stem, name, fingerprint_io.DAT_SUFFIX),
+                fingerprint_engine.PROPERTY_AXES[name],
+                [value * factor for value in histogram])
+            report_start = str("{:<21}".format("mean " + name + ":"))
+            report_end = str("{:>10}".format(round(mean, 5)))
+            print("{}{}".format(report_start, report_end))
+        print("")
+
+
+def process(cxs_file, cache=None, grid=None, output_format="dat",
+            worker_class=Worker, decompose=False, properties=False):
+    """ Compute and write the fingerprint of one .cxs file. """
+    worker = worker_class(cxs_file, cache, grid, decompose, properties)
+    worker.file_list()
+    worker.file_reader()
+    worker.triangle_surfaces()
+    worker.numpy_free_area_binning()
+    if output_format == "sparse":
+        worker.sparse_file_generation()
+    elif output_format == "binary":
+        worker.binary_file_generation()
+    else:
+        worker.dat_file_generation()
+    if decompose:
+        worker.decomposition_file_generation(output_format)
+    if properties:
+        worker.property_file_generation()
+
+
+def process_file(cxs_file, cache=None, *arguments):
+    """ Process one .cxs file like process; report rather than raise errors.
+
+    A file which can not be read or processed thus does not abort the
+    processing of the others, with or without a pool of processes. """
+    try:
+        process(cxs_file, cache, *arguments)
+    except (IOError, OSError, ValueError) as error:
+        print("{} was not processed: {}".format(cxs_file, error))
+
+
+def open_cache(use_cache=True):
+    """ Open the cache of parsed .cxs, or report why there is none. """
+    if not use_cache:
+        return None
+    try:
+        return surface_cache.SurfaceCache()
+    except (IOError, OSError):
+        print("Cache of parsed .cxs not accessible, continue without.")
+        return None
+
+
+_POOL_CACHE = None  # the cache of a process in the pool
+
+
+def _pool_setup(use_cache):
+    """ Open the cache once per process of the pool. """
+    global _POOL_CACHE
+    _POOL_CACHE = open_cache(use_cache)
+
+
+def _pool_process(task):
+    """ Process one .cxs in the pool; return the report as text. """
+    report = io.StringIO()
+    with contextlib.redirect_stdout(report):
+        process_file(task[0], _POOL_CACHE, *task[1:])
+    return report.getvalue()
+
+
+def main(use_cache=True, worker_class=Worker, grid=None, output_format="dat",
+         jobs=1, decompose=False, properties=False):
+    """ Process the .cxs files identified in the current directory.
+
+    An optional fingerprint_engine.Grid replaces the extended map range
+    of 0.40(0.01)3.00 A.  With output_format "sparse", only the non-zero
+    bins are written into example.sdat instead of example.dat; "binary"
+    writes example.fpb.  With jobs > 1 (0: one per CPU), the files are
+    distributed to a pool of processes; the reports still are printed in
+    the order of the file names.  With decompose, fingerprints per pair
+    of elements are written, too (see Worker.decomposition_file_generation);
+    with properties, the histograms of d_norm, shape index and curvedness.
+    """
     cxs_register = []
-
     for file in os.listdir("."):
         if file.endswith(".cxs"):
             cxs_register.append(file)
     cxs_register.sort()
 
-    for element in cxs_register:
-        cxs_file = Worker(element)
-        cxs_file.file_list()
-        cxs_file.file_reader()
-        cxs_file.readout_vertices_count()
-        cxs_file.readout_indices_count()
-        cxs_file.readout_di_count()
-        cxs_file.readout_de_count()
-        cxs_file.triangle_surfaces()
-        cxs_file.numpy_free_area_binning()
-        cxs_file.dat_file_generation()
+    jobs = jobs or multiprocessing.cpu_count()
+    if jobs == 1 or len(cxs_register) < 2:
+        cache = open_cache(use_cache)
+        for element in cxs_register:
+            process_file(element, cache, grid, output_format,
+                         worker_class, decompose, properties)
+        return
+
+    tasks = [(element, grid, output_format, worker_class, decompose,
+              properties) for element in cxs_register]
+    pool = multiprocessing.Pool(min(jobs, len(tasks)), _pool_setup,
+                                (use_cache, ))
+    try:
+        for report in pool.imap(_pool_process, tasks):
+            sys.stdout.write(report)
+    finally:
+        pool.close()
+        pool.join()
 
 
 # Enable independent use of this script, directly, without a moderator:
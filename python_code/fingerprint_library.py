@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# name:    fingerprint_library.py
+# author:  nbehrnd@yahoo.com
+# license: GPL version 2
+# date:    2026-10-16 (YYYY-MM-DD)
+#
+""" On-disk library of fingerprints for comparisons beyond the RAM.
+
+An extended fingerprint spans 68,121 bins; as float64, this are about 545
+kB per structure, or 27 GB for 50k structures.  Instead of stacking them
+in memory (fingerprint_io.FingerprintStack), fingerprints of the same grid
+are appended one by one into a library file (.fpl):
+
++ a header of fixed size (struct LIBRARY_HEADER) with the grid (xmin, dx,
+  nbin), byte order, the number of fingerprints, and the offset of the
+  names,
++ the matrix of count x nbin**2 float64, one fingerprint per row,
++ the names of the fingerprints, one per line (UTF-8).
+
+The library is memory-mapped; its rows are read as the comparison needs
+them, paging is left to the operating system.  The difference numbers of
+all pairs are computed by square tiles of the pair matrix (see
+fingerprint_pairs.py), keeping a block of rows in use at a time.  Each
+tile completed is appended to a .csv of (reference, probe, difference
+number) and closed by a comment line '# tile ...'; an interrupted run
+thus resumes with the first tile not yet completed.
+
+Like the other modules of the Python-only approach, this module only uses
+Python's standard library. """
+
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+
+import fingerprint_engine
+import fingerprint_io
+import fingerprint_pairs
+
+LIBRARY_SUFFIX = ".fpl"
+LIBRARY_VERSION = 1
+# magic, version, byte order (0: little, 1: big), header size, xmin, dx,
+# nbin, number of fingerprints, offset of the names:
+LIBRARY_HEADER = struct.Struct("<4sHBxIddIQQ")
+MATRIX_OFFSET = 64  # the header padded, keeps the rows aligned
+
+_LIBRARY = None  # the library opened by a process of the pool
+
+
+def build_library(library_file, file_names):
+    """ Append fingerprints of any format one by one into a library.
+
+    All fingerprints need to share the grid of the first one; others are
+    reported and skipped.  Report the names of the fingerprints stored. """
+    grid = None
+    names = []
+    temporary = "{}.{}".format(library_file, os.getpid())
+    with open(temporary, mode="wb") as newfile:
+        newfile.write(bytes(MATRIX_OFFSET))
+        for file_name in file_names:
+            file_grid, values = fingerprint_io.read_dense(file_name)
+            if grid is None:
+                grid = file_grid
+            if file_grid != grid:
+                print("{} is not on {}, skipped.".format(file_name, grid))
+                continue
+            values.tofile(newfile)
+            names.append(file_name)
+
+        if grid is None:
+            grid = fingerprint_engine.EXTENDED
+        names_offset = newfile.tell()
+        newfile.write("".join(name + "\n" for name in names).encode("utf-8"))
+        newfile.seek(0)
+        newfile.write(
+            LIBRARY_HEADER.pack(b"HSFL", LIBRARY_VERSION,
+                                sys.byteorder == "big", MATRIX_OFFSET,
+                                grid.xmin, grid.dx, grid.nbin, len(names),
+                                names_offset))
+    os.replace(temporary, library_file)
+    return names
+
+
+class Library():
+    """ A memory-mapped library of fingerprints. """
+
+    def __init__(self, library_file):
+        """ Map the library; check its header. """
+        self.library_file = library_file
+        self._source = open(library_file, mode="rb")
+        try:
+            (magic, version, big_endian, offset, xmin, dx, nbin, count,
+             names_offset) = LIBRARY_HEADER.unpack(
+                 self._source.read(LIBRARY_HEADER.size))
+        except struct.error:
+            self._source.close()
+            raise ValueError("{} is not a library.".format(library_file))
+        if (magic != b"HSFL") or (version != LIBRARY_VERSION) or (
+                big_endian != (sys.byteorder == "big")):
+            self._source.close()
+            raise ValueError(
+                "{} is not a library of version {} for this computer.".format(
+                    library_file, LIBRARY_VERSION))
+
+        self.grid = fingerprint_engine.Grid(xmin, xmin + dx * (nbin - 1), dx)
+        self._source.seek(names_offset)
+        self.names = self._source.read().decode("utf-8").splitlines()
+        self._buffer = mmap.mmap(self._source.fileno(), 0,
+                                 access=mmap.ACCESS_READ)
+        self._view = memoryview(self._buffer)[offset:names_offset].cast("d")
+
+        # the rows are accessed like those of a stack in memory:
+        self.stack = fingerprint_io.FingerprintStack(self.grid)
+        self.stack.names = self.names
+        self.stack.values = self._view
+        if len(self._view) != count * self.stack.size:
+            self.close()
+            raise ValueError("{} is incomplete.".format(library_file))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self.names)
+
+    def close(self):
+        """ Release the map and the file handle. """
+        self.stack.values = None
+        self._view.release()
+        self._buffer.close()
+        self._source.close()
+
+
+def completed_tiles(output):
+    """ Read the tiles completed by an earlier run into output.
+
+    Rows after the last tile completed are removed from the file. """
+    done = set()
+    if not os.path.isfile(output):
+        return done
+    keep = 0
+    with open(output, mode="r+") as source:
+        position = 0
+        for line in iter(source.readline, ""):
+            position += len(line.encode("utf-8"))
+            if line.startswith("# tile"):
+                done.add(tuple(int(field) for field in line.split()[2:6]))
+                keep = position
+            elif line.startswith("reference,"):
+                keep = max(keep, position)
+        source.truncate(keep)
+    return done
+
+
+def _pool_setup(library_file):
+    """ Open the library once per process of the pool. """
+    global _LIBRARY
+    _LIBRARY = Library(library_file)
+
+
+def _tile_numbers(tile):
+    """ Report a tile and the difference numbers of its pairs. """
+    stack = _LIBRARY.stack
+    return tile, [(i, j, stack.difference_number(i, j))
+                  for i, j in fingerprint_pairs.pairs_of(tile)]
+
+
+def difference_numbers(library_file, output, jobs=1,
+                       tile=fingerprint_pairs.TILE):
+    """ Compute the difference numbers of all pairs of a library.
+
+    The results are appended tile by tile into the .csv output; tiles
+    completed by an earlier run are not computed again.  With jobs > 1
+    (0: one per CPU), the tiles are distributed to a pool of processes,
+    each mapping the library on its own.  Report the number of tiles
+    computed in this run. """
+    with Library(library_file) as library:
+        names = [os.path.splitext(name)[0] for name in library.names]
+        tiles = list(fingerprint_pairs.tiles(len(library), tile))
+    done = completed_tiles(output)
+    tiles = [task for task in tiles if task not in done]
+
+    jobs = jobs or multiprocessing.cpu_count()
+    with open(output, mode="a") as newfile:
+        if newfile.tell() == 0:
+            newfile.write("reference,probe,difference_number\n")
+
+        def record(task, results):
+            newfile.write("".join(
+                "{},{},{:6.4f}\n".format(names[i], names[j], number)
+                for i, j, number in results))
+            newfile.write("# tile {} {} {} {}\n".format(*task))
+            newfile.flush()
+
+        if jobs == 1 or len(tiles) < 2:
+            _pool_setup(library_file)
+            try:
+                for task in tiles:
+                    record(*_tile_numbers(task))
+            finally:
+                _LIBRARY.close()
+        else:
+            pool = multiprocessing.Pool(min(jobs, len(tiles)), _pool_setup,
+                                        (library_file, ))
+            try:
+                for task, results in pool.imap_unordered(
+                        _tile_numbers, tiles):
+                    record(task, results)
+            finally:
+                pool.close()
+                pool.join()
+    return len(tiles)
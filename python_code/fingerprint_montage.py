@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# name:    fingerprint_montage.py
+# author:  nbehrnd@yahoo.com
+# license: GPL version 2
+# date:    2026-10-16 (YYYY-MM-DD)
+#
+""" Contact sheets: many fingerprints or difference maps in one .png.
+
+With 200 structures, the previews of -o are 200 fingerprints and 19,900
+difference maps, each a file of its own.  Instead, a contact sheet lays
+out the maps as tiles in rows of one large image, each tile captioned by
+its name and the least and largest value (z_min, z_max) of the map:
+
++ fingerprint_sheets: all fingerprints, at most PER_PAGE per sheet,
++ difference_sheets: the difference maps of all pairs, in pages of
+  fingerprint_pairs.TILE x TILE fingerprints of the pair matrix (the
+  upper triangle); the maps are subtracted in memory, no diff_*.dat is
+  read or written.
+
+The fingerprints are read once into stacks (fingerprint_io.load_stacks);
+the tiles are colored by fingerprint_raster.py.  Captions are written in
+a bitmap font of 3 x 5 pixels (FONT, upper case only).
+
+This module only uses Python's standard library. """
+
+import math
+
+import fingerprint_io
+import fingerprint_pairs
+import fingerprint_raster
+
+PER_PAGE = 100  # tiles per sheet of fingerprints
+MARGIN = 8  # pixels around each tile
+TEXT_SCALE = 2  # pixels per dot of the font
+LINES = 2  # lines of caption below each tile
+
+# Glyphs of 3 x 5 dots, rows from top to bottom:
+FONT = {
+    "0": "111101101101111", "1": "010110010010111", "2": "111001111100111",
+    "3": "111001111001111", "4": "101101111001001", "5": "111100111001111",
+    "6": "111100111101111", "7": "111001001001001", "8": "111101111101111",
+    "9": "111101111001111", "A": "010101111101101", "B": "110101110101110",
+    "C": "011100100100011", "D": "110101101101110", "E": "111100110100111",
+    "F": "111100110100100", "G": "011100101101011", "H": "101101111101101",
+    "I": "111010010010111", "J": "001001001101010", "K": "101101110101101",
+    "L": "100100100100111", "M": "101111111101101", "N": "110101101101101",
+    "O": "010101101101010", "P": "110101110100100", "Q": "010101101110011",
+    "R": "110101110101101", "S": "011100010001110", "T": "111010010010010",
+    "U": "101101101101111", "V": "101101101101010", "W": "101101111111101",
+    "X": "101101010101101", "Y": "101101010010010", "Z": "111001010100111",
+    " ": "000000000000000", "-": "000000111000000", "_": "000000000000111",
+    ".": "000000000000010", ":": "000010000010000", "/": "001001010100100",
+    "+": "000010111010000", "(": "010100100100010", ")": "010001001001010",
+    "=": "000111000111000", "|": "010010010010010", "?": "111001010000010",
+}
+
+
+class Sheet():
+    """ An RGB canvas to paste tiles and write captions into. """
+
+    def __init__(self, width, height, background=fingerprint_raster.WHITE):
+        self.width = width
+        self.height = height
+        self.pixels = bytearray(bytes(background) * (width * height))
+
+    def paste(self, x, y, width, rows):
+        """ Copy rows of RGB bytes (as of fingerprint_raster.raster). """
+        for offset, row in enumerate(rows):
+            start = 3 * ((y + offset) * self.width + x)
+            self.pixels[start:start + 3 * width] = row
+
+    def text(self, x, y, text, scale=TEXT_SCALE,
+             color=fingerprint_raster.BLACK, width=None):
+        """ Write text with the bitmap font; clip it to width pixels. """
+        dot = bytes(color) * scale
+        limit = self.width if width is None else min(self.width, x + width)
+        for character in text.upper():
+            if x + 3 * scale > limit:
+                break
+            glyph = FONT.get(character, FONT["?"])
+            for index, bit in enumerate(glyph):
+                if bit == "1":
+                    row, column = divmod(index, 3)
+                    for line in range(scale):
+                        start = 3 * ((y + row * scale + line) * self.width +
+                                     x + column * scale)
+                        self.pixels[start:start + 3 * scale] = dot
+            x += 4 * scale
+
+    def write(self, output_file):
+        """ Save the canvas as .png. """
+        stride = 3 * self.width
+        rows = [bytes(self.pixels[start:start + stride])
+                for start in range(0, len(self.pixels), stride)]
+        with open(output_file, mode="wb") as newfile:
+            newfile.write(
+                fingerprint_raster.png_bytes(self.width, self.height, rows))
+
+
+def caption_height(scale=TEXT_SCALE):
+    """ Report the height in pixels of the captions below a tile. """
+    return LINES * 7 * scale
+
+
+def _layout(count, side, columns):
+    """ Report the size of a sheet of count square tiles in columns. """
+    rows = int(math.ceil(count / float(columns)))
+    cell_width = side + 2 * MARGIN
+    cell_height = side + caption_height() + 2 * MARGIN
+    return cell_width, cell_height, columns * cell_width, rows * cell_height
+
+
+def _captioned(sheet, x, y, grid, values, name, table, z_min, z_max,
+               background):
+    """ Paste the tile of a map at (x, y), captioned below. """
+    width, _, rows = fingerprint_raster.raster(grid, values, table, z_min,
+                                               z_max, 1, background)
+    sheet.paste(x, y, width, rows)
+    line = 7 * TEXT_SCALE
+    sheet.text(x, y + width + TEXT_SCALE, name, width=width)
+    sheet.text(x, y + width + TEXT_SCALE + line, "{:.6f} {:.6f}".format(
+        min(values), max(values)), width=width)
+
+
+def _distinct(stacks, file_names):
+    """ Report the stacks of load_stacks once each, in order of files. """
+    distinct = []
+    for file_name in file_names:
+        stack = stacks[file_name]
+        if all(stack is not known for known in distinct):
+            distinct.append(stack)
+    return distinct
+
+
+def fingerprint_sheets(file_names, output_stem, table, z_min=0.0,
+                       z_max=0.08, per_page=PER_PAGE,
+                       background=fingerprint_raster.WHITE):
+    """ Lay out fingerprints of any format as tiles of contact sheets.
+
+    Fingerprints of the same grid share a sheet; the sheets are written
+    as output_stem_1.png, output_stem_2.png, ...  Report their names. """
+    stacks = fingerprint_io.load_stacks(file_names)
+    written = []
+    for stack in _distinct(stacks, file_names):
+        side = stack.grid.nbin
+        columns = int(math.ceil(math.sqrt(min(per_page, len(stack)))))
+        for first in range(0, len(stack), per_page):
+            page = range(first, min(first + per_page, len(stack)))
+            cell_width, cell_height, width, height = _layout(
+                len(page), side, columns)
+            sheet = Sheet(width, height)
+            for position, k in enumerate(page):
+                row, column = divmod(position, columns)
+                _captioned(sheet, column * cell_width + MARGIN,
+                           row * cell_height + MARGIN, stack.grid,
+                           stack.fingerprint(k),
+                           stack.names[k].rsplit(".", 1)[0], table, z_min,
+                           z_max, background)
+            written.append("{}_{}.png".format(output_stem, len(written) + 1))
+            sheet.write(written[-1])
+    return written
+
+
+def difference_sheets(file_names, output_stem, table, z_max=0.025,
+                      tile=fingerprint_pairs.TILE,
+                      background=fingerprint_raster.WHITE):
+    """ Lay out the difference maps of all pairs as the pair matrix.
+
+    Each sheet is a tile of the upper triangle of the pair matrix (see
+    fingerprint_pairs.tiles); row i, column j shows fingerprint i minus
+    fingerprint j.  Report the names of the sheets written. """
+    stacks = fingerprint_io.load_stacks(file_names)
+    written = []
+    for stack in _distinct(stacks, file_names):
+        side = stack.grid.nbin
+        stems = [name.rsplit(".", 1)[0] for name in stack.names]
+        for first_row, last_row, first_column, last_column in (
+                fingerprint_pairs.tiles(len(stack), tile)):
+            pairs = list(fingerprint_pairs.pairs_of(
+                (first_row, last_row, first_column, last_column)))
+            if not pairs:
+                continue
+            # without the empty row and column of a tile on the diagonal:
+            top = min(i for i, _ in pairs)
+            left = min(j for _, j in pairs)
+            rows = max(i for i, _ in pairs) - top + 1
+            columns = max(j for _, j in pairs) - left + 1
+            cell_width, cell_height, width, height = _layout(
+                rows * columns, side, columns)
+            sheet = Sheet(width, height)
+            for i, j in pairs:
+                row, column = i - top, j - left
+                _captioned(sheet, column * cell_width + MARGIN,
+                           row * cell_height + MARGIN, stack.grid,
+                           stack.difference(i, j),
+                           "{}/{}".format(stems[i], stems[j]), table,
+                           -z_max, z_max, background)
+            written.append("{}_{}.png".format(output_stem, len(written) + 1))
+            sheet.write(written[-1])
+    return written
+
@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+# name:    fingerprint_pairs.py
+# author:  nbehrnd@yahoo.com
+# license: GPL version 2
+# date:    2026-10-16 (YYYY-MM-DD)
+#
+""" All-pairs comparison of stacked fingerprints on a pool of processes.
+
+The number of pairs of N fingerprints grows as N (N - 1) / 2; for a library
+of 1,000 polymorphs, these are about half a million.  Thus, the upper
+triangle of the N x N pair matrix is split into square tiles processed by
+a pool of processes.  The side of a tile follows from N and the number of
+processes such that each process gets several tiles (at most TILE
+fingerprints per side); thus, a pool is used for a few fingerprints, too.
+Rather than to copy the stack of fingerprints
+(fingerprint_io.FingerprintStack) into each process, the stack is placed
+once into shared memory -- best already while reading the fingerprints
+(fingerprint_io.load_stacks(..., shared=True)), else as a copy.  Each
+process of the pool attaches to it, reads the rows of its tile and
+reports the difference numbers of the pairs, or writes their difference
+maps and reports their summaries (see
+fingerprint_engine.difference_summary).  Thus, the memory used does not
+grow with the number of processes.
+
+Pairs of sparse maps (fingerprint_io.SparseMap, read from .sdat) are not
+expanded into a stack; their differences only visit the bins populated in
+either map.  Sparse maps are small, they are copied once into each process
+of a pool.
+
+Like the other modules of the Python-only approach, this module only uses
+Python's standard library (multiprocessing.shared_memory requires Python
+3.8, or later). """
+
+import math
+import multiprocessing
+from multiprocessing import shared_memory
+
+import fingerprint_engine
+import fingerprint_io
+
+TILE = 16  # fingerprints per side of a tile of the pair matrix, at most
+TASKS_PER_JOB = 4  # tiles (or chunks of tasks) per process of a pool
+
+_STACK = None  # the stack in shared memory, as seen by a process of the pool
+_MAPS = None  # the sparse maps, as seen by a process of the pool
+
+
+def tiles(count, tile=TILE):
+    """ Split the upper triangle of a count x count pair matrix.
+
+    Report the tiles as (first row, last row + 1, first column, last
+    column + 1); tiles on the diagonal are triangles. """
+    for row in range(0, count, tile):
+        for column in range(row, count, tile):
+            yield (row, min(row + tile, count), column,
+                   min(column + tile, count))
+
+
+def tile_size(count, jobs, tile=TILE):
+    """ Choose the side of the tiles of a count x count pair matrix.
+
+    The about (count / side)**2 / 2 tiles are to yield TASKS_PER_JOB tiles
+    per process; the side is at most tile. """
+    if jobs <= 1:
+        return tile
+    side = int(math.ceil(count / math.sqrt(2.0 * TASKS_PER_JOB * jobs)))
+    return max(1, min(tile, side))
+
+
+def chunk_size(count, jobs, chunk=TILE):
+    """ Choose the number of tasks per chunk, like tile_size. """
+    if jobs <= 1:
+        return chunk
+    return max(1, min(chunk, int(math.ceil(count /
+                                           float(TASKS_PER_JOB * jobs)))))
+
+
+def pairs_of(tile):
+    """ Report the pairs (i, j) with i < j of a tile. """
+    first_row, last_row, first_column, last_column = tile
+    for i in range(first_row, last_row):
+        for j in range(max(first_column, i + 1), last_column):
+            yield i, j
+
+
+def _pool_setup(name, grid, names):
+    """ Rebuild the stack in each process of the pool from shared memory. """
+    global _STACK
+    memory = shared_memory.SharedMemory(name=name)
+    stack = fingerprint_io.FingerprintStack(grid)
+    stack.names = list(names)
+    stack.values = memory.buf[:8 * stack.size * len(names)].cast("d")
+    stack.memory = memory  # keep the block attached
+    _STACK = stack
+
+
+def _tile_numbers(tile):
+    """ Report (i, j, difference number) of all pairs of a tile. """
+    return [(i, j, _STACK.difference_number(i, j)) for i, j in pairs_of(tile)]
+
+
+def _sparse_setup(maps):
+    """ Keep the sparse maps in each process of the pool. """
+    global _MAPS
+    _MAPS = maps
+
+
+def _sparse_tile_numbers(tile):
+    """ Report (i, j, difference number) of all pairs of a tile. """
+    return [(i, j, _MAPS[i].difference_number(_MAPS[j]))
+            for i, j in pairs_of(tile)]
+
+
+def _write_maps(chunk):
+    """ Write the difference maps of a chunk of (i, j, output) tasks. """
+    return [(output, write_difference_map(_STACK, i, j, output))
+            for i, j, output in chunk]
+
+
+def write_difference_map(stack, i, j, output):
+    """ Write the difference of fingerprints i and j into file output.
+
+    The format follows the suffix of output, i.e. dense .dat or sparse
+    .sdat.  While the map is in memory, its difference number, positive
+    and negative sums and largest absolute difference are computed and
+    reported; the map need not be read again. """
+    difference = stack.difference(i, j)
+    if output.endswith(fingerprint_io.SPARSE_SUFFIX):
+        fingerprint_io.write_sparse(
+            output, fingerprint_io.SparseMap.from_dense(stack.grid,
+                                                        difference),
+            value_format="{:10.8f}")
+    else:
+        fingerprint_io.write_dat(output, stack.grid, difference,
+                                 value_format="{:10.8f}")
+    return fingerprint_engine.difference_summary(difference)
+
+
+def write_sparse_difference_map(reference, probe, output):
+    """ Write the difference of two SparseMaps as .sdat into output.
+
+    As write_difference_map, report the summary of the map; only the
+    bins populated in either map are visited. """
+    difference = reference.difference(probe)
+    fingerprint_io.write_sparse(output, difference, value_format="{:10.8f}")
+    return fingerprint_engine.difference_summary(difference.bins.values())
+
+
+class SharedPool():
+    """ A pool of processes sharing one stack of fingerprints. """
+
+    def __init__(self, stack, jobs):
+        """ Start the pool on the shared memory of the stack.
+
+        A stack not yet in shared memory is copied there, and the copy is
+        released with the pool. """
+        self.memory = None
+        memory = stack.memory
+        if memory is None:
+            size = 8 * len(stack.values)
+            memory = self.memory = shared_memory.SharedMemory(
+                create=True, size=max(size, 1))
+            memory.buf[:size] = memoryview(stack.values).cast("B")
+        try:
+            self.pool = multiprocessing.Pool(
+                jobs, _pool_setup,
+                (memory.name, stack.grid, tuple(stack.names)))
+        except BaseException:
+            self._release()
+            raise
+
+    def __enter__(self):
+        return self.pool
+
+    def __exit__(self, *exc_info):
+        self.pool.close()
+        self.pool.join()
+        self._release()
+
+    def _release(self):
+        if self.memory is not None:
+            self.memory.close()
+            self.memory.unlink()
+
+
+def difference_numbers(stack, jobs=1, tile=None):
+    """ Report {(i, j): difference number} of all pairs i < j of a stack.
+
+    With jobs > 1 (0: one per CPU), the tiles are distributed to a pool of
+    processes sharing the stack.  Without tile, its side is chosen by
+    tile_size. """
+    jobs = jobs or multiprocessing.cpu_count()
+    tasks = list(tiles(len(stack), tile or tile_size(len(stack), jobs)))
+    numbers = {}
+    if jobs == 1 or len(tasks) < 2:
+        for task in tasks:
+            for i, j in pairs_of(task):
+                numbers[(i, j)] = stack.difference_number(i, j)
+        return numbers
+
+    with SharedPool(stack, min(jobs, len(tasks))) as pool:
+        for results in pool.imap_unordered(_tile_numbers, tasks):
+            for i, j, number in results:
+                numbers[(i, j)] = number
+    return numbers
+
+
+def sparse_difference_numbers(maps, jobs=1, tile=None):
+    """ Report {(i, j): difference number} of all pairs i < j of SparseMaps.
+
+    The maps share one grid.  With jobs > 1 (0: one per CPU), the tiles
+    are distributed to a pool of processes, as by difference_numbers. """
+    jobs = jobs or multiprocessing.cpu_count()
+    tasks = list(tiles(len(maps), tile or tile_size(len(maps), jobs)))
+    numbers = {}
+    if jobs == 1 or len(tasks) < 2:
+        for task in tasks:
+            for i, j in pairs_of(task):
+                numbers[(i, j)] = maps[i].difference_number(maps[j])
+        return numbers
+
+    with multiprocessing.Pool(min(jobs, len(tasks)), _sparse_setup,
+                              (list(maps), )) as pool:
+        for results in pool.imap_unordered(_sparse_tile_numbers, tasks):
+            for i, j, number in results:
+                numbers[(i, j)] = number
+    return numbers
+
+
+def write_difference_maps(stack, tasks, jobs=1, chunk=None):
+    """ Write difference maps of a stack for tasks of (i, j, output).
+
+    With jobs > 1 (0: one per CPU), chunks of tasks (see chunk_size) are
+    distributed to a pool of processes sharing the stack.  The names of
+    the files written and the summaries of their maps are reported as
+    (output, summary) in the order of the tasks. """
+    jobs = jobs or multiprocessing.cpu_count()
+    chunk = chunk or chunk_size(len(tasks), jobs)
+    chunks = [tasks[start:start + chunk]
+              for start in range(0, len(tasks), chunk)]
+    if jobs == 1 or len(chunks) < 2:
+        return [(output, write_difference_map(stack, i, j, output))
+                for i, j, output in tasks]
+
+    written = []
+    with SharedPool(stack, min(jobs, len(chunks))) as pool:
+        for results in pool.imap(_write_maps, chunks):
+            written.extend(results)
+    return written
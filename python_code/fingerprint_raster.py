@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# name:    fingerprint_raster.py
+# author:  nbehrnd@yahoo.com
+# license: GPL version 2
+# date:    2026-10-16 (YYYY-MM-DD)
+#
+""" Draw fingerprints and difference maps directly as .png, without tools.
+
+A normalized fingerprint of the extended map range already is an image of
+261 x 261 bins.  Instead of plotting each bin as a point with gnuplot, or
+through a figure of matplotlib, each bin is colored by a lookup table and
+enlarged into a square of scale x scale pixels.  The lookup tables are
+interpolated from the palettes gnuplot uses (strings in pattern of 'set
+palette defined (...)', e.g. RAINBOW of hirshfeld_moderator.py), thus the
+colors match those of the gnuplot maps.  The image is written as an 8 bit
+RGB .png by zlib and struct.
+
+d_i runs from left to right, d_e from bottom to top, as in the maps by
+gnuplot.  Bins equal to zero are left in the background color; values
+beyond the color range are clipped.  Optionally, dashed lines mark the
+standard (0.40-2.60 A) and translated (0.80-3.00 A) map range.
+
+This module only uses Python's standard library. """
+
+import struct
+import zlib
+
+import fingerprint_io
+
+LEVELS = 256  # entries of a lookup table
+SCALE = 3  # pixels per bin, along each axis
+WHITE = (255, 255, 255)
+GRAY = (128, 128, 128)
+BLACK = (0, 0, 0)
+
+# The named colors used by the palettes of the moderator:
+NAMED_COLORS = {
+    "white": (255, 255, 255),
+    "black": (0, 0, 0),
+    "blue": (0, 0, 255),
+    "red": (255, 0, 0),
+    "light-gray": (211, 211, 211),
+    "gray": (190, 190, 190),
+}
+
+
+def parse_palette(definition):
+    """ Read gnuplot's 'set palette defined (...)' into (position, RGB).
+
+    Entries are either 'position red green blue' with components from 0
+    to 1, or 'position 'name'' with one of NAMED_COLORS. """
+    body = definition[definition.index("(") + 1:definition.rindex(")")]
+    palette = []
+    for entry in body.split(","):
+        fields = entry.split()
+        if not fields:
+            continue
+        position = float(fields[0])
+        if len(fields) == 2:
+            color = NAMED_COLORS[fields[1].strip("'\"")]
+        else:
+            color = tuple(
+                int(round(255 * float(component)))
+                for component in fields[1:4])
+        palette.append((position, color))
+    return palette
+
+
+def lookup_table(palette, levels=LEVELS):
+    """ Interpolate a palette linearly into levels RGB triples as bytes.
+
+    As gnuplot does, the positions are rescaled to span the color range,
+    the first entry meaning its lower, the last its upper end. """
+    first, last = palette[0][0], palette[-1][0]
+    span = (last - first) or 1.0
+    stops = [((position - first) / span, color)
+             for position, color in palette]
+    table = []
+    for level in range(levels):
+        fraction = level / float(levels - 1)
+        for (lower, color_0), (upper, color_1) in zip(stops, stops[1:]):
+            if fraction <= upper:
+                weight = 0.0
+                if upper > lower:
+                    weight = (fraction - lower) / (upper - lower)
+                table.append(bytes(
+                    int(round(c_0 + weight * (c_1 - c_0)))
+                    for c_0, c_1 in zip(color_0, color_1)))
+                break
+        else:
+            table.append(bytes(stops[-1][1]))
+    return table
+
+
+def png_bytes(width, height, rows):
+    """ Encode rows of RGB bytes as an 8 bit RGB .png. """
+
+    def chunk(kind, data):
+        return (struct.pack(">I", len(data)) + kind + data +
+                struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff))
+
+    raw = b"".join(b"\0" + row for row in rows)  # filter type 0 per row
+    return b"".join([
+        b"\x89PNG\r\n\x1a\n",
+        chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)),
+        chunk(b"IDAT", zlib.compress(raw, 6)),
+        chunk(b"IEND", b"")
+    ])
+
+
+def raster(grid, values, table, z_min, z_max, scale=SCALE,
+           background=WHITE, ranges=False):
+    """ Color the bins of a flat map; report width, height and rows.
+
+    Values are mapped linearly from z_min...z_max onto the lookup table. """
+    nbin = grid.nbin
+    levels = len(table)
+    factor = (levels - 1) / float(z_max - z_min)
+    blank = bytes(background)
+
+    marked = set()  # bins on the borders of the map ranges
+    if ranges:
+        for lower, upper, line in ((0.40, 2.60, 2.60), (0.80, 3.00, 0.80)):
+            if not grid.xmin - 1e-9 <= line <= grid.xmax + 1e-9:
+                continue
+            first, last = grid.indices(lower, upper)
+            border = grid.indices(line, line)[0]
+            for index in range(first, last, 2):
+                marked.add((index, border))
+                marked.add((border, index))
+
+    rows = []
+    for ide in range(nbin - 1, -1, -1):  # top row is the largest d_e
+        pixels = []
+        for idi in range(nbin):
+            value = values[idi * nbin + ide]
+            if (idi, ide) in marked:
+                color = bytes(BLACK)
+            elif value == 0.0:
+                color = blank
+            else:
+                level = int((value - z_min) * factor + 0.5)
+                color = table[min(max(level, 0), levels - 1)]
+            pixels.append(color * scale)
+        row = b"".join(pixels)
+        rows.extend([row] * scale)
+    return nbin * scale, nbin * scale, rows
+
+
+def write_map(file_name, output_file, table, z_min, z_max, scale=SCALE,
+              background=WHITE, ranges=False):
+    """ Draw a map of any format (.dat, .sdat, .fpb) into a .png.
+
+    Report the least and the largest value of the map. """
+    grid, values = fingerprint_io.read_dense(file_name)
+    width, height, rows = raster(grid, values, table, z_min, z_max, scale,
+                                 background, ranges)
+    with open(output_file, mode="wb") as newfile:
+        newfile.write(png_bytes(width, height, rows))
+    return min(values), max(values)
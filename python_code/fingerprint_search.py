@@ -0,0 +1,363 @@
+#!/usr/bin/env python
+# name:    fingerprint_search.py
+# author:  nbehrnd@yahoo.com
+# license: GPL version 2
+# date:    2026-10-16 (YYYY-MM-DD)
+#
+""" Nearest neighbours of a fingerprint in a library, by difference number.
+
+Which structures of a library (see fingerprint_library.py) are closest to
+a new one?  Comparing a query with each of 100k fingerprints at 68,121
+bins is slow.  Instead, each fingerprint of the library is summed up once
+over blocks of bins, the pyramid of fingerprint_engine.pyramid topped by
+one coarser level:
+
++ blocks of 32 x 32 bins (9 x 9 blocks on the extended grid),
++ blocks of 8 x 8 bins (0.08 A, 33 x 33 blocks),
++ blocks of 4 x 4 bins (0.04 A, 66 x 66 blocks),
++ blocks of 2 x 2 bins (0.02 A, 131 x 131 blocks).
+
+As the L1 distance of block sums never exceeds the one of the full maps,
+these coarse maps yield lower bounds of the difference number.  Further,
+the index records the difference numbers of all entries to a few pivots,
+entries of the library far apart from each other.  As the difference
+number is a metric, |d(query, pivot) - d(entry, pivot)| equally is a lower
+bound of d(query, entry).  Per pivot, the index equally keeps the entries
+sorted by their difference number to it.
+
+A query is first compared with the pivots.  Around the query's difference
+number to the closest pivot, the entries sorted by this pivot are visited
+outwards in both directions (bisect), i.e. in increasing order of the
+bound by this pivot.  Only the entries visited are bounded by the other
+pivots and the coarsest level, and these candidates are compared level by
+level from 0.08 A to 0.02 A, and only if still promising, on the full grid
+-- in the order of their bounds.  The search stops as soon as neither the
+bound of the next candidate, nor the one of the next entry by the pivot
+are below the k-th best difference number found; the result is exact,
+without visiting the entries far from the query.
+
+The coarse maps are kept in an index file (.fpi) next to the library,
+level after level, and memory-mapped; the index is rebuilt if the library
+changes.  Like the other modules of the
+Python-only approach, this module only uses Python's standard library. """
+
+import array
+import bisect
+import heapq
+import mmap
+import operator
+import os
+import shutil
+import struct
+import sys
+
+import fingerprint_engine
+import fingerprint_io
+import fingerprint_library
+
+INDEX_SUFFIX = ".fpi"
+INDEX_VERSION = 3
+TOP_FACTOR = 4  # blocks of the coarsest pyramid level summed per side
+PIVOTS = 4
+# magic, version, byte order (0: little, 1: big), top factor, levels of
+# the pyramid, number of pivots, number of fingerprints, size and
+# modification time of the library:
+INDEX_HEADER = struct.Struct("<4sHBxHHHIQd")
+LEVELS_OFFSET = 64  # the header padded
+
+
+def distance(first, second):
+    """ Report the L1 distance of two flat maps (the difference number). """
+    return sum(map(abs, map(operator.sub, first, second)))
+
+
+def coarse_maps(values, nbin, pyramid=None):
+    """ Report the levels of the index of a map, coarsest first.
+
+    A pyramid already known (e.g., read from a .fpb) is used as is. """
+    pyramid = pyramid or fingerprint_engine.pyramid(values, nbin)
+    top = fingerprint_engine.block_sums(pyramid[-1][0], pyramid[-1][1],
+                                        TOP_FACTOR)
+    return [coarse for coarse, _ in [top] + pyramid[::-1]]
+
+
+def level_sizes(nbin):
+    """ Report the number of bins per map of each level of the index. """
+    sizes = []
+    for _ in range(fingerprint_engine.PYRAMID_LEVELS):
+        nbin = (nbin + 1) // 2
+        sizes.insert(0, nbin * nbin)
+    top = (nbin + TOP_FACTOR - 1) // TOP_FACTOR
+    return [top * top] + sizes
+
+
+def choose_pivots(level, count, number):
+    """ Pick entries far apart from each other, judged by a coarse level.
+
+    Starting with the first entry, each next pivot is the entry farthest
+    from all pivots chosen so far. """
+    if count == 0:
+        return []
+    size = len(level) // count
+    rows = [level[k * size:(k + 1) * size] for k in range(count)]
+    pivots = [0]
+    closest = [distance(rows[0], row) for row in rows]
+    while len(pivots) < number:
+        pivot = max(range(count), key=closest.__getitem__)
+        if closest[pivot] == 0.0:
+            break  # i.e., no further distinct entry
+        pivots.append(pivot)
+        closest = [min(known, distance(rows[pivot], row))
+                   for known, row in zip(closest, rows)]
+    return pivots
+
+
+def _stamp(library_file):
+    status = os.stat(library_file)
+    return status.st_size, status.st_mtime
+
+
+def build_index(library_file, index_file=None):
+    """ Write the coarse maps of all fingerprints of a library.
+
+    Each level is written into a file of its own first, and finally all
+    are joined; thus, the memory used does not grow with the library. """
+    index_file = index_file or (os.path.splitext(library_file)[0] +
+                                INDEX_SUFFIX)
+    temporary = "{}.{}".format(index_file, os.getpid())
+    with fingerprint_library.Library(library_file) as library:
+        stack = library.stack
+        nbin = library.grid.nbin
+        count = len(library)
+        parts = ["{}.{}".format(temporary, level)
+                 for level in range(len(level_sizes(nbin)))]
+        top = array.array("d")
+        outputs = [open(part, mode="wb") for part in parts]
+        try:
+            with memoryview(stack.values) as view:
+                for k in range(count):
+                    row = view[k * stack.size:(k + 1) * stack.size]
+                    levels = coarse_maps(row, nbin)
+                    row.release()
+                    top.extend(levels[0])
+                    for output, level in zip(outputs, levels):
+                        level.tofile(output)
+        finally:
+            for output in outputs:
+                output.close()
+
+        pivots = choose_pivots(top, count, min(PIVOTS, count))
+        pivot_distances = array.array("d")
+        with memoryview(stack.values) as view:
+            for k in range(count):
+                row = view[k * stack.size:(k + 1) * stack.size]
+                pivot_distances.extend(
+                    distance(row, view[pivot * stack.size:(pivot + 1) *
+                                       stack.size]) for pivot in pivots)
+                row.release()
+        orders = array.array("i")
+        for j in range(len(pivots)):
+            orders.extend(sorted(
+                range(count),
+                key=lambda k: pivot_distances[k * len(pivots) + j]))
+
+    with open(temporary, mode="wb") as newfile:
+        size, mtime = _stamp(library_file)
+        newfile.write(
+            INDEX_HEADER.pack(b"HSFI", INDEX_VERSION, sys.byteorder == "big",
+                              TOP_FACTOR, fingerprint_engine.PYRAMID_LEVELS,
+                              len(pivots), count, size,
+                              mtime).ljust(LEVELS_OFFSET, b"\0"))
+        for part in parts:
+            with open(part, mode="rb") as source:
+                shutil.copyfileobj(source, newfile)
+            os.remove(part)
+        array.array("i", pivots).tofile(newfile)
+        pivot_distances.tofile(newfile)
+        orders.tofile(newfile)
+    os.replace(temporary, index_file)
+    return index_file
+
+
+class Index():
+    """ A library of fingerprints with the coarse maps of its index. """
+
+    def __init__(self, library_file, index_file=None):
+        """ Open library and index; (re)build the index if necessary. """
+        self.index_file = index_file or (os.path.splitext(library_file)[0] +
+                                         INDEX_SUFFIX)
+        if not self._current(library_file):
+            build_index(library_file, self.index_file)
+        self.library = fingerprint_library.Library(library_file)
+        self.names = self.library.names
+
+        count = len(self.library)
+        self.sizes = level_sizes(self.library.grid.nbin)
+        self._source = open(self.index_file, mode="rb")
+        pivots = INDEX_HEADER.unpack(self._source.read(INDEX_HEADER.size))[5]
+        self._buffer = mmap.mmap(self._source.fileno(), 0,
+                                 access=mmap.ACCESS_READ)
+
+        # the levels are mapped, the pivots read:
+        self.levels = []
+        offset = LEVELS_OFFSET
+        for size in self.sizes:
+            self.levels.append(
+                memoryview(self._buffer)[offset:offset + 8 * count *
+                                         size].cast("d"))
+            offset += 8 * count * size
+        self._source.seek(offset)
+        self.pivots = array.array("i")
+        self.pivots.fromfile(self._source, pivots)
+        self.pivot_distances = array.array("d")
+        self.pivot_distances.fromfile(self._source, count * pivots)
+
+        # per pivot, the entries sorted by their distance to it:
+        self.orders = []
+        self.sorted_distances = []
+        for j in range(pivots):
+            order = array.array("i")
+            order.fromfile(self._source, count)
+            self.orders.append(order)
+            self.sorted_distances.append(array.array(
+                "d", [self.pivot_distances[k * pivots + j] for k in order]))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """ Release the levels, the index and the library. """
+        for level in self.levels:
+            level.release()
+        self._buffer.close()
+        self._source.close()
+        self.library.close()
+
+    def _current(self, library_file):
+        """ Check if the index exists and matches the library. """
+        try:
+            with open(self.index_file, mode="rb") as source:
+                (magic, version, big_endian, top_factor, levels, _, _, size,
+                 mtime) = INDEX_HEADER.unpack(source.read(INDEX_HEADER.size))
+        except (IOError, OSError, struct.error):
+            return False
+        return (magic == b"HSFI") and (version == INDEX_VERSION) and (
+            big_endian == (sys.byteorder == "big")) and (
+                (top_factor, levels) == (
+                    TOP_FACTOR, fingerprint_engine.PYRAMID_LEVELS)) and (
+                        (size, mtime) == _stamp(library_file))
+
+    def nearest(self, query, top=5, pyramid=None):
+        """ Report the top entries closest to a flat map on the same grid.
+
+        Returns a list of (difference number, name) in increasing order,
+        and the number of full comparisons needed. """
+        stack = self.library.stack
+        nbin = self.library.grid.nbin
+        if len(query) != stack.size:
+            raise ValueError("The query is not on {}.".format(
+                self.library.grid))
+        query_levels = coarse_maps(query, nbin, pyramid)
+
+        best = []  # heap of (-difference number, k) of the top entries
+        full = 0
+        with memoryview(stack.values) as view:
+            to_pivots = [
+                distance(query,
+                         view[pivot * stack.size:(pivot + 1) * stack.size])
+                for pivot in self.pivots
+            ]
+            full += len(to_pivots)
+            for pivot, number in zip(self.pivots, to_pivots):
+                heapq.heappush(best, (-number, pivot))
+            best = heapq.nlargest(top, best)  # the closest pivots
+            heapq.heapify(best)
+
+            candidates = []  # heap of (bound, k) of the entries visited
+            for bound, k in self._visited(to_pivots):
+                # compare the candidates not above the next bound by pivot:
+                while candidates and (bound is None or
+                                      candidates[0][0] <= bound):
+                    if len(best) == top and candidates[0][0] >= -best[0][0]:
+                        break
+                    _, candidate = heapq.heappop(candidates)
+                    if len(best) == top and self._pruned(
+                            query_levels, candidate, -best[0][0]):
+                        continue
+                    number = distance(
+                        query, view[candidate * stack.size:(candidate + 1) *
+                                    stack.size])
+                    full += 1
+                    if len(best) < top:
+                        heapq.heappush(best, (-number, candidate))
+                    elif number < -best[0][0]:
+                        heapq.heapreplace(best, (-number, candidate))
+                if bound is None or (len(best) == top and
+                                     bound >= -best[0][0]):
+                    break
+                heapq.heappush(candidates, (self._bound(
+                    query_levels[0], to_pivots, k), k))
+        return [(-number, self.names[k])
+                for number, k in sorted(best, reverse=True)], full
+
+    def _visited(self, to_pivots):
+        """ Report (bound by the closest pivot, k) in increasing order.
+
+        The entries sorted by their distance to the pivot closest to the
+        query are visited outwards from the query's distance to it; the
+        pivots themselves are skipped.  (None, None) closes the list. """
+        if to_pivots:
+            j = min(range(len(to_pivots)), key=to_pivots.__getitem__)
+            order, distances = self.orders[j], self.sorted_distances[j]
+            center = to_pivots[j]
+            upper = bisect.bisect_left(distances, center)
+            lower = upper - 1
+            while lower >= 0 or upper < len(order):
+                below = center - distances[lower] if lower >= 0 else None
+                above = (distances[upper] - center
+                         if upper < len(order) else None)
+                if above is None or (below is not None and below <= above):
+                    bound, k = below, order[lower]
+                    lower -= 1
+                else:
+                    bound, k = above, order[upper]
+                    upper += 1
+                if k not in self.pivots:
+                    yield bound, k
+        yield None, None
+
+    def _bound(self, coarse, to_pivots, k):
+        """ Bound d(query, entry k) by all pivots and the coarsest level. """
+        size = self.sizes[0]
+        pivots = len(to_pivots)
+        bound = distance(coarse, self.levels[0][k * size:(k + 1) * size])
+        for known, number in zip(
+                self.pivot_distances[k * pivots:(k + 1) * pivots], to_pivots):
+            bound = max(bound, abs(known - number))
+        return bound
+
+    def _pruned(self, query_levels, k, limit):
+        """ Check if entry k is not closer than limit, level by level. """
+        for size, level, coarse in zip(self.sizes[1:], self.levels[1:],
+                                       query_levels[1:]):
+            if distance(coarse, level[k * size:(k + 1) * size]) >= limit:
+                return True
+        return False
+
+
+def nearest(library_file, query_file, top=5):
+    """ Report the top fingerprints of a library closest to a query file.
+
+    The query is a fingerprint of any format on the grid of the library. """
+    grid, query = fingerprint_io.read_dense(query_file)
+    pyramid = None
+    if query_file.endswith(fingerprint_io.BINARY_SUFFIX):
+        pyramid = fingerprint_io.read_pyramid(query_file)[1]
+    with Index(library_file) as index:
+        if grid != index.library.grid:
+            raise ValueError("{} is not on {}.".format(query_file,
+                                                       index.library.grid))
+        return index.nearest(query, top, pyramid)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+# name:    gnuplot_session.py
+# author:  nbehrnd@yahoo.com
+# license: GPL version 2
+# date:    2026-10-16 (YYYY-MM-DD)
+#
+""" One gnuplot process, fed by a pipe, to render any number of maps.
+
+Calling 'gnuplot -e "..."' per map starts a new process (and a shell) for
+each of them.  Instead, a GnuplotSession keeps one gnuplot running and
+writes the commands of map after map into its standard input.  The data of
+a map are read by fingerprint_io.py (any of .dat, .sdat, .fpb) and passed
+as a datablock of the non-zero bins only, e.g.
+
+$map << EOD
+0.52 1.31 0.00123456
+...
+EOD
+
+Thus, gnuplot neither parses the zero bins nor needs a 'stats' pass; the
+least and largest value of the map are reported by map_datablock.  After
+the commands of a map, the session asks gnuplot to print a marker and
+waits for it; hence, the image is complete once render() returns.
+
+As a high resolution map takes seconds to render, a SessionPool keeps a
+bounded number of sessions and renders as many maps at once, each by a
+thread of its own waiting for its gnuplot; the maps are reported in the
+order given.
+
+This module only uses Python's standard library; gnuplot (version 5.2,
+or later) needs to be on the PATH. """
+
+import concurrent.futures
+import queue
+import subprocess
+
+import fingerprint_io
+
+MARKER = "gnuplot_session done"
+
+
+def map_datablock(file_name, name="$map"):
+    """ Convert a map of any format into a datablock of its non-zero bins.
+
+    Report the text of the datablock, and the least and the largest value
+    of all bins (zero included) of the map. """
+    grid, values = fingerprint_io.read_dense(file_name)
+    labels = grid.labels()
+    nbin = grid.nbin
+    lines = ["{} << EOD\n".format(name)]
+    for index, value in enumerate(values):
+        if value != 0.0:
+            idi, ide = divmod(index, nbin)
+            lines.append("{} {} {!r}\n".format(labels[idi], labels[ide],
+                                                value))
+    lines.append("EOD\n")
+    if len(values) == 0:
+        return "".join(lines), 0.0, 0.0
+    return "".join(lines), min(values), max(values)
+
+
+class GnuplotSession():
+    """ A gnuplot process kept open to render maps one after the other. """
+
+    def __init__(self, executable="gnuplot"):
+        """ Start gnuplot; its error messages are shown as usual. """
+        self.process = subprocess.Popen([executable],
+                                        stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE,
+                                        universal_newlines=True)
+        self.rendered = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def send(self, commands):
+        """ Pass commands (lines, or separated by ';') to gnuplot. """
+        self.process.stdin.write(commands.rstrip("\n") + "\n")
+
+    def render(self, commands, datablock=""):
+        """ Define a datablock, run the commands of one image, and wait.
+
+        The output is closed, and the session reset (the datablock
+        included) for the next image. """
+        self.send(datablock)
+        self.send(commands)
+        self.rendered += 1
+        self.send("unset output; reset session; set print '-'; "
+                  "print '{} {}'; set print".format(MARKER, self.rendered))
+        self.process.stdin.flush()
+        expected = "{} {}".format(MARKER, self.rendered)
+        for line in self.process.stdout:
+            if line.strip() == expected:
+                return
+        raise RuntimeError("gnuplot stopped unexpectedly.")
+
+    def close(self):
+        """ Quit gnuplot and wait for the process to end. """
+        try:
+            self.send("exit")
+            self.process.stdin.close()
+        except (IOError, OSError):
+            pass  # i.e., gnuplot already stopped
+        self.process.wait()
+
+
+class SessionPool():
+    """ A bounded number of gnuplot sessions rendering maps at once. """
+
+    def __init__(self, jobs=1, executable="gnuplot"):
+        """ Start jobs sessions (at least one). """
+        self.jobs = max(jobs, 1)
+        self.idle = queue.Queue()
+        self.sessions = []
+        try:
+            for _ in range(self.jobs):
+                session = GnuplotSession(executable)
+                self.sessions.append(session)
+                self.idle.put(session)
+        except BaseException:
+            self.close()
+            raise
+        self.executor = concurrent.futures.ThreadPoolExecutor(self.jobs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.executor.shutdown()
+        self.close()
+
+    def close(self):
+        """ Quit all sessions. """
+        for session in self.sessions:
+            session.close()
+
+    def map(self, function, items):
+        """ Call function(session, item) with an idle session per item.
+
+        Report (item, result of the function) in the order of the items,
+        each once rendered.  The results thus may be written in this order
+        by the caller, whichever session finished first. """
+
+        def run(item):
+            session = self.idle.get()
+            try:
+                result = function(session, item)
+            finally:
+                self.idle.put(session)
+            return item, result
+
+        return self.executor.map(run, items)
@@ -33,9 +33,11 @@ a fall-back alternative -- to Python's matplotlib library to yield bitmap
 script relies on matplotlib and numpy; which both are not in the Python's
 standard library.
 
-Written for the CLI in Linux, the script equally works in Windows with
-Python 3.6.9, Python 2.7.17, and pypy 7.3.0.  The script's help menu may
-be accessed by
+Written for the CLI in Linux, the script equally works in Windows.  It
+requires Python 3.8, or later (or a pypy implementing Python 3.8, or
+later), for the shared memory, process pools and atomic replacement of
+files the Python-only approach uses; Python 2 is no longer supported.
+The script's help menu may be accessed by
 
 python hirshfeld_moderator.py -h
 
@@ -55,14 +57,21 @@ For additional details about using the program, please read the separate
 documentation. """
 
 import argparse
+import concurrent.futures
+import csv
 import fnmatch
-import math
+import functools
+import itertools
+import multiprocessing
 import os
 import platform
 import shutil
 import subprocess as sub
 import sys
 
+# suffixes of fingerprint and difference maps, in order of preference:
+from fingerprint_io import BINARY_SUFFIX, MAP_SUFFIXES, SPARSE_SUFFIX
+
 
 # Section A:  .cxs file management:
 def create_workshop():
@@ -250,8 +259,40 @@ def shuttle_f90():
         pass
 
 
-def fingerprint_fortran():
-    """ Generate extended normalized 2D fingerprint .dat of all .cxs """
+# Grids (xmin, xmax, dx) known to fingerprint.f90 by the name of the range:
+FORTRAN_RANGES = {
+    (0.4, 2.6, 0.01): "standard",
+    (0.8, 3.0, 0.01): "translated",
+    (0.4, 3.0, 0.01): "extended",
+}
+
+
+def fortran_range(GRID=None):
+    """ Name the range of fingerprint.f90 matching GRID (xmin, xmax, dx). """
+    if GRID is None:
+        return "extended"
+    map_range = FORTRAN_RANGES.get(tuple(round(x, 6) for x in GRID))
+    if map_range is None:
+        print("\nfingerprint.f90 only knows the standard, translated and")
+        print("extended map range at 0.01 A.  Use the Python path (-n).")
+        sys.exit(0)
+    return map_range
+
+
+def shell_job(command):
+    """ Run one instance of fingerprint.x or diff_finger, report its output.
+
+    The output (stdout and stderr) is reported as text. """
+    child = sub.Popen(command, shell=True, stdout=sub.PIPE,
+                      stderr=sub.STDOUT, universal_newlines=True)
+    return child.communicate()[0]
+
+
+def fingerprint_fortran(MAP_RANGE="extended", JOBS=1):
+    """ Generate normalized 2D fingerprint .dat of all .cxs by Fortran.
+
+    With JOBS > 1 (0: one per CPU), as many instances of fingerprint.x
+    run at once; their output is reported in the order of the files. """
     print("\nNormalization of .cxs files yielding 2D fingerprint .dat:")
     root = os.getcwd()
     os.chdir("cxs_workshop")
@@ -262,18 +303,27 @@ def fingerprint_fortran():
             register.append(file)
     register.sort()
 
+    commands = []
     for entry in register:
         dat_file = str(entry)[:-4] + str(".dat")
         # clause for Linux-based computers:
         if platform.system().startswith("Linux"):
-            normalize = str("./fingerprint.x {} extended {}".format(
-                entry, dat_file))
+            normalize = str("./fingerprint.x {} {} {}".format(
+                entry, MAP_RANGE, dat_file))
         # clause for Windows-based computers:
         if platform.system().startswith("Windows"):
-            normalize = str("fingerprint.x {} extended {}".format(
-                entry, dat_file))
-
-        sub.call(normalize, shell=True)
+            normalize = str("fingerprint.x {} {} {}".format(
+                entry, MAP_RANGE, dat_file))
+        commands.append(normalize)
+
+    JOBS = JOBS or multiprocessing.cpu_count()
+    if JOBS == 1:
+        for normalize in commands:
+            sub.call(normalize, shell=True)
+    else:
+        with concurrent.futures.ThreadPoolExecutor(JOBS) as executor:
+            for report in executor.map(shell_job, commands):
+                sys.stdout.write(report)
     if platform.system().startswith("Linux"):
         try:
             os.remove("fingerprint.x")
@@ -283,16 +333,35 @@ def fingerprint_fortran():
     print("\nNormalization of .cxs files is completed.")
 
 
-def fingerprint_python():
+def fingerprint_python(USE_CACHE=True, GRID=None, OUTPUT_FORMAT="dat",
+                       JOBS=1, DECOMPOSE=False, PROPERTIES=False):
     """ Normalized 2D Hirshfeld surface fingerprints, computed by Python.
 
-    Requires presence of both moderator and 'fingerprint_kahan.py'. """
+    Requires presence of the moderator, 'fingerprint_kahan.py' and its
+    assistants 'cxs_reader.py', 'surface_cache.py', 'file_digest.py',
+    'fingerprint_engine.py' and 'fingerprint_io.py'.  Unless USE_CACHE is
+    False, sections parsed from the .cxs are reused in later runs.  GRID
+    (xmin, xmax, dx) in A replaces the default extended map range
+    0.40(0.01)3.00 A.  The OUTPUT_FORMAT is either "dat", "sparse" (only
+    the non-zero bins, as .sdat), or "binary" (.fpb with metadata).  With
+    JOBS > 1 (0: one per CPU), the .cxs are distributed to as many
+    processes.  With DECOMPOSE, fingerprints per pair of elements (e.g.,
+    O...H) and their contributions are written into the sub-folder
+    'decomposed', too.  With PROPERTIES, the area-weighted histograms of
+    d_norm, shape index and curvedness are written into the sub-folder
+    'properties'. """
 
     print("Python-based computation of normalized 2D Hirshfeld fingerprints.")
     try:
         os.chdir("cxs_workshop")
+        import fingerprint_engine
         import fingerprint_kahan
-        fingerprint_kahan.main()
+        grid = None
+        if GRID is not None:
+            grid = fingerprint_engine.Grid(*GRID)
+        fingerprint_kahan.main(use_cache=USE_CACHE, grid=grid,
+                               output_format=OUTPUT_FORMAT, jobs=JOBS,
+                               decompose=DECOMPOSE, properties=PROPERTIES)
     except IOError:
         print("""\nLacking script 'fingerprint_Kahan.py' in the same folder
         as the moderator script, the computation could not be performed. """)
@@ -340,8 +409,11 @@ def shuttle_c():
             sys.exit(0)
 
 
-def difference_maps_c():
-    """ Compare the 2D fingerprints with each other, C script. """
+def difference_maps_c(JOBS=1):
+    """ Compare the 2D fingerprints with each other, C script.
+
+    With JOBS > 1 (0: one per CPU), as many instances of diff_finger run
+    at once (as fingerprint.x by fingerprint_fortran). """
     print("\nComputation of difference maps (C script) starts:")
     os.chdir("cxs_workshop")
     fingerprint_register = []
@@ -351,6 +423,7 @@ def difference_maps_c():
             fingerprint_register.append(file)
     fingerprint_register.sort()
 
+    commands = []
     while len(fingerprint_register) > 1:
         for entry in fingerprint_register[1:]:
             reference_map = fingerprint_register[0]
@@ -366,12 +439,22 @@ def difference_maps_c():
             if platform.system().startswith("Windows"):
                 difference_test = str("diff_finger.exe {} {} > {}".format(
                     reference_map, test_map, difference_map))
+            commands.append((difference_test, difference_map))
+
+        del fingerprint_register[0]
+
+    JOBS = JOBS or multiprocessing.cpu_count()
+    if JOBS == 1:
+        for difference_test, difference_map in commands:
             try:
                 sub.call(difference_test, shell=True)
             except IOError:
                 print("Problem to compute {}.".format(difference_map))
-
-        del fingerprint_register[0]
+    else:
+        with concurrent.futures.ThreadPoolExecutor(JOBS) as executor:
+            for report in executor.map(
+                    shell_job, [command for command, _ in commands]):
+                sys.stdout.write(report)
     print("\nComputation of difference maps is completed.")
     if platform.system().startswith("Linux"):
         try:
@@ -385,79 +468,395 @@ def difference_maps_c():
             pass
 
 
-def difference_maps_python():
-    """ Compute difference maps by Python without numpy. """
+def one_per_stem(files):
+    """ Keep one map per stem of the files given, sorted by name.
+
+    If a map exists in more than one format, the binary .fpb is preferred
+    over the sparse .sdat, and this over the dense .dat. """
+    register = {}
+    for file in files:
+        stem, suffix = os.path.splitext(file)
+        known = register.get(stem)
+        if known is None or (MAP_SUFFIXES.index(suffix) <
+                             MAP_SUFFIXES.index(os.path.splitext(known)[1])):
+            register[stem] = file
+    return sorted(register.values())
+
+
+def fingerprint_register():
+    """ List the fingerprint maps in the current folder, one per stem. """
+    return one_per_stem(
+        file for file in os.listdir(".")
+        if file.endswith(MAP_SUFFIXES) and not file.startswith("diff"))
+
+
+def selected_pairs(diff_register, PAIRS=None):
+    """ Report the pairs of fingerprints to compare.
+
+    Without PAIRS, these are all pairs of the register.  Else, PAIRS lists
+    (reference, probe) by file name with or without suffix; pairs naming
+    a fingerprint not in the register are reported and skipped. """
+    if PAIRS is None:
+        return list(itertools.combinations(diff_register, 2))
+
+    by_stem = dict((os.path.splitext(file)[0], file) for file in diff_register)
+    pairs = []
+    for pair in PAIRS:
+        files = [
+            by_stem.get(name, by_stem.get(os.path.splitext(name)[0]))
+            for name in pair
+        ]
+        if None in files:
+            print("Pair {} ./. {} is not accessible.".format(*pair))
+            continue
+        pairs.append(tuple(files))
+    return pairs
+
+
+def difference_maps_python(PAIRS=None, JOBS=1,
+                           SUMMARY="difference_summary.csv"):
+    """ Compute difference maps by Python without numpy.
+
+    Each fingerprint is read only once; fingerprints of the same grid are
+    stacked into one array (see fingerprint_io.FingerprintStack) and all
+    pairs -- or only those listed in PAIRS -- are subtracted from memory.
+    Maps of different grids are not compared.  Difference maps are written
+    as dense diff_*.dat; if either of the two maps compared is a sparse
+    .sdat, as sparse diff_*.sdat.  Pairs of two .sdat are subtracted on
+    their populated bins only, without expanding them into the stack.
+    With JOBS > 1 (0: one per CPU), the maps are written by a pool of
+    processes (see fingerprint_pairs.py).
+
+    While computing a map, its difference number, the sums of positive
+    and negative differences and the largest absolute difference are
+    collected, too; they are listed in the .csv SUMMARY instead of reading
+    the maps again (as -r does). """
+    import fingerprint_io
+    import fingerprint_pairs
+
     # identify the files to work with:
     os.chdir("cxs_workshop")
-    diff_register = []
-
-    for file in os.listdir("."):
-        if file.endswith(".dat") and (file.startswith("diff") is False):
-            diff_register.append(file)
-    diff_register.sort()
+    pairs = selected_pairs(fingerprint_register(), PAIRS)
+    sparse_pairs = set(
+        pair for pair in pairs
+        if all(file.endswith(SPARSE_SUFFIX) for file in pair))
+    diff_register = sorted(set(file for pair in pairs for file in pair
+                               if pair not in sparse_pairs))
+    sparse_register = sorted(set(file for pair in sparse_pairs
+                                 for file in pair))
 
     # compare the normalized 2D Hirshfeld surface maps
     print("\nComputation of difference maps (Python) starts:")
-    while len(diff_register) > 1:
-        for entry in diff_register[1:]:
-            reference_file = diff_register[0]
-            probe_file = entry
-            print("Comparison {} ./. {}.".format(reference_file, probe_file))
-
-            reference_map = []
-            probe_map = []
-
-            reference = open(reference_file, mode="r")
-            reference_map = reference.readlines()
-            reference.close()
-
-            probe = open(probe_file, mode="r")
-            probe_map = probe.readlines()
-            probe.close()
-
-            # consistency check for de/di
-            start_reference_map = " ".join([
-                reference_map[0].strip().split()[0],
-                reference_map[1].strip().split()[0]
-            ])
-            start_probe_map = " ".join([
-                probe_map[0].strip().split()[0],
-                probe_map[1].strip().split()[0]
-            ])
-
-            line_count_reference_map = len(reference_map)
-            line_count_probe_map = len(probe_map)
-
-            if (start_reference_map == start_probe_map) and \
-                    (line_count_reference_map == line_count_probe_map):
-                pass  # i.e., interesting, inspect the current two .dat.
+    stacks = fingerprint_io.load_stacks(diff_register, shared=JOBS != 1)
+    sparse_maps = dict(
+        (file, fingerprint_io.read_sparse(file)) for file in sparse_register)
+    summaries = {}
+    tasks = {}  # per stack, (reference, probe, output)
+    for reference_file, probe_file in pairs:
+        print("Comparison {} ./. {}.".format(reference_file, probe_file))
+
+        # the permanent record:
+        output = "".join([
+            "diff_",
+            os.path.splitext(reference_file)[0], "_",
+            os.path.splitext(probe_file)[0]
+        ])
+        if SPARSE_SUFFIX in (os.path.splitext(reference_file)[1],
+                             os.path.splitext(probe_file)[1]):
+            output += fingerprint_io.SPARSE_SUFFIX
+        else:
+            output += fingerprint_io.DAT_SUFFIX
+
+        if (reference_file, probe_file) in sparse_pairs:
+            reference = sparse_maps[reference_file]
+            probe = sparse_maps[probe_file]
+            if reference.grid == probe.grid:
+                summaries[output] = (
+                    fingerprint_pairs.write_sparse_difference_map(
+                        reference, probe, output))
+            continue
+
+        stack = stacks.get(reference_file)
+        if stack is not stacks.get(probe_file):
+            continue  # i.e., incompatible, probe the next permutation.
+        tasks.setdefault(id(stack), (stack, []))[1].append(
+            (stack.position(reference_file), stack.position(probe_file),
+             output))
+
+    try:
+        for stack, stack_tasks in tasks.values():
+            summaries.update(fingerprint_pairs.write_difference_maps(
+                stack, stack_tasks, JOBS))
+    finally:
+        fingerprint_io.release_stacks(stacks)
+    if not summaries:
+        return
+
+    print("\n{:<40}{:>10}{:>10}{:>10}{:>12}".format(
+        "difference map", "number", "positive", "negative", "max |d|"))
+    with open(SUMMARY, mode="w") as newfile:
+        writer = csv.writer(newfile, lineterminator="\n")
+        writer.writerow(["difference_map", "difference_number",
+                         "positive_sum", "negative_sum", "max_abs"])
+        for output in sorted(summaries):
+            number, positive, negative, largest = summaries[output]
+            values = ["{:6.4f}".format(value)
+                      for value in (number, positive, negative)]
+            values.append("{:.8f}".format(largest))
+            writer.writerow([output] + values)
+            print("{:<40}{:>10}{:>10}{:>10}{:>12}".format(output, *values))
+    print("\nThe summary is written into {}.".format(SUMMARY))
+
+
+def difference_matrix_python(OUTPUT="difference_matrix.csv", JOBS=1):
+    """ Difference numbers of all pairs of fingerprints, as one matrix.
+
+    The sum of absolute differences of each pair is computed directly from
+    the fingerprints loaded once; no difference map is written.  The N x N
+    matrix is stored as .csv in folder 'cxs_workshop'; pairs of different
+    grids are left blank.  With JOBS > 1 (0: one per CPU), tiles of the
+    matrix are computed by a pool of processes sharing the fingerprints
+    (see fingerprint_pairs.py).  If all fingerprints are sparse .sdat,
+    they are compared on their populated bins only. """
+    import fingerprint_io
+    import fingerprint_pairs
+
+    root = os.getcwd()
+    os.chdir("cxs_workshop")
+    register = fingerprint_register()
+
+    print("\nComputation of the difference number matrix (Python) starts:")
+    matrix = [["" for _ in register] for _ in register]
+    for i in range(len(register)):
+        matrix[i][i] = "{:6.4f}".format(0.0)
+
+    groups = []  # (rows of the register, their difference numbers)
+    if register and all(file.endswith(SPARSE_SUFFIX) for file in register):
+        maps = [fingerprint_io.read_sparse(file) for file in register]
+        by_grid = []  # (grid, rows)
+        for row, sparse in enumerate(maps):
+            for grid, rows in by_grid:
+                if grid == sparse.grid:
+                    rows.append(row)
+                    break
             else:
-                continue  # i.e., incompatible, probe the next permutation.
-
-            # .dat suitable for comparison will be analyzed:
-            difference_map = []
-            for reference, probe in zip(reference_map, probe_map):
-                # retain the blank lines:
-                if len(reference) < 5:
-                    difference_map.append("\n")
-                # entries with coordinates and any area element:
-                if len(reference) > 5:
-                    column_a = str("{:3.2f}".format(
-                        float(reference.strip().split()[0])))
-                    column_b = str("{:3.2f}".format(
-                        float(reference.strip().split()[1])))
-                    column_c = str("{:10.8f}".format(
-                        (float(reference.strip().split()[2]) -
-                         float(probe.strip().split()[2]))))
-                    retain = " ".join([column_a, column_b, column_c, "\n"])
-                    difference_map.append(retain)
-
-            # generate the permanent record:
-            output = "".join(["diff_", reference_file[:-4], "_", probe_file])
-            with open(output, mode="w") as newfile:
-                for report_entry in difference_map[:-1]:
-                    newfile.write("{}\n".format(report_entry.strip()))
-        del diff_register[0]
+                by_grid.append((sparse.grid, [row]))
+        for _, rows in by_grid:
+            groups.append((rows, fingerprint_pairs.sparse_difference_numbers(
+                [maps[row] for row in rows], JOBS)))
+    else:
+        stacks = fingerprint_io.load_stacks(register, shared=JOBS != 1)
+        try:
+            for stack in set(stacks.values()):
+                groups.append((
+                    [register.index(name) for name in stack.names],
+                    fingerprint_pairs.difference_numbers(stack, JOBS)))
+        finally:
+            fingerprint_io.release_stacks(stacks)
+
+    for rows, numbers in groups:
+        for (i, j), diff_number in numbers.items():
+            matrix[rows[i]][rows[j]] = matrix[rows[j]][rows[i]] = (
+                "{:6.4f}".format(diff_number))
+
+    stems = [os.path.splitext(file)[0] for file in register]
+    with open(OUTPUT, mode="w") as newfile:
+        writer = csv.writer(newfile, lineterminator="\n")
+        writer.writerow(["fingerprint"] + stems)
+        for stem, row in zip(stems, matrix):
+            writer.writerow([stem] + row)
+    print("{} fingerprints compared, see file '{}'.".format(
+        len(register), OUTPUT))
+    os.chdir(root)
+
+
+def update_library(LIBRARY="fingerprints.fpl"):
+    """ Collect the fingerprints of the current folder in a library.
+
+    The library (see fingerprint_library.py) is rebuilt only if it is
+    missing, if fingerprints on its grid were added or removed (whatever
+    their modification time), or if one changed since.  Fingerprints on
+    an other grid are not stored, thus they do not trigger a rebuild.
+    Report the names of the fingerprints in the library, and if it was
+    rebuilt. """
+    import fingerprint_io
+    import fingerprint_library
+
+    register = fingerprint_register()
+    known = None
+    if os.path.isfile(LIBRARY):
+        try:
+            with fingerprint_library.Library(LIBRARY) as library:
+                known, grid = library.names, library.grid
+        except ValueError:
+            known = None
+    if known is not None:
+        added = [file for file in register if file not in known and (
+            fingerprint_io.read_grid(file) == grid)]
+        removed = [name for name in known if name not in register]
+    if (known is None) or added or removed or any(
+            os.path.getmtime(file) > os.path.getmtime(LIBRARY)
+            for file in register):
+        print("\nFingerprints are collected in library '{}'.".format(LIBRARY))
+        return fingerprint_library.build_library(LIBRARY, register), True
+    return known, False
+
+
+def nearest_python(QUERY, TOP=5, LIBRARY="fingerprints.fpl"):
+    """ List the TOP fingerprints closest to QUERY by difference number.
+
+    QUERY is a fingerprint file (any format), either in the current folder
+    or in 'cxs_workshop', or the name of a fingerprint there.  The search
+    runs against the library of all fingerprints in 'cxs_workshop', pruned
+    by the coarse maps of an index (see fingerprint_search.py). """
+    import fingerprint_search
+
+    root = os.getcwd()
+    if os.path.isfile(QUERY):
+        QUERY = os.path.abspath(QUERY)
+    os.chdir("cxs_workshop")
+    known, _ = update_library(LIBRARY)
+    if not os.path.isfile(QUERY):
+        matches = [name for name in known
+                   if os.path.splitext(name)[0] == QUERY]
+        if not matches:
+            print("Fingerprint {} is not accessible.".format(QUERY))
+            os.chdir(root)
+            return
+        QUERY = matches[0]
+
+    try:
+        neighbours, compared = fingerprint_search.nearest(LIBRARY, QUERY, TOP)
+    except ValueError as error:
+        print(error)
+        os.chdir(root)
+        return
+
+    print("\nFingerprints closest to {} ({} of {} compared in full):".format(
+        os.path.basename(QUERY), compared, len(known)))
+    for rank, (diff_number, name) in enumerate(neighbours, 1):
+        print("{:>4}  {:<30} {:8.4f}".format(rank, os.path.splitext(name)[0],
+                                             diff_number))
+    os.chdir(root)
+
+
+def difference_library_python(LIBRARY="fingerprints.fpl",
+                              OUTPUT="difference_pairs.csv", JOBS=1):
+    """ Difference numbers of all pairs of fingerprints, out of core.
+
+    The fingerprints are appended into a memory-mapped library file (see
+    fingerprint_library.py), rebuilt only if fingerprints were added or
+    changed since.  The pairs are compared tile by tile; the difference
+    numbers are listed in OUTPUT (.csv, one line per pair).  An interrupted
+    run continues where it stopped.  Files are in folder 'cxs_workshop'. """
+    import fingerprint_library
+
+    root = os.getcwd()
+    os.chdir("cxs_workshop")
+    known, rebuilt = update_library(LIBRARY)
+    if rebuilt and os.path.isfile(OUTPUT):
+        os.remove(OUTPUT)  # i.e., results of an other library
+
+    print("Computation of difference numbers (library) starts:")
+    computed = fingerprint_library.difference_numbers(LIBRARY, OUTPUT, JOBS)
+    print("{} fingerprints, {} tiles computed in this run, see '{}'.".format(
+        len(known), computed, OUTPUT))
+    os.chdir(root)
+
+
+def region_python(PAIR, BOXES=None):
+    """ Report difference numbers of a pair within regions of the map.
+
+    PAIR names the reference and probe fingerprint (with or without
+    suffix) in 'cxs_workshop'.  Besides the standard, translated and
+    extended map range, each box (di_min, di_max, de_min, de_max) in A of
+    BOXES is reported.  Each region is a constant time query of the
+    summed-area tables of the difference map (see fingerprint_regions.py);
+    no difference map is written. """
+    import fingerprint_io
+    import fingerprint_regions
+
+    root = os.getcwd()
+    os.chdir("cxs_workshop")
+    pairs = selected_pairs(fingerprint_register(), [PAIR])
+    if not pairs:
+        os.chdir(root)
+        return
+    reference_file, probe_file = pairs[0]
+    reference_grid, reference = fingerprint_io.read_dense(reference_file)
+    probe_grid, probe = fingerprint_io.read_dense(probe_file)
+    os.chdir(root)
+    if reference_grid != probe_grid:
+        print("{} and {} are not on the same grid.".format(
+            reference_file, probe_file))
+        return
+
+    table = fingerprint_regions.RegionTable(
+        reference_grid, [a - b for a, b in zip(reference, probe)])
+    regions = [(name, fingerprint_regions.WINDOWS[name] * 2,
+                table.window(name))
+               for name in ("standard", "translated", "extended")]
+    for box in BOXES or []:
+        regions.append(("box", tuple(box), table.query(*box)))
+
+    print("\nRegions of {} ./. {}:".format(reference_file, probe_file))
+    print("{:<11}{:>24}{:>12}{:>12}".format("region", "d_i, d_e / A", "net",
+                                           "diff_number"))
+    for name, box, (signed, absolute) in regions:
+        print("{:<11}{:>24}{:>12.4f}{:>12.4f}".format(
+            name, "{:.2f}-{:.2f}, {:.2f}-{:.2f}".format(*box), signed,
+            absolute))
+
+
+def rebin_python(XMIN=0.40, XMAX=3.00, FACTOR=1):
+    """ Derive fingerprints of an other range and bin width from existing.
+
+    Each fingerprint in 'cxs_workshop' is summed up into bins FACTOR
+    times as wide on XMIN...XMAX (in A, for both d_i and d_e; see
+    fingerprint_engine.rebin), and normalized again.  The results keep
+    name and format of their source; they are written into a sub-folder
+    of 'cxs_workshop', e.g. rebinned_0.80_3.00_x2.  The .cxs are not read
+    again. """
+    import fingerprint_engine
+    import fingerprint_io
+
+    root = os.getcwd()
+    os.chdir("cxs_workshop")
+    folder = "rebinned_{:.2f}_{:.2f}_x{}".format(XMIN, XMAX, int(FACTOR))
+
+    print("\nRebinning of fingerprints into folder '{}':".format(folder))
+    for entry in fingerprint_register():
+        metadata = {}
+        if entry.endswith(BINARY_SUFFIX):
+            grid, values, metadata = fingerprint_io.read_binary(entry)
+        else:
+            grid, values = fingerprint_io.read_dense(entry)
+        try:
+            new_grid, new_map = fingerprint_engine.rebin(
+                values, grid, FACTOR, XMIN, XMAX)
+        except ValueError as error:
+            print("{}: {}".format(entry, error))
+            continue
+        share = sum(new_map) / 100.0  # of the area on the original grid
+        new_map = fingerprint_engine.normalize(new_map)
+
+        if not os.path.isdir(folder):
+            os.mkdir(folder)
+        target = os.path.join(folder, entry)
+        if entry.endswith(BINARY_SUFFIX):
+            fingerprint_io.write_binary(
+                target, new_grid, new_map,
+                total_area=metadata["total_area"] * share,
+                area_method=metadata["area_method"],
+                source_hash=metadata["source_hash"])
+        elif entry.endswith(SPARSE_SUFFIX):
+            fingerprint_io.write_sparse(
+                target, fingerprint_io.SparseMap.from_dense(new_grid, new_map))
+        else:
+            fingerprint_io.write_dat(target, new_grid, new_map)
+        print("{} on {} ({:.2f} % of its area).".format(
+            target, new_grid, 100.0 * share))
+    os.chdir(root)
 
 
 def shuttle_ruby_script():
@@ -503,7 +902,7 @@ def difference_number_python():
     register = []
 
     for file in os.listdir("."):
-        if fnmatch.fnmatch(file, "diff*.dat"):
+        if fnmatch.fnmatch(file, "diff*") and file.endswith(MAP_SUFFIXES):
             register.append(file)
     register.sort()
 
@@ -513,7 +912,7 @@ def difference_number_python():
 
         with open(entry, mode="r") as source:
             for line in source:
-                if len(line) > 2:
+                if len(line) > 2 and not line.startswith("#"):
                     diff_number += abs(float(str(line.strip()).split()[2]))
         print("{}:  {:6.4f}".format(entry, diff_number))
 
@@ -627,7 +1026,9 @@ def search_dat(map_type="delta", SCREEN=False):
     """ Search for .dat files, assume difference maps of typical interest.
 
     Two cases: fingerprints (type fingerprint, files ending on *.dat), or
-    difference maps (map type delta, files in pattern of diff*.dat). """
+    difference maps (map type delta, files in pattern of diff*.dat).  The
+    sparse .sdat and binary .fpb equivalents are considered equally; of a
+    map in several formats, one is kept (see one_per_stem). """
     root = os.getcwd()
     global DAT_REGISTER
     DAT_REGISTER = []
@@ -635,28 +1036,62 @@ def search_dat(map_type="delta", SCREEN=False):
 
     if SCREEN:  # indiscriminate register population.
         for file in os.listdir("."):
-            if fnmatch.fnmatch(file, "*.dat"):
+            if file.endswith(MAP_SUFFIXES):
                 DAT_REGISTER.append(file)
 
     if SCREEN is False:  # discriminate register population (map type).
         for file in os.listdir("."):
+            if file.endswith(MAP_SUFFIXES) is False:
+                continue
 
             if map_type == "fingerprint":
-                if fnmatch.fnmatch(file, "*.dat"):
-                    if fnmatch.fnmatch(file, "diff*.dat") is False:
-                        DAT_REGISTER.append(file)
+                if fnmatch.fnmatch(file, "diff*") is False:
+                    DAT_REGISTER.append(file)
 
             if map_type == "delta":
-                if fnmatch.fnmatch(file, "diff*.dat"):
+                if fnmatch.fnmatch(file, "diff*"):
                     DAT_REGISTER.append(file)
 
-    DAT_REGISTER.sort()
+    DAT_REGISTER = one_per_stem(DAT_REGISTER)
     os.chdir(root)
 
 
+def render_register(cache, suffix, parameters, RERENDER=False):
+    """ Split DAT_REGISTER into the maps to render, and those up to date.
+
+    An image is up to date if the render cache (see render_cache.py) knows
+    it drawn from the same data with the same parameters; RERENDER draws
+    all maps anew. """
+    todo, current = [], []
+    for entry in DAT_REGISTER:
+        image = os.path.splitext(entry)[0] + suffix
+        if RERENDER or cache.stale(entry, image, parameters):
+            todo.append(entry)
+        else:
+            current.append(entry)
+    return todo, current
+
+
+def report_z_range(entry, z_min=None, z_max=None):
+    """ Append the z-range of a map to 'gp_report.txt'.
+
+    Without z_min and z_max, they are read from the map. """
+    if z_min is None:
+        import fingerprint_io
+        values = fingerprint_io.read_dense(entry)[1]
+        z_min, z_max = min(values), max(values)
+    z_top = "zmax: {:1.6f}".format(z_max)
+    if entry.startswith("diff"):
+        # account for the then used minus sign reporting z_min:
+        z_top = "zmax:  {:1.6f}".format(z_max)
+    with open("gp_report.txt", mode="a") as report:
+        report.write("file: {} zmin: {:1.6f} {}\n".format(
+            entry, z_min, z_top))
+
+
 # yapf: disable
 def png_map(X_MIN=0.4, X_MAX=3.0, Z_MAX=0.08, SCREEN=False, ALT_MAP=False,
-            BACKGROUND=False):
+            BACKGROUND=False, JOBS=1, RERENDER=False):
     # yapf: enable
     """ The general pattern for any of the maps if deposit as .png.
 
@@ -665,435 +1100,610 @@ def png_map(X_MIN=0.4, X_MAX=3.0, Z_MAX=0.08, SCREEN=False, ALT_MAP=False,
     it is best to sum up the relevant per gnuplot terminal; e.g. pngcairo.
 
     Contrasting to pdf_map, png_map includes screen instructions.  Their
-    readouts (gp_log.txt) allow to adjust map range (de/di) and cbrange
-    (z_max) in the high resolution plots.  To define conditional plots
-    almost applicable for both Windows, or Linux, the -e string resides in
-    double quotes, as backslashes escape $3 in Linux' prelast line. """
+    readouts (gp_report.txt) allow to adjust map range (de/di) and cbrange
+    (z_max) in the high resolution plots.  All maps are rendered by one
+    gnuplot process fed by a pipe (see gnuplot_session.py); each map is
+    passed as a datablock of its non-zero bins.  With JOBS > 1 (0: one per
+    CPU), as many gnuplot processes render maps at once; the maps are
+    listed in order as they are completed.  Maps whose data and parameters
+    are unchanged since their last rendering are skipped (see
+    render_register), unless RERENDER.  The z-ranges reported by the
+    sessions are collected, and written into gp_report.txt in the order
+    of the maps once all are rendered. """
+    import gnuplot_session
+    import render_cache
 
     os.chdir("cxs_workshop")
     print("\nMap data processed:")
-    for entry in DAT_REGISTER:
-        print(entry)
-
-        if entry.startswith("diff"):
-            difference_map = True
-        else:
-            difference_map = False
-
-        # define for the deposit file:
-        input_file = str(entry)
-        file_stamp = str(entry)[:-4]
-        output_file = str(entry)[:-4] + str(".png")
-
-        plot = str('gnuplot -e "')
-        plot += str("input = '{}'; set output '{}'; ".format(
-            input_file, output_file))
-
-        # brief statistics per .cxs file read:
-        plot += str("stats input u 3 nooutput; ")
-        plot += str("z_min = sprintf('%1.6f', STATS_min); ")
-        plot += str("z_low = 'zmin: ' . z_min; ")
-        plot += str("z_max = sprintf('%1.6f', STATS_max); ")
-
-        if difference_map is False:
-            plot += str("z_top = 'zmax: ' . z_max; ")
-        if difference_map:
-            # account for the then used minus sign reporting z_min:
-            plot += str("z_top = 'zmax:  ' . z_max; ")
-
-        if SCREEN:
-            # provision of a permanent STATS record:
-            plot += str(
-                "report = 'file: ' . input . ' ' . z_low . ' ' . z_top; ")
-            plot += str("set print 'gp_report.txt' append; ")
-            plot += str("print(report); ")
-
-        # screening format definition
-        #
-        # A plot in reduced dimension provides a preview, allows to adjust
-        # map range de/di and zmax scale in later .png and .pdf outputs.
-        if SCREEN:
-            plot += str("set term pngcairo size 819,819 crop font 'Arial,13' \
-                enha lw 2; ")
-        # non-screening format definition:
-        if SCREEN is False:
-            plot += str(
-                "set term pngcairo size 4096,4096 crop font 'Arial,64' \
-                    enha lw 10; ")
-
-        plot += str("set grid lw 0.5; set size square; ")
-        plot += str("set xtics 0.4,0.2; set ytics 0.4,0.2; ")
-        plot += str("set xtics format '%2.1f'; set ytics format '%2.1f'; ")
-        if SCREEN is False:
-            plot += str("set label 'd_e' at graph 0.05,0.90 left front \
-                font 'Arial,104'; ")
-            plot += str("set label 'd_i' at graph 0.90,0.05 left front \
-                font 'Arial,104'; ")
-            plot += str("set label \'{}\' at graph 0.05,0.05 left front \
-                font 'Arial,104' noenhanced; ".format(file_stamp))
-
-            plot += str("set label z_top at graph 0.70,0.20 left front \
-                font 'Courier,70'; ")
-            plot += str("set label z_low at graph 0.70,0.17 left front \
-                font 'Courier,70'; ")
-
-        if SCREEN:
-            plot += str("set label 'd_e' at graph 0.05,0.90 left front \
-                font 'Arial,21'; ")
-            plot += str("set label 'd_i' at graph 0.90,0.05 left front \
-                font 'Arial,21'; ")
-            plot += str("set label \'{}\' at graph 0.05,0.05 left front \
-                font 'Arial,21' noenhanced; ".format(file_stamp))
-
-            plot += str("set label z_top at graph 0.70,0.20 left front \
-                font 'Courier,14'; ")
-            plot += str("set label z_low at graph 0.70,0.17 left front \
-                font 'Courier,14'; ")
-
-        if SCREEN:
-            # range indicator "standard map" (de and di [0.4,2.6] A)
-            plot += str(
-                "set arrow nohead from 0.4,2.6 to 2.6,2.6 dt 2 front; ")
-            plot += str(
-                "set arrow nohead from 2.6,0.4 to 2.6,2.6 dt 2 front; ")
-            # range indicator "translated map" (de and di [0.8,3.0 A)
-            plot += str(
-                "set arrow nohead from 0.8,0.8 to 0.8,3.0 dt 3 front; ")
-            plot += str(
-                "set arrow nohead from 0.8,0.8 to 3.0,0.8 dt 3 front; ")
-
-        plot += str("set pm3d map; \
-            set pm3d depthorder; set hidden; set hidden3d; ")
-        plot += str("unset key; ")
-
-        if BACKGROUND:  # provide an optional contrast enhancement
-            plot += str("set object 1 rectangle from graph 0,0 to graph 1,1 \
-                fillcolor '#808080' behind; ")
-
-        # color scheme for fingerprint map:
-        if (difference_map is False) and (ALT_MAP is False):
-            plot += str(RAINBOW) + str("; ")
-        if (difference_map is False) and ALT_MAP:
-            plot += str(
-                "set palette cubehelix start 0 cycles -1. saturation 1; ")
-
-        # color scheme for difference map:
-        if (difference_map is True) and SCREEN:
-            plot += str(THREE_LEVEL_NEW) + str("; ")
-        if (difference_map is True) and (SCREEN is False) and (ALT_MAP is
-                                                               False):
-            plot += str(THREE_LEVEL_OLD) + str("; ")
-        if (difference_map is True) and (SCREEN is False) and ALT_MAP:
-            plot += str(BENT_THREE_LEVEL_0064) + str("; ")
-
-        plot += str("set xrange ['{}':'{}']; ".format(X_MIN, X_MAX))
-        plot += str("set yrange ['{}':'{}']; ".format(X_MIN,
-                                                      X_MAX))  # square matrix
-
-        # adjustment of cbrange parameter
-        if difference_map is False:
-            plot += str("set cbrange [0:'{}']; ".format(Z_MAX))
-        if (difference_map is False) and SCREEN:
-            # This default is suggested by P. Raiteri and A. Rohl:
-            plot += str("set cbrange [0:0.08]; ")
-
-        if difference_map:
-            plot += str("set cbrange [-'{}':'{}']; ".format(Z_MAX, Z_MAX))
-        if (difference_map is True) and SCREEN:
-            # This default is suggested by P. Raiteri and A. Rohl:
-            plot += str("set cbrange [-0.025:0.025]; ")
-
-        # A conditional plotting / tiling, as suggested by Ethan Merritt.
-        #
-        # To consider only tiles with z != 0 to populate the plots reduces
-        # file sizes considerably, especially in the pdf_map function.
-
-        if platform.system().startswith("Linux"):
-            # working in Linux, form #1
-            plot += str("sp '{}' u 1:2:((abs(\$3) > 0) ? \$3 : NaN) w p pt 5 \
-                ps 0.05 lc palette z; ".format(entry))
-
-        if platform.system().startswith("Windows"):
-            plot += str("sp '{}' u 1:2:((abs($3) > 0) ? $3 : NaN) w p pt 5 \
-                ps 0.05 lc palette z; ".format(entry))
+    render = functools.partial(png_commands, X_MIN=X_MIN, X_MAX=X_MAX,
+                               Z_MAX=Z_MAX, SCREEN=SCREEN, ALT_MAP=ALT_MAP,
+                               BACKGROUND=BACKGROUND)
+    cache = render_cache.RenderCache()
+    parameters = dict(render.keywords, renderer="gnuplot pngcairo")
+    todo, current = render_register(cache, ".png", parameters, RERENDER)
+    for entry in current:
+        print("{} (unchanged)".format(entry))
+    z_ranges = dict((entry, ()) for entry in current)  # () read from map
+    JOBS = JOBS or multiprocessing.cpu_count()
+    try:
+        if todo:
+            with gnuplot_session.SessionPool(min(JOBS, len(todo))) as pool:
+                for entry, z_range in pool.map(render, todo):
+                    print(entry)
+                    z_ranges[entry] = z_range
+                    cache.record(entry,
+                                 os.path.splitext(entry)[0] + ".png",
+                                 parameters)
+    finally:
+        cache.save()
+    if SCREEN:
+        for entry in DAT_REGISTER:
+            if entry in z_ranges:
+                report_z_range(entry, *z_ranges[entry])
+        print("\nNote: z_ranges data written into file 'gp_report.txt'.")
+
+
+def png_commands(session, entry, X_MIN=0.4, X_MAX=3.0, Z_MAX=0.08,
+                 SCREEN=False, ALT_MAP=False, BACKGROUND=False):
+    """ Render one map as .png in an open gnuplot session.
+
+    Report the z-range of the map, as (z_min, z_max). """
+    import gnuplot_session
+
+    if entry.startswith("diff"):
+        difference_map = True
+    else:
+        difference_map = False
+
+    # define for the deposit file:
+    input_file = str(entry)
+    file_stamp = os.path.splitext(entry)[0]
+    output_file = file_stamp + str(".png")
+
+    datablock, z_min, z_max = gnuplot_session.map_datablock(input_file)
+    plot = str("set output '{}'; ".format(output_file))
+
+    # brief statistics per .cxs file read:
+    z_low = "zmin: {:1.6f}".format(z_min)
+    if difference_map is False:
+        z_top = "zmax: {:1.6f}".format(z_max)
+    if difference_map:
+        # account for the then used minus sign reporting z_min:
+        z_top = "zmax:  {:1.6f}".format(z_max)
+    plot += str("z_low = '{}'; z_top = '{}'; ".format(z_low, z_top))
+
+    # screening format definition
+    #
+    # A plot in reduced dimension provides a preview, allows to adjust
+    # map range de/di and zmax scale in later .png and .pdf outputs.
+    if SCREEN:
+        plot += str("set term pngcairo size 819,819 crop font 'Arial,13' \
+            enha lw 2; ")
+    # non-screening format definition:
+    if SCREEN is False:
+        plot += str(
+            "set term pngcairo size 4096,4096 crop font 'Arial,64' \
+                enha lw 10; ")
+
+    plot += str("set grid lw 0.5; set size square; ")
+    plot += str("set xtics 0.4,0.2; set ytics 0.4,0.2; ")
+    plot += str("set xtics format '%2.1f'; set ytics format '%2.1f'; ")
+    if SCREEN is False:
+        plot += str("set label 'd_e' at graph 0.05,0.90 left front \
+            font 'Arial,104'; ")
+        plot += str("set label 'd_i' at graph 0.90,0.05 left front \
+            font 'Arial,104'; ")
+        plot += str("set label \'{}\' at graph 0.05,0.05 left front \
+            font 'Arial,104' noenhanced; ".format(file_stamp))
+
+        plot += str("set label z_top at graph 0.70,0.20 left front \
+            font 'Courier,70'; ")
+        plot += str("set label z_low at graph 0.70,0.17 left front \
+            font 'Courier,70'; ")
 
-        # Re-initiate gnuplot's memory prior to work on a new data set:
-        plot += str("reset session\"")
+    if SCREEN:
+        plot += str("set label 'd_e' at graph 0.05,0.90 left front \
+            font 'Arial,21'; ")
+        plot += str("set label 'd_i' at graph 0.90,0.05 left front \
+            font 'Arial,21'; ")
+        plot += str("set label \'{}\' at graph 0.05,0.05 left front \
+            font 'Arial,21' noenhanced; ".format(file_stamp))
+
+        plot += str("set label z_top at graph 0.70,0.20 left front \
+            font 'Courier,14'; ")
+        plot += str("set label z_low at graph 0.70,0.17 left front \
+            font 'Courier,14'; ")
 
-        sub.call(plot, shell=True)
     if SCREEN:
-        print("\nNote: z_ranges data written into file 'gp_log.txt'.")
+        # range indicator "standard map" (de and di [0.4,2.6] A)
+        plot += str(
+            "set arrow nohead from 0.4,2.6 to 2.6,2.6 dt 2 front; ")
+        plot += str(
+            "set arrow nohead from 2.6,0.4 to 2.6,2.6 dt 2 front; ")
+        # range indicator "translated map" (de and di [0.8,3.0 A)
+        plot += str(
+            "set arrow nohead from 0.8,0.8 to 0.8,3.0 dt 3 front; ")
+        plot += str(
+            "set arrow nohead from 0.8,0.8 to 3.0,0.8 dt 3 front; ")
 
+    plot += str("set pm3d map; \
+        set pm3d depthorder; set hidden; set hidden3d; ")
+    plot += str("unset key; ")
 
-def pdf_map(X_MIN=0.4, X_MAX=3.0, Z_MAX=0.08, ALT_MAP=False, BACKGROUND=False):
-    """ The pattern for any of gnuplot's maps if deposit as .pdf. """
+    if BACKGROUND:  # provide an optional contrast enhancement
+        plot += str("set object 1 rectangle from graph 0,0 to graph 1,1 \
+            fillcolor '#808080' behind; ")
 
+    # color scheme for fingerprint map:
+    if (difference_map is False) and (ALT_MAP is False):
+        plot += str(RAINBOW) + str("; ")
+    if (difference_map is False) and ALT_MAP:
+        plot += str(
+            "set palette cubehelix start 0 cycles -1. saturation 1; ")
+
+    # color scheme for difference map:
+    if (difference_map is True) and SCREEN:
+        plot += str(THREE_LEVEL_NEW) + str("; ")
+    if (difference_map is True) and (SCREEN is False) and (ALT_MAP is
+                                                           False):
+        plot += str(THREE_LEVEL_OLD) + str("; ")
+    if (difference_map is True) and (SCREEN is False) and ALT_MAP:
+        plot += str(BENT_THREE_LEVEL_0064) + str("; ")
+
+    plot += str("set xrange ['{}':'{}']; ".format(X_MIN, X_MAX))
+    plot += str("set yrange ['{}':'{}']; ".format(X_MIN,
+                                                  X_MAX))  # square matrix
+
+    # adjustment of cbrange parameter
+    if difference_map is False:
+        plot += str("set cbrange [0:'{}']; ".format(Z_MAX))
+    if (difference_map is False) and SCREEN:
+        # This default is suggested by P. Raiteri and A. Rohl:
+        plot += str("set cbrange [0:0.08]; ")
+
+    if difference_map:
+        plot += str("set cbrange [-'{}':'{}']; ".format(Z_MAX, Z_MAX))
+    if (difference_map is True) and SCREEN:
+        # This default is suggested by P. Raiteri and A. Rohl:
+        plot += str("set cbrange [-0.025:0.025]; ")
+
+    # A conditional plotting / tiling, as suggested by Ethan Merritt.
+    #
+    # To consider only tiles with z != 0 to populate the plots reduces
+    # file sizes considerably, especially in the pdf_map function.  The
+    # datablock already lists only these tiles.
+    plot += str("sp $map u 1:2:3 w p pt 5 ps 0.05 lc palette z; ")
+
+    # gnuplot's memory is re-initiated prior to work on a new data set:
+    session.render(plot, datablock)
+    return z_min, z_max
+
+
+def raster_map(ALT_MAP=False, BACKGROUND=False, RERENDER=False):
+    """ Preview maps as .png by the built-in renderer, without gnuplot.
+
+    Each bin is colored by a lookup table of the palettes of the gnuplot
+    maps (see fingerprint_raster.py): RAINBOW for fingerprints, and
+    THREE_LEVEL_NEW (or with ALT_MAP, BENT_THREE_LEVEL_0064) for the
+    difference maps, on the fixed z-ranges of the screening maps.  As by
+    png_map, the z-ranges found are written into gp_report.txt, and maps
+    unchanged since their last rendering are skipped. """
+    import fingerprint_raster
+    import render_cache
+
+    tables = {
+        "fingerprint": fingerprint_raster.lookup_table(
+            fingerprint_raster.parse_palette(RAINBOW)),
+        "delta": fingerprint_raster.lookup_table(
+            fingerprint_raster.parse_palette(THREE_LEVEL_NEW)),
+    }
+    if ALT_MAP:
+        tables["delta"] = fingerprint_raster.lookup_table(
+            fingerprint_raster.parse_palette(BENT_THREE_LEVEL_0064))
+    background = fingerprint_raster.WHITE
+    if BACKGROUND:
+        background = fingerprint_raster.GRAY
+
+    root = os.getcwd()
     os.chdir("cxs_workshop")
     print("\nMap data processed:")
+    cache = render_cache.RenderCache()
+    parameters = {"renderer": "raster", "ALT_MAP": ALT_MAP,
+                  "BACKGROUND": BACKGROUND,
+                  "SCALE": fingerprint_raster.SCALE}
+    todo, current = render_register(cache, ".png", parameters, RERENDER)
     for entry in DAT_REGISTER:
+        if entry in current:
+            print("{} (unchanged)".format(entry))
+            report_z_range(entry)
+            continue
         print(entry)
-
+        output_file = os.path.splitext(entry)[0] + str(".png")
         if entry.startswith("diff"):
-            difference_map = True
+            z_min, z_max = fingerprint_raster.write_map(
+                entry, output_file, tables["delta"], -0.025, 0.025,
+                background=background, ranges=True)
         else:
-            difference_map = False
+            z_min, z_max = fingerprint_raster.write_map(
+                entry, output_file, tables["fingerprint"], 0.0, 0.08,
+                background=background, ranges=True)
+        report_z_range(entry, z_min, z_max)
+        cache.record(entry, output_file, parameters)
+    cache.save()
+    os.chdir(root)
+    print("\nNote: z_ranges data written into file 'gp_report.txt'.")
+
+
+def montage_map(MATRIX=False, Z_MAX=None, ALT_MAP=False, BACKGROUND=False):
+    """ Contact sheets of all fingerprints, and optionally their pairs.
+
+    The fingerprints in 'cxs_workshop' are read once, drawn as tiles by
+    the built-in renderer and laid out into montage_fingerprints_1.png,
+    etc.  With MATRIX, the difference maps of all pairs are subtracted in
+    memory and laid out as the pair matrix in montage_differences_1.png,
+    etc.  Each tile is captioned by its name, z_min and z_max. """
+    import fingerprint_montage
+    import fingerprint_raster
+
+    fingerprint_table = fingerprint_raster.lookup_table(
+        fingerprint_raster.parse_palette(RAINBOW))
+    palette = THREE_LEVEL_NEW
+    if ALT_MAP:
+        palette = BENT_THREE_LEVEL_0064
+    difference_table = fingerprint_raster.lookup_table(
+        fingerprint_raster.parse_palette(palette))
+    background = fingerprint_raster.WHITE
+    if BACKGROUND:
+        background = fingerprint_raster.GRAY
 
-        # define the deposit file:
-        input_file = str(entry)
-        file_stamp = str(entry)[:-4]
-        output_file = str(entry)[:-4] + str(".pdf")
+    root = os.getcwd()
+    os.chdir("cxs_workshop")
+    register = fingerprint_register()
+    print("\nContact sheets of {} fingerprints:".format(len(register)))
+    sheets = fingerprint_montage.fingerprint_sheets(
+        register, "montage_fingerprints", fingerprint_table, 0.0,
+        Z_MAX or 0.08, background=background)
+    if MATRIX:
+        sheets += fingerprint_montage.difference_sheets(
+            register, "montage_differences", difference_table,
+            Z_MAX or 0.025, background=background)
+    for sheet in sheets:
+        print(sheet)
+    os.chdir(root)
 
-        plot = str('gnuplot -e "')
-        plot += str("input = '{}'; set output '{}'; ".format(
-            input_file, output_file))
 
-        # brief statistics per .cxs file read:
-        plot += str("stats input u 3 nooutput; ")
-        plot += str("z_min = sprintf('%1.6f', STATS_min); ")
-        plot += str("z_low = 'zmin: ' . z_min; ")
-        plot += str("z_max = sprintf('%1.6f', STATS_max); ")
+def pdf_map(X_MIN=0.4, X_MAX=3.0, Z_MAX=0.08, ALT_MAP=False, BACKGROUND=False,
+            JOBS=1, RERENDER=False):
+    """ The pattern for any of gnuplot's maps if deposit as .pdf.
 
-        if difference_map is False:
-            plot += str("z_top = 'zmax: ' . z_max; ")
-        if difference_map:
-            # account for the then used minus sign reporting z_min:
-            plot += str("z_top = 'zmax:  ' . z_max; ")
+    As in png_map, one gnuplot process (or JOBS of them) renders all maps
+    which changed since their last rendering. """
+    import gnuplot_session
+    import render_cache
 
+    os.chdir("cxs_workshop")
+    print("\nMap data processed:")
+    render = functools.partial(pdf_commands, X_MIN=X_MIN, X_MAX=X_MAX,
+                               Z_MAX=Z_MAX, ALT_MAP=ALT_MAP,
+                               BACKGROUND=BACKGROUND)
+    cache = render_cache.RenderCache()
+    parameters = dict(render.keywords, renderer="gnuplot pdfcairo")
+    todo, current = render_register(cache, ".pdf", parameters, RERENDER)
+    for entry in current:
+        print("{} (unchanged)".format(entry))
+    JOBS = JOBS or multiprocessing.cpu_count()
+    try:
+        if todo:
+            with gnuplot_session.SessionPool(min(JOBS, len(todo))) as pool:
+                for entry, _ in pool.map(render, todo):
+                    print(entry)
+                    cache.record(entry,
+                                 os.path.splitext(entry)[0] + ".pdf",
+                                 parameters)
+    finally:
+        cache.save()
+
+
+def pdf_commands(session, entry, X_MIN=0.4, X_MAX=3.0, Z_MAX=0.08,
+                 ALT_MAP=False, BACKGROUND=False):
+    """ Render one map as .pdf in an open gnuplot session.
+
+    Report the z-range of the map, as (z_min, z_max). """
+    import gnuplot_session
+
+    if entry.startswith("diff"):
+        difference_map = True
+    else:
+        difference_map = False
+
+    # define the deposit file:
+    input_file = str(entry)
+    file_stamp = os.path.splitext(entry)[0]
+    output_file = file_stamp + str(".pdf")
+
+    datablock, z_min, z_max = gnuplot_session.map_datablock(input_file)
+    plot = str("set output '{}'; ".format(output_file))
+
+    # brief statistics per .cxs file read:
+    z_low = "zmin: {:1.6f}".format(z_min)
+    if difference_map is False:
+        z_top = "zmax: {:1.6f}".format(z_max)
+    if difference_map:
+        # account for the then used minus sign reporting z_min:
+        z_top = "zmax:  {:1.6f}".format(z_max)
+    plot += str("z_low = '{}'; z_top = '{}'; ".format(z_low, z_top))
+
+    plot += str(
+        "set term pdfcairo size 6cm,6cm font 'Arial,8' enha lw 1; ")
+    plot += str("set grid lw 0.5; set size square; ")
+    plot += str("set xtics 0.4,0.2; set ytics 0.4,0.2; ")
+    plot += str("set xtics format '%2.1f'; set ytics format '%2.1f'; ")
+
+    plot += str("set label 'd_e' at graph 0.05,0.90 left front; ")
+    plot += str("set label 'd_i' at graph 0.90,0.05 left front; ")
+    plot += str(
+        "set label \'{}\' at graph 0.05,0.05 left front noenhanced; ".
+        format(file_stamp))
+    plot += str(
+        "set label z_top at graph 0.65,0.20 left front font 'Courier,6'; ")
+    plot += str(
+        "set label z_low at graph 0.65,0.17 left front font 'Courier,6'; ")
+
+    plot += str("set pm3d map; \
+        set pm3d depthorder; set hidden; set hidden3d; ")
+    plot += str("unset key; ")
+
+    if BACKGROUND:
+        # provide an optional contrast enhancement:
         plot += str(
-            "set term pdfcairo size 6cm,6cm font 'Arial,8' enha lw 1; ")
-        plot += str("set grid lw 0.5; set size square; ")
-        plot += str("set xtics 0.4,0.2; set ytics 0.4,0.2; ")
-        plot += str("set xtics format '%2.1f'; set ytics format '%2.1f'; ")
+            "set object 1 rectangle from graph 0.0,0.0 to graph 1,1 \
+            fillcolor '#808080' behind; ")
 
-        plot += str("set label 'd_e' at graph 0.05,0.90 left front; ")
-        plot += str("set label 'd_i' at graph 0.90,0.05 left front; ")
-        plot += str(
-            "set label \'{}\' at graph 0.05,0.05 left front noenhanced; ".
-            format(file_stamp))
-        plot += str(
-            "set label z_top at graph 0.65,0.20 left front font 'Courier,6'; ")
+    # default color scheme for fingerprint map:
+    if (difference_map is False) and (ALT_MAP is False):
+        plot += str(RAINBOW) + str("; ")
+    if (difference_map is False) and ALT_MAP:
         plot += str(
-            "set label z_low at graph 0.65,0.17 left front font 'Courier,6'; ")
+            "set palette cubehelix start 0 cycles -1. saturation 1; ")
 
-        plot += str("set pm3d map; \
-            set pm3d depthorder; set hidden; set hidden3d; ")
-        plot += str("unset key; ")
+    # default color scheme for difference map:
+    if (difference_map is True) and (ALT_MAP is False):
+        plot += str(THREE_LEVEL_OLD) + str("; ")
+    if (difference_map is True) and ALT_MAP:
+        plot += str(BENT_THREE_LEVEL_0064) + str("; ")
 
-        if BACKGROUND:
-            # provide an optional contrast enhancement:
-            plot += str(
-                "set object 1 rectangle from graph 0.0,0.0 to graph 1,1 \
-                fillcolor '#808080' behind; ")
-
-        # default color scheme for fingerprint map:
-        if (difference_map is False) and (ALT_MAP is False):
-            plot += str(RAINBOW) + str("; ")
-        if (difference_map is False) and ALT_MAP:
-            plot += str(
-                "set palette cubehelix start 0 cycles -1. saturation 1; ")
-
-        # default color scheme for difference map:
-        if (difference_map is True) and (ALT_MAP is False):
-            plot += str(THREE_LEVEL_OLD) + str("; ")
-        if (difference_map is True) and ALT_MAP:
-            plot += str(BENT_THREE_LEVEL_0064) + str("; ")
-
-        plot += str("set xrange ['{}':'{}']; ".format(X_MIN, X_MAX))
-        plot += str("set yrange ['{}':'{}']; ".format(X_MIN,
-                                                      X_MAX))  # square matrix
-        plot += str("set cbrange [0:'{}']; ".format(Z_MAX))
-        if difference_map:
-            plot += str("set cbrange ['-{}':'{}']; ".format(Z_MAX, Z_MAX))
+    plot += str("set xrange ['{}':'{}']; ".format(X_MIN, X_MAX))
+    plot += str("set yrange ['{}':'{}']; ".format(X_MIN,
+                                                  X_MAX))  # square matrix
+    plot += str("set cbrange [0:'{}']; ".format(Z_MAX))
+    if difference_map:
+        plot += str("set cbrange ['-{}':'{}']; ".format(Z_MAX, Z_MAX))
 
-        # conditional tiling:  (significant savings for .pdf)
-        if platform.system().startswith("Linux"):
-            plot += str(
-                "sp '{}' u 1:2:((abs(\$3) > 0) ? \$3 : NaN) w p pt 5 ps 0.001\
-            lc palette z; ".format(entry))
-
-        if platform.system().startswith("Windows"):
-            plot += str(
-                "sp '{}' u 1:2:((abs($3) > 0) ? $3 : NaN) w p pt 5 ps 0.001\
-            lc palette z; ".format(entry))
+    # conditional tiling:  (significant savings for .pdf)
+    plot += str("sp $map u 1:2:3 w p pt 5 ps 0.001 lc palette z; ")
 
-        # Re-initiate gnuplot prior to work on a new data set:
-        plot += str("reset session \"")
-        sub.call(plot, shell=True)
+    # gnuplot is re-initiated prior to work on a new data set:
+    session.render(plot, datablock)
+    return z_min, z_max
 
 
 # yapf: disable
 def plot_matplotlib(MAP_RANGE="extended", Z_MAX=0.08, SCREEN=False,
-                    BACKGROUND=False, COLOR_BAR=False, FILE_TYPE="png"):
-    """ Backup: matplotlib-based visualization of the computed results. """
+                    BACKGROUND=False, COLOR_BAR=False, FILE_TYPE="png",
+                    JOBS=1, RERENDER=False):
+    """ Backup: matplotlib-based visualization of the computed results.
+
+    With JOBS > 1 (0: one per CPU), the maps are drawn by a pool of
+    processes; they are listed in order as they are completed.  As with
+    png_map, unchanged maps are skipped unless RERENDER. """
     # yapf: enable
     try:
-        import matplotlib.pyplot as plt
-        from matplotlib.ticker import (AutoMinorLocator, MultipleLocator)
-        import numpy as np
+        # i.e., check their availability before any map is drawn:
+        import matplotlib.pyplot
+        import numpy
     except IOError:
         print("""Additional non-standard modules are not available.
               Install first numpy and matplotlib.""")
         sys.exit()
 
+    import render_cache
+
     os.chdir("cxs_workshop")
     print("\nMap data processed:")
-    for entry in DAT_REGISTER:
-        print(entry)
+    render = functools.partial(matplotlib_map, MAP_RANGE=MAP_RANGE,
+                               Z_MAX=Z_MAX, SCREEN=SCREEN,
+                               BACKGROUND=BACKGROUND, COLOR_BAR=COLOR_BAR,
+                               FILE_TYPE=FILE_TYPE)
+    suffix = ".png" if SCREEN else "." + FILE_TYPE
+    cache = render_cache.RenderCache()
+    parameters = dict(render.keywords, renderer="matplotlib")
+    todo, current = render_register(cache, suffix, parameters, RERENDER)
+    for entry in current:
+        print("{} (unchanged)".format(entry))
+    JOBS = JOBS or multiprocessing.cpu_count()
+    if JOBS == 1 or len(todo) < 2:
+        entries = map(render, todo)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(min(JOBS, len(todo)))
+        entries = pool.imap(render, todo)
+    try:
+        for entry in entries:
+            print(entry)
+            if entry.startswith("diff") and (SCREEN is False) and (
+                    FILE_TYPE == "png"):
+                print("zmax: {}".format(Z_MAX))
+            cache.record(entry, os.path.splitext(entry)[0] + suffix,
+                         parameters)
+    finally:
+        cache.save()
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+
+def matplotlib_map(entry, MAP_RANGE="extended", Z_MAX=0.08, SCREEN=False,
+                   BACKGROUND=False, COLOR_BAR=False, FILE_TYPE="png"):
+    """ Draw one map with matplotlib; report its name once written. """
+    import matplotlib.pyplot as plt
+    from matplotlib.ticker import (AutoMinorLocator, MultipleLocator)
+    import numpy as np
+    import fingerprint_io
+
+    if entry.startswith("diff"):
+        difference_map = True
+    else:
+        difference_map = False
+
+    file_stamp = os.path.splitext(entry)[0]
+
+    # analysis of the map, either dense .dat, sparse .sdat, or .fpb:
+    grid, values = fingerprint_io.read_dense(entry)
+    z_register = list(values)
+
+    # convert the list of z into an array suitable for display:
+    array_z = np.array(z_register).astype(float)
+
+    dimension_matrix_z = grid.nbin
+    matrix_z = array_z.reshape(dimension_matrix_z, dimension_matrix_z)
+
+    # align orientation of the array to the one in gnuplot's plots:
+    matrix_z = matrix_z.transpose()
+
+    # the grid of the map:
+    grid_start, grid_step, grid_end = grid.xmin, grid.dx, grid.xmax
+
+    # adjust working to the map range selection:
+    if MAP_RANGE == "standard":  # i.e., 0.40(0.01)2.60 A.
+        di_start, di_end = 0.40, 2.60
+    if MAP_RANGE == "translated":  # i.e., 0.80(0.01)3.00 A
+        di_start, di_end = 0.80, 3.00
+    if MAP_RANGE == "extended":  # i.e., 0.40(0.01)3.00 A
+        di_start, di_end = 0.40, 3.00
+    di_start, di_end = max(di_start, grid_start), min(di_end, grid_end)
+    first = int(round((di_start - grid_start) / grid_step))
+    last = int(round((di_end - grid_start) / grid_step)) + 1
+    matrix_z = matrix_z[first:last, first:last]
+
+    # identify zmin and zmax
+    zmin_value = str("{:7.6f}".format(float(min(z_register))))
+    zmin_report = " ".join(["zmin:", zmin_value.rjust(9)])
+
+    zmax_value = str("{:7.6f}".format(float(max(z_register))))
+    zmax_report = " ".join(["zmax:", zmax_value.rjust(9)])
+
+    # Filter out entries not sufficiently away from zero:
+    np.place(array_z, abs(array_z) < 1e-8, 'nan')
+
+    # definition about the canvas:
+    fig, ax = plt.subplots()
+    plt.grid()
+    ax.xaxis.set_major_locator(MultipleLocator(0.20))
+    ax.yaxis.set_major_locator(MultipleLocator(0.20))
+    ax.grid(which='major', color='#CCCCCC', linestyle=':', lw=0.5)
+
+    # Change minor ticks to show every 0.05 A. (0.20 A / 4 = 0.05 A):
+    ax.xaxis.set_minor_locator(AutoMinorLocator(4))
+    ax.yaxis.set_minor_locator(AutoMinorLocator(4))
+
+    ax.set_aspect(1.00 / 1.00)
+
+    # yapf: disable
+    # permanent decorum:
+    plt.text(0.05, 0.90, r'$d_e$', transform=ax.transAxes)
+    plt.text(0.90, 0.05, r'$d_i$', transform=ax.transAxes)
+
+    bbox_props = dict(boxstyle="square", fc='white', ec='white',
+                      lw=1, pad=0.1)
+    plt.text(0.05, 0.05, r'{}'.format(file_stamp), bbox=bbox_props,
+             transform=ax.transAxes)
+    plt.text(0.70, 0.20, r'{}'.format(zmax_report), family="monospace",
+             size="7", bbox=bbox_props, transform=ax.transAxes)
+    plt.text(0.70, 0.17, r'{}'.format(zmin_report), family="monospace",
+             size="7", bbox=bbox_props, transform=ax.transAxes)
 
-        if entry.startswith("diff"):
-            difference_map = True
-        else:
-            difference_map = False
+    if SCREEN:
+        # indicator standard map range, dashed line:
+        plt.plot([0.40, 2.60], [2.60, 2.60], '--', color='black')
+        plt.plot([2.60, 2.60], [0.40, 2.60], '--', color='black')
 
-        # analysis of the .dat file:
-        retainer = []  # record all except the blank lines
-        z_register = []  # record only the entries about z
-   
-        with open(entry, mode='r') as source:
-            for line in source:
-                if len(line.strip().split()) == 3:
-                    retainer.append(line.strip())
-                    z_register.append(float(line.strip().split()[2]))
-
-        # convert the list of z into an array suitable for display:
-        array_z = np.array(z_register).astype(float)
-
-        dimension_matrix_z = int(math.sqrt(len(array_z)))
-        matrix_z = array_z.reshape(dimension_matrix_z, dimension_matrix_z)
-
-        # align orientation of the array to the one in gnuplot's plots:
-        matrix_z = matrix_z.transpose()
-
-        # adjust working to the map range selection:
-        if MAP_RANGE == "standard":  # i.e., 0.40(0.01)2.60 A.
-            di_start, di_end = 0.40, 2.60
-            matrix_z = matrix_z[:221, :221]
-        if MAP_RANGE == "translated":  # i.e., 0.80(0.01)3.00 A
-            di_start, di_end = 0.80, 3.00
-            matrix_z = matrix_z[40:, 40:]
-        if MAP_RANGE == "extended":  # i.e., 0.40(0.01)3.00 A
-            di_start, di_end = 0.40, 3.00
-            matrix_z = matrix_z[:, :]
-
-        # identify zmin and zmax
-        zmin_value = str("{:7.6f}".format(float(min(z_register))))
-        zmin_report = " ".join(["zmin:", zmin_value.rjust(9)])
-
-        zmax_value = str("{:7.6f}".format(float(max(z_register))))
-        zmax_report = " ".join(["zmax:", zmax_value.rjust(9)])
-
-        # Filter out entries not sufficiently away from zero:
-        np.place(array_z, abs(array_z) < 1e-8, 'nan')
-
-        # definition about the canvas:
-        fig, ax = plt.subplots()
-        plt.grid()
-        ax.xaxis.set_major_locator(MultipleLocator(0.20))
-        ax.yaxis.set_major_locator(MultipleLocator(0.20))
-        ax.grid(which='major', color='#CCCCCC', linestyle=':', lw=0.5)
-
-        # Change minor ticks to show every 0.05 A. (0.20 A / 4 = 0.05 A):
-        ax.xaxis.set_minor_locator(AutoMinorLocator(4))
-        ax.yaxis.set_minor_locator(AutoMinorLocator(4))
-
-        ax.set_aspect(1.00 / 1.00)
-
-        # yapf: disable
-        # permanent decorum:
-        plt.text(0.05, 0.90, r'$d_e$', transform=ax.transAxes)
-        plt.text(0.90, 0.05, r'$d_i$', transform=ax.transAxes)
-
-        bbox_props = dict(boxstyle="square", fc='white', ec='white',
-                          lw=1, pad=0.1)
-        plt.text(0.05, 0.05, r'{}'.format(entry[:-4]), bbox=bbox_props,
-                 transform=ax.transAxes)
-        plt.text(0.70, 0.20, r'{}'.format(zmax_report), family="monospace",
-                 size="7", bbox=bbox_props, transform=ax.transAxes)
-        plt.text(0.70, 0.17, r'{}'.format(zmin_report), family="monospace",
-                 size="7", bbox=bbox_props, transform=ax.transAxes)
-
-        if SCREEN:
-            # indicator standard map range, dashed line:
-            plt.plot([0.40, 2.60], [2.60, 2.60], '--', color='black')
-            plt.plot([2.60, 2.60], [0.40, 2.60], '--', color='black')
-
-            # indicator translated map range, dotted line:
-            plt.plot([0.80, 0.80], [0.80, 3.00], ':', color='black')
-            plt.plot([0.80, 3.00], [0.80, 0.80], ':', color='black')
-
-        # the permanent records:
-        # fixed z-ranges with values stipulated in fingerprint.f90.
-        if SCREEN:
-            if BACKGROUND:
-                ax.set_facecolor("#808080")  # gray background
-
-            if difference_map:
-                plt.imshow(matrix_z, extent=[
-                    di_start, di_end, di_start, di_end],
-                           origin='lower', cmap='RdBu_r', aspect='equal',
-                           interpolation='None', filternorm='False',
-                           vmin=-0.025, vmax=0.025, zorder=15, resample=True)
-
-            if difference_map is False:
-                plt.imshow(matrix_z, extent=[
-                    di_start, di_end, di_start, di_end],
-                           origin='lower', cmap='cubehelix', aspect='equal',
-                           interpolation='None', filternorm='False',
-                           vmin=0.0, vmax=0.08, zorder=15, resample=True)
+        # indicator translated map range, dotted line:
+        plt.plot([0.80, 0.80], [0.80, 3.00], ':', color='black')
+        plt.plot([0.80, 3.00], [0.80, 0.80], ':', color='black')
+
+    # the permanent records:
+    # fixed z-ranges with values stipulated in fingerprint.f90.
+    if SCREEN:
+        if BACKGROUND:
+            ax.set_facecolor("#808080")  # gray background
+
+        if difference_map:
+            plt.imshow(matrix_z, extent=[
+                di_start, di_end, di_start, di_end],
+                       origin='lower', cmap='RdBu_r', aspect='equal',
+                       interpolation='None', filternorm='False',
+                       vmin=-0.025, vmax=0.025, zorder=15, resample=True)
 
+        if difference_map is False:
+            plt.imshow(matrix_z, extent=[
+                di_start, di_end, di_start, di_end],
+                       origin='lower', cmap='cubehelix', aspect='equal',
+                       interpolation='None', filternorm='False',
+                       vmin=0.0, vmax=0.08, zorder=15, resample=True)
+
+        ax.set_facecolor("#808080")  # gray background
+        plt.colorbar()
+        output_file = ''.join([file_stamp, '.png'])
+        plt.savefig(output_file, dpi=150, bbox_inches='tight')
+        plt.close(fig)
+
+    # adjustable z-scaling, high quality visualizations>
+    if (SCREEN is False) and (FILE_TYPE == "png"):
+        if BACKGROUND:
             ax.set_facecolor("#808080")  # gray background
+
+        if difference_map:
+            plt.imshow(matrix_z, extent=[
+                di_start, di_end, di_start, di_end],
+                       origin='lower', cmap='RdBu_r', aspect='equal',
+                       interpolation='None', filternorm='False',
+                       vmin=-Z_MAX, vmax=Z_MAX, zorder=15, resample=True)
+
+        if difference_map is False:
+            plt.imshow(matrix_z, extent=[
+                di_start, di_end, di_start, di_end],
+                       origin='lower', cmap='cubehelix', aspect='equal',
+                       interpolation='None', filternorm='False',
+                       vmin=0.0, vmax=Z_MAX, zorder=15, resample=True)
+        if COLOR_BAR:
             plt.colorbar()
-            output_file = ''.join([entry[:-4], '.png'])
-            plt.savefig(output_file, dpi=150, bbox_inches='tight')
-            plt.close(fig)
+        output_file = ''.join([file_stamp, '.png'])
+        plt.savefig(output_file, dpi=300, bbox_inches='tight')
+        plt.close(fig)
 
-        # adjustable z-scaling, high quality visualizations>
-        if (SCREEN is False) and (FILE_TYPE == "png"):
-            if BACKGROUND:
-                ax.set_facecolor("#808080")  # gray background
+    if (SCREEN is False) and (FILE_TYPE == "pdf"):
+        if BACKGROUND:
+            ax.set_facecolor("#808080")  # gray background
 
-            if difference_map:
-                print("zmax: {}".format(Z_MAX))
-                plt.imshow(matrix_z, extent=[
-                    di_start, di_end, di_start, di_end],
-                           origin='lower', cmap='RdBu_r', aspect='equal',
-                           interpolation='None', filternorm='False',
-                           vmin=-Z_MAX, vmax=Z_MAX, zorder=15, resample=True)
-
-            if difference_map is False:
-                plt.imshow(matrix_z, extent=[
-                    di_start, di_end, di_start, di_end],
-                           origin='lower', cmap='cubehelix', aspect='equal',
-                           interpolation='None', filternorm='False',
-                           vmin=0.0, vmax=Z_MAX, zorder=15, resample=True)
-            if COLOR_BAR:
-                plt.colorbar()
-            output_file = ''.join([entry[:-4], '.png'])
-            plt.savefig(output_file, dpi=300, bbox_inches='tight')
-            plt.close(fig)
-
-        if (SCREEN is False) and (FILE_TYPE == "pdf"):
-            if BACKGROUND:
-                ax.set_facecolor("#808080")  # gray background
-
-            if difference_map:
-                plt.imshow(matrix_z, extent=[
-                    di_start, di_end, di_start, di_end],
-                           origin='lower', cmap='RdBu_r', aspect='equal',
-                           interpolation='None', filternorm='False',
-                           vmin=-Z_MAX, vmax=Z_MAX, zorder=15, resample=True)
-
-            if difference_map is False:
-                plt.imshow(matrix_z, extent=[
-                    di_start, di_end, di_start, di_end],
-                           origin='lower', cmap='cubehelix', aspect='equal',
-                           interpolation='None', filternorm='False',
-                           vmin=0.0, vmax=Z_MAX, zorder=15, resample=True)
-            if COLOR_BAR:
-                plt.colorbar()
-            output_file = ''.join([entry[:-4], '.pdf'])
-            plt.savefig(output_file, bbox_inches='tight')
-            plt.close(fig)
+        if difference_map:
+            plt.imshow(matrix_z, extent=[
+                di_start, di_end, di_start, di_end],
+                       origin='lower', cmap='RdBu_r', aspect='equal',
+                       interpolation='None', filternorm='False',
+                       vmin=-Z_MAX, vmax=Z_MAX, zorder=15, resample=True)
+
+        if difference_map is False:
+            plt.imshow(matrix_z, extent=[
+                di_start, di_end, di_start, di_end],
+                       origin='lower', cmap='cubehelix', aspect='equal',
+                       interpolation='None', filternorm='False',
+                       vmin=0.0, vmax=Z_MAX, zorder=15, resample=True)
+        if COLOR_BAR:
+            plt.colorbar()
+        output_file = ''.join([file_stamp, '.pdf'])
+        plt.savefig(output_file, bbox_inches='tight')
+        plt.close(fig)
+    return entry
 # End of section C, Display.
 
 
@@ -1121,6 +1731,64 @@ if __name__ == "__main__":
         Files in pattern of 'example.cxs' yield 'example.dat'.""",
         action="store_true")
 
+    parser.add_argument(
+        "--no_cache",
+        action="store_true",
+        help="""Parse each .cxs again instead of reusing the binary cache of
+        previous runs (Python path only, see surface_cache.py).""")
+
+    parser.add_argument(
+        "--grid",
+        type=float,
+        nargs=3,
+        metavar=("XMIN", "XMAX", "DX"),
+        help="""Map range and bin width in A of the fingerprints computed
+        with -n (default: 0.40 3.00 0.01, i.e. the extended range).  With
+        -N, only the standard, translated or extended range is possible.""")
+
+    parser.add_argument(
+        "--sparse",
+        help="""Write fingerprints computed with -n as sparse .sdat listing
+        only non-zero bins.  Difference maps of .sdat are .sdat, too.""",
+        dest="output_format",
+        action="store_const",
+        const="sparse",
+        default="dat")
+
+    parser.add_argument(
+        "--binary",
+        help="""Write fingerprints computed with -n as binary .fpb recording
+        the grid, total area, area method and hash of the .cxs, too.""",
+        dest="output_format",
+        action="store_const",
+        const="binary")
+
+    parser.add_argument(
+        "--decompose",
+        action="store_true",
+        help="""With -n, decompose the fingerprints by the elements closest
+        to the surface inside and outside (e.g., O...H), in the same pass.
+        The maps and a .csv of their contributions in percent are written
+        into cxs_workshop/decomposed.""")
+
+    parser.add_argument(
+        "--properties",
+        action="store_true",
+        help="""With -n, tally the surface area by d_norm, shape index and
+        curvedness in the same run, too.  The histograms (in percent of
+        the area) are written into cxs_workshop/properties.""")
+
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="""Number of .cxs processed at once with -n or -N, of
+        processes comparing fingerprints with -c, --matrix or --library
+        (of diff_finger with -C), or of maps drawn at once by gnuplot or
+        matplotlib (default: 1; 0 uses
+        all CPUs).  Reports are listed in the order of the files.""")
+
     parser.add_argument(
         "-N",
         "--normalize_f",
@@ -1134,6 +1802,68 @@ if __name__ == "__main__":
         into diff*.dat files.""",
         action="store_true")
 
+    parser.add_argument(
+        "--pair",
+        nargs=2,
+        action="append",
+        metavar=("REFERENCE", "PROBE"),
+        help="""Compute the difference map (Python) of only this pair of
+        fingerprints, e.g. --pair BZAMID01 BZAMID11.  May be repeated.""")
+
+    parser.add_argument(
+        "--matrix",
+        help="""Compute the difference numbers of all pairs of fingerprints
+        directly (Python), without difference maps.  Output is written into
+        difference_matrix.csv.""",
+        action="store_true")
+
+    parser.add_argument(
+        "--library",
+        help="""As --matrix, but for more fingerprints than fit into RAM: the
+        fingerprints are collected in the memory-mapped fingerprints.fpl and
+        compared tile by tile into difference_pairs.csv.  An interrupted run
+        resumes where it stopped.""",
+        action="store_true")
+
+    parser.add_argument(
+        "--nearest",
+        metavar="FINGERPRINT",
+        help="""List the fingerprints in the library (see --library) closest
+        to this one by difference number, e.g. --nearest new.dat.""")
+
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=5,
+        metavar="K",
+        help="Number of fingerprints listed by --nearest (default: 5).")
+
+    parser.add_argument(
+        "--region",
+        nargs=2,
+        metavar=("REFERENCE", "PROBE"),
+        help="""Report the difference number of this pair of fingerprints
+        within the standard, translated and extended map range, and within
+        each --box.""")
+
+    parser.add_argument(
+        "--box",
+        type=float,
+        nargs=4,
+        action="append",
+        metavar=("DI_MIN", "DI_MAX", "DE_MIN", "DE_MAX"),
+        help="""A region in A for --region, e.g. --box 0.9 1.3 1.2 1.6 for
+        the spike of H...O contacts.  May be repeated.""")
+
+    parser.add_argument(
+        "--rebin",
+        type=float,
+        nargs=3,
+        metavar=("XMIN", "XMAX", "FACTOR"),
+        help="""Cut existing fingerprints to XMIN...XMAX A, merge FACTOR x
+        FACTOR bins and normalize again, e.g. --rebin 0.8 3.0 2.  Output is
+        written into a sub-folder of cxs_workshop.""")
+
     parser.add_argument(
         "-C",
         "--compare_c",
@@ -1189,6 +1919,25 @@ if __name__ == "__main__":
         choices=["s", "t", "e"],
         help="Difference maps of either map range as .pdf.")
 
+    parser.add_argument(
+        "--raster",
+        action="store_true",
+        help="""Draw the preview maps of -o with the built-in renderer
+        instead of gnuplot; no external program is needed.""")
+
+    parser.add_argument(
+        "--montage",
+        action="store_true",
+        help="""Lay out all fingerprints as captioned tiles of a few large
+        .png (montage_fingerprints_*.png), by the built-in renderer.""")
+
+    parser.add_argument(
+        "--montage_matrix",
+        action="store_true",
+        help="""As --montage, and lay out the difference maps of all pairs
+        as the pair matrix (montage_differences_*.png), computed in
+        memory.""")
+
     parser.add_argument(
         "-O",
         "--overview_py",
@@ -1246,6 +1995,13 @@ if __name__ == "__main__":
         action="store_true",
         help="Use the alternate palette definitions.")
 
+    parser.add_argument(
+        "--rerender",
+        action="store_true",
+        help="""Draw all maps again.  By default, a map is skipped if its
+        data and plot parameters did not change since its image was drawn
+        (see cxs_workshop/render_manifest.json).""")
+
     parser.add_argument(
         "-b",
         "--color_bar",
@@ -1262,28 +2018,50 @@ if __name__ == "__main__":
         assemble_cxs()  # copy .cxs into one place
         rename_cxs()  # truncate file names at underscore sign
     if args.normalize_py:  # fingerprint generation, Python
-        fingerprint_python()
+        fingerprint_python(USE_CACHE=not args.no_cache, GRID=args.grid,
+                           OUTPUT_FORMAT=args.output_format, JOBS=args.jobs,
+                           DECOMPOSE=args.decompose,
+                           PROPERTIES=args.properties)
     if args.normalize_f:  # fingerprint generation, Fortran
+        MAP_RANGE = fortran_range(args.grid)
         compile_f90()
         shuttle_f90()
-        fingerprint_fortran()
-    if args.compare_py:  # difference map generation, Python
-        difference_maps_python()
+        fingerprint_fortran(MAP_RANGE, JOBS=args.jobs)
+    if args.rebin:  # other map ranges or bin widths, from fingerprints
+        rebin_python(*args.rebin)
+    if args.compare_py or args.pair:  # difference map generation, Python
+        difference_maps_python(PAIRS=args.pair, JOBS=args.jobs)
+    if args.matrix:  # matrix of difference numbers, Python
+        difference_matrix_python(JOBS=args.jobs)
+    if args.library:  # difference numbers, out of core
+        difference_library_python(JOBS=args.jobs)
+    if args.region:  # difference numbers within regions
+        region_python(args.region, BOXES=args.box)
+    if args.nearest:  # nearest neighbours in the library
+        nearest_python(args.nearest, TOP=args.top)
     if args.compare_c:  # difference map generation, C
         compile_c()
         shuttle_c()
-        difference_maps_c()
+        difference_maps_c(JOBS=args.jobs)
     if args.ruby_number_py:  # difference number by Python
         difference_number_python()
     if args.ruby_number_r:  # difference number by the ruby script
         shuttle_ruby_script()
         difference_number_ruby()
-    if args.overview:  # quick survey with gnuplot
+    if args.overview and args.raster:  # quick survey without gnuplot
+        search_dat(SCREEN=True)
+        raster_map(ALT_MAP=args.alternate, BACKGROUND=args.bg,
+                   RERENDER=args.rerender)
+    elif args.overview:  # quick survey with gnuplot
         search_dat(SCREEN=True)
-        png_map(SCREEN=True)
+        png_map(SCREEN=True, JOBS=args.jobs, RERENDER=args.rerender)
+    if args.montage or args.montage_matrix:  # contact sheets
+        montage_map(MATRIX=args.montage_matrix, Z_MAX=args.zmax,
+                    ALT_MAP=args.alternate, BACKGROUND=args.bg)
     if args.overview_py:  # quick survey by matplotlib
         search_dat(SCREEN=True)
-        plot_matplotlib(SCREEN=True)
+        plot_matplotlib(SCREEN=True, JOBS=args.jobs,
+                        RERENDER=args.rerender)
     if args.bg:
         BACKGROUND = True  # an option: a neutral gray background
     if args.color_bar:
@@ -1309,7 +2087,8 @@ if __name__ == "__main__":
         ALT_MAP = args.alternate
         BACKGROUND = args.bg
         search_dat(map_type="fingerprint")
-        png_map(X_MIN, X_MAX, Z_MAX, SCREEN, ALT_MAP, BACKGROUND)
+        png_map(X_MIN, X_MAX, Z_MAX, SCREEN, ALT_MAP, BACKGROUND,
+                JOBS=args.jobs, RERENDER=args.rerender)
 
     if args.fpdf in ["s", "t", "e"]:  # fingerprints, gnuplot, .pdf.
         if args.fpdf == "s":
@@ -1325,7 +2104,8 @@ if __name__ == "__main__":
         ALT_MAP = args.alternate
         BACKGROUND = args.bg
         search_dat(map_type="fingerprint")
-        pdf_map(X_MIN, X_MAX, Z_MAX, ALT_MAP, BACKGROUND)
+        pdf_map(X_MIN, X_MAX, Z_MAX, ALT_MAP, BACKGROUND, JOBS=args.jobs,
+                RERENDER=args.rerender)
 
     if args.dpng in ["s", "t", "e"]:  # difference maps, gnuplot, .png.
         if args.dpng == "s":
@@ -1342,7 +2122,8 @@ if __name__ == "__main__":
         ALT_MAP = args.alternate
         BACKGROUND = args.bg
         search_dat(map_type="delta")
-        png_map(X_MIN, X_MAX, Z_MAX, SCREEN, ALT_MAP, BACKGROUND)
+        png_map(X_MIN, X_MAX, Z_MAX, SCREEN, ALT_MAP, BACKGROUND,
+                JOBS=args.jobs, RERENDER=args.rerender)
 
     if args.dpdf in ["s", "t", "e"]:  # difference maps, gnuplot, .pdf.
         if args.dpdf == "s":
@@ -1358,7 +2139,8 @@ if __name__ == "__main__":
         ALT_MAP = args.alternate
         BACKGROUND = args.bg
         search_dat(map_type="delta")
-        pdf_map(X_MIN, X_MAX, Z_MAX, ALT_MAP, BACKGROUND)
+        pdf_map(X_MIN, X_MAX, Z_MAX, ALT_MAP, BACKGROUND, JOBS=args.jobs,
+                RERENDER=args.rerender)
 
     if args.Fpng in ["s", "t", "e"]:  # fingerprint, Python, .png.
         search_dat(map_type="fingerprint")
@@ -1377,7 +2159,7 @@ if __name__ == "__main__":
         COLOR_BAR = args.color_bar
         FILE_TYPE = "png"
         plot_matplotlib(MAP_RANGE, Z_MAX, SCREEN, BACKGROUND, COLOR_BAR,
-                        FILE_TYPE)
+                        FILE_TYPE, JOBS=args.jobs, RERENDER=args.rerender)
 
     if args.Dpng in ["s", "t", "e"]:  # difference maps, Python, .png.
         search_dat(map_type="delta")
@@ -1396,7 +2178,7 @@ if __name__ == "__main__":
         COLOR_BAR = args.color_bar
         FILE_TYPE = "png"
         plot_matplotlib(MAP_RANGE, Z_MAX, SCREEN, BACKGROUND, COLOR_BAR,
-                        FILE_TYPE)
+                        FILE_TYPE, JOBS=args.jobs, RERENDER=args.rerender)
 
     if args.Fpdf in ["s", "t", "e"]:  # fingerprints, Python, pdf.
         search_dat(map_type="fingerprint")
@@ -1415,7 +2197,7 @@ if __name__ == "__main__":
         COLOR_BAR = args.color_bar
         FILE_TYPE = "pdf"
         plot_matplotlib(MAP_RANGE, Z_MAX, SCREEN, BACKGROUND, COLOR_BAR,
-                        FILE_TYPE)
+                        FILE_TYPE, JOBS=args.jobs, RERENDER=args.rerender)
 
     if args.Dpdf in ["s", "t", "e"]:  # difference maps, Python, pdf.
         search_dat(map_type="delta")
@@ -1434,5 +2216,5 @@ if __name__ == "__main__":
         COLOR_BAR = args.color_bar
         FILE_TYPE = "pdf"
         plot_matplotlib(MAP_RANGE, Z_MAX, SCREEN, BACKGROUND, COLOR_BAR,
-                        FILE_TYPE)
+                        FILE_TYPE, JOBS=args.jobs, RERENDER=args.rerender)
  
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# name:    render_cache.py
+# author:  nbehrnd@yahoo.com
+# license: GPL version 2
+# date:    2026-10-16 (YYYY-MM-DD)
+#
+""" Remember which images were rendered from which data, and how.
+
+Rendering a high resolution map takes seconds; the moderator however draws
+all maps in 'cxs_workshop' on each call of --fpng, --dpng, --Fpdf, etc.
+Trying an other zmax for one difference map thus re-renders hundreds of
+unchanged others.  Instead, a manifest next to the images records per image
+the SHA-256 hash of the map it was drawn from, and the full set of plot
+parameters (renderer, map range, zmax, palette, background, ...).  A map is
+rendered again only if its image is missing, its data changed, or it is to
+be drawn with other parameters; e.g.
+
+cache = RenderCache()
+todo = [entry for entry in register if cache.stale(entry, image, params)]
+... render todo ...
+cache.record(entry, image, params) per map rendered
+cache.save()
+
+As in surface_cache.py, a map is hashed only if its size or modification
+time differ from the ones known (see file_digest.py).  Increment
+RENDER_VERSION once the looks of the maps change (e.g., a new palette) to
+render all of them again.
+
+This module only uses Python's standard library. """
+
+import json
+import os
+
+from file_digest import content_hash, stamp
+
+RENDER_VERSION = 1
+MANIFEST = "render_manifest.json"
+
+
+class RenderCache():
+    """ A manifest of the images in a folder and what they show. """
+
+    def __init__(self, folder=".", manifest=MANIFEST):
+        """ Read the manifest of a folder, if any. """
+        self.folder = folder
+        self.path = os.path.join(folder, manifest)
+        self.hashes = {}  # map: [size, mtime, hash]
+        self.images = {}  # image: {"data": hash, "parameters": ...}
+        try:
+            with open(self.path, mode="r") as source:
+                content = json.load(source)
+            if content.get("version") == RENDER_VERSION:
+                self.hashes = content["hashes"]
+                self.images = content["images"]
+        except (IOError, OSError, ValueError, KeyError, AttributeError):
+            self.hashes, self.images = {}, {}
+
+    def _hash(self, file_name):
+        """ Identify a map by its content; hash only if necessary. """
+        path = os.path.join(self.folder, file_name)
+        current = stamp(path)
+        known = self.hashes.get(file_name)
+        if known is not None and known[:2] == current:
+            return known[2]
+
+        digest = content_hash(path)
+        self.hashes[file_name] = current + [digest]
+        return digest
+
+    @staticmethod
+    def _parameters(parameters):
+        """ Normalize the parameters, as they are compared after json. """
+        return json.loads(json.dumps(parameters, sort_keys=True))
+
+    def stale(self, file_name, image, parameters):
+        """ Check if an image of a map needs to be rendered (again). """
+        if not os.path.isfile(os.path.join(self.folder, image)):
+            return True
+        known = self.images.get(image)
+        if known is None:
+            return True
+        return (known["data"] != self._hash(file_name)) or (
+            known["parameters"] != self._parameters(parameters))
+
+    def record(self, file_name, image, parameters):
+        """ Note an image as rendered from a map with these parameters. """
+        self.images[image] = {
+            "data": self._hash(file_name),
+            "parameters": self._parameters(parameters)
+        }
+
+    def save(self):
+        """ Replace the manifest on disk in one step. """
+        temporary = "{}.{}".format(self.path, os.getpid())
+        with open(temporary, mode="w") as newfile:
+            json.dump({"version": RENDER_VERSION,
+                       "hashes": self.hashes,
+                       "images": self.images}, newfile, indent=1,
+                      sort_keys=True)
+        os.replace(temporary, self.path)
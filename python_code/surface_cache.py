@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+# name:    surface_cache.py
+# author:  nbehrnd@yahoo.com
+# license: GPL version 2
+# date:    2026-10-16 (YYYY-MM-DD)
+#
+""" Persistent binary cache of the sections parsed from .cxs files.
+
+Converting the text of a .cxs file into numbers is the most expensive step
+of reading it.  Once parsed, the typed arrays (vertices, indices, d_i, d_e,
+and any other section requested by cxs_reader.py) are written into one
+compact binary file per surface.  Later runs -- e.g., with a different map
+range or grid -- load these arrays directly instead of parsing the text
+again.
+
+A surface is identified by the SHA-256 hash of its content; thus an
+unchanged copy of a .cxs in a new 'cxs_workshop' still is recognized.  To
+avoid hashing files of several MB on each run, a small manifest remembers
+the hash of a file per path, file size and modification time.  If the
+cached files exceed a size limit, the least recently used entries are
+removed first, together with the lines of the manifest pointing to them.
+
+Several processes (e.g., fingerprint_kahan.py with a pool of processes)
+may share the cache.  Thus, the manifest is changed only while holding a
+lock file; each process merges the entries it adds into the manifest
+found on disk rather than to overwrite it with the one it read at start.
+
+By default, the cache resides in ~/.cache/hirshfeld_surfaces; the
+environment variable HIRSHFELD_CACHE may point to an other folder.  As all
+other scripts of the Python-only approach, this module only uses Python's
+standard library. """
+
+import array
+import contextlib
+import json
+import os
+import struct
+import sys
+import time
+
+import cxs_reader
+from file_digest import content_hash, stamp
+
+CACHE_VERSION = 1
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # i.e., about 100 surfaces.
+MANIFEST = "manifest.json"
+LOCK = "manifest.lock"
+LOCK_STALE = 60.0  # seconds after which a lock left behind is broken
+
+# magic, version, byte order (0: little, 1: big), number of sections:
+HEADER = struct.Struct("<4sHBB")
+# section name, typecode, item size, number of items:
+SECTION_HEADER = struct.Struct("<32scBQ")
+
+
+def default_folder():
+    """ Report the folder of the cache, respecting HIRSHFELD_CACHE. """
+    folder = os.environ.get("HIRSHFELD_CACHE")
+    if folder:
+        return folder
+    return os.path.join(os.path.expanduser("~"), ".cache",
+                        "hirshfeld_surfaces")
+
+
+class SurfaceCache():
+    """ Store and retrieve the parsed sections of .cxs files. """
+
+    def __init__(self, folder=None, max_bytes=DEFAULT_MAX_BYTES):
+        """ Open (and if necessary create) the cache folder. """
+        self.folder = folder or default_folder()
+        self.max_bytes = max_bytes
+        if not os.path.isdir(self.folder):
+            os.makedirs(self.folder, exist_ok=True)
+        self.manifest = self._read_manifest()
+
+    def _read_manifest(self):
+        """ Report the manifest on disk, or an empty one. """
+        try:
+            with open(os.path.join(self.folder, MANIFEST), mode="r") as source:
+                manifest = json.load(source)
+        except (IOError, OSError, ValueError):
+            return {}
+        return manifest if isinstance(manifest, dict) else {}
+
+    @contextlib.contextmanager
+    def _lock(self):
+        """ Hold the lock of the manifest; break it if left behind. """
+        path = os.path.join(self.folder, LOCK)
+        while True:
+            try:
+                handle = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(path) > LOCK_STALE:
+                        os.remove(path)
+                        continue
+                except OSError:
+                    continue  # released meanwhile
+                time.sleep(0.01)
+        try:
+            yield
+        finally:
+            os.close(handle)
+            os.remove(path)
+
+    def _key(self, cxs_file):
+        """ Identify a .cxs by its content hash; hash only if necessary. """
+        path = os.path.abspath(cxs_file)
+        current = stamp(path)
+        known = self.manifest.get(path)
+        if known is not None and known[:2] == current:
+            return known[2]
+
+        digest = content_hash(path)
+        self._update_manifest({path: current + [digest]})
+        return digest
+
+    def _update_manifest(self, added=None, evicted=()):
+        """ Merge entries into the manifest on disk, drop evicted hashes.
+
+        While the lock is held, the manifest is read again, changed and
+        replaced in one step; entries other processes added meanwhile
+        are retained. """
+        target = os.path.join(self.folder, MANIFEST)
+        temporary = "{}.{}".format(target, os.getpid())
+        with self._lock():
+            manifest = self._read_manifest()
+            manifest.update(added or {})
+            if evicted:
+                manifest = dict((path, known)
+                                for path, known in manifest.items()
+                                if known[2] not in evicted)
+            with open(temporary, mode="w") as newfile:
+                json.dump(manifest, newfile)
+            os.replace(temporary, target)
+        self.manifest = manifest
+
+    def _entry(self, digest):
+        return os.path.join(self.folder, "{}.surf".format(digest))
+
+    def _read_entry(self, digest):
+        """ Return the sections stored for a hash, or an empty dict. """
+        surface = {}
+        try:
+            with open(self._entry(digest), mode="rb") as source:
+                magic, version, big_endian, sections = HEADER.unpack(
+                    source.read(HEADER.size))
+                if (magic != b"HSCX") or (version != CACHE_VERSION) or (
+                        big_endian != (sys.byteorder == "big")):
+                    return {}
+                for _ in range(sections):
+                    name, typecode, itemsize, count = SECTION_HEADER.unpack(
+                        source.read(SECTION_HEADER.size))
+                    values = array.array(typecode.decode())
+                    if values.itemsize != itemsize:
+                        return {}
+                    values.fromfile(source, count)
+                    surface[name.rstrip(b"\0").decode()] = values
+        except (IOError, OSError, EOFError, struct.error, ValueError):
+            return {}
+        return surface
+
+    def load(self, cxs_file, sections=cxs_reader.FINGERPRINT_SECTIONS):
+        """ Return the cached sections of a .cxs, or None if incomplete. """
+        digest = self._key(cxs_file)
+        surface = self._read_entry(digest)
+        if not all(name in surface for name in sections):
+            return None
+        os.utime(self._entry(digest), None)  # mark as recently used
+        return dict((name, surface[name]) for name in sections)
+
+    def store(self, cxs_file, surface):
+        """ Add sections of a .cxs to the cache, retain those known. """
+        digest = self._key(cxs_file)
+        merged = self._read_entry(digest)
+        merged.update(surface)
+
+        target = self._entry(digest)
+        temporary = "{}.{}".format(target, os.getpid())
+        with open(temporary, mode="wb") as newfile:
+            newfile.write(
+                HEADER.pack(b"HSCX", CACHE_VERSION, sys.byteorder == "big",
+                            len(merged)))
+            for name in sorted(merged):
+                values = merged[name]
+                newfile.write(
+                    SECTION_HEADER.pack(name.encode(),
+                                        values.typecode.encode(),
+                                        values.itemsize, len(values)))
+                values.tofile(newfile)
+        os.replace(temporary, target)
+        self.evict()
+
+    def evict(self):
+        """ Remove the least recently used entries beyond the size limit. """
+        entries = []
+        for file in os.listdir(self.folder):
+            if file.endswith(".surf"):
+                path = os.path.join(self.folder, file)
+                status = os.stat(path)
+                entries.append((status.st_mtime, status.st_size, path))
+        entries.sort()
+
+        total = sum(entry[1] for entry in entries)
+        evicted = set()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted.add(os.path.basename(path)[:-len(".surf")])
+        if evicted:
+            self._update_manifest(evicted=evicted)
+
+
+def read_surface(cxs_file, sections=cxs_reader.FINGERPRINT_SECTIONS,
+                 cache=None):
+    """ Read sections of a .cxs, preferably from the cache.
+
+    Without a cache instance, this equates to cxs_reader.read_cxs. """
+    if cache is None:
+        return cxs_reader.read_cxs(cxs_file, sections)
+
+    surface = cache.load(cxs_file, sections)
+    if surface is None:
+        surface = cxs_reader.read_cxs(cxs_file, sections)
+        cache.store(cxs_file, surface)
+    return surface
@@ -0,0 +1,17 @@
+#!/usr/bin/env python
+# name:    conftest.py
+# author:  nbehrnd@yahoo.com
+# license: GPL version 2
+# date:    2026-10-16 (YYYY-MM-DD)
+#
+""" Make the scripts of the Python-only approach importable by pytest.
+
+The tests are unittest test cases; from folder python_code, run them by
+either 'python -m pytest tests', or 'python -m unittest discover tests'.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
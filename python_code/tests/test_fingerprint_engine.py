@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# name:    test_fingerprint_engine.py
+# author:  nbehrnd@yahoo.com
+# license: GPL version 2
+# date:    2026-10-16 (YYYY-MM-DD)
+#
+""" Crop and rebin of fine maps against maps binned natively. """
+
+import random
+import unittest
+
+import fingerprint_engine
+
+FINE = fingerprint_engine.Grid(0.40, 1.00, 0.01)
+
+
+def synthetic_triangles(count=2000, seed=3):
+    """ Averages of d_i and d_e and areas of triangles on the fine grid.
+
+    Each average is close to a fine bin (within 0.002 A), thus never on
+    the border of a fine, nor of a coarse bin of five times the width. """
+    generator = random.Random(seed)
+
+    def coordinate():
+        return (FINE.xmin + FINE.dx * generator.randrange(FINE.nbin) +
+                generator.uniform(-0.002, 0.002))
+
+    average_di = [coordinate() for _ in range(count)]
+    average_de = [coordinate() for _ in range(count)]
+    areas = [generator.uniform(0.001, 0.01) for _ in range(count)]
+    return average_di, average_de, areas
+
+
+class CropRebin(unittest.TestCase):
+    """ Maps derived from a fine map equal those binned on their grid. """
+
+    def setUp(self):
+        self.triangles = synthetic_triangles()
+        self.fine = fingerprint_engine.bin_areas(*self.triangles, grid=FINE)
+
+    def check(self, grid, values, expected_grid):
+        expected = fingerprint_engine.bin_areas(*self.triangles,
+                                                grid=expected_grid)
+        self.assertEqual(grid, expected_grid)
+        self.assertEqual(len(values), len(expected))
+        for derived, native in zip(values, expected):
+            self.assertAlmostEqual(derived, native, places=12)
+
+    def test_all_binned(self):
+        self.assertAlmostEqual(sum(self.fine), sum(self.triangles[2]),
+                               places=10)
+
+    def test_crop(self):
+        grid, values = fingerprint_engine.crop(self.fine, FINE, 0.60, 0.90)
+        self.check(grid, values, fingerprint_engine.Grid(0.60, 0.90, 0.01))
+
+    def test_crop_outside(self):
+        with self.assertRaises(ValueError):
+            fingerprint_engine.crop(self.fine, FINE, 1.50, 2.00)
+
+    def test_rebin(self):
+        grid, values = fingerprint_engine.rebin(self.fine, FINE, 5, 0.50,
+                                                0.90)
+        self.check(grid, values, fingerprint_engine.Grid(0.50, 0.90, 0.05))
+
+    def test_rebin_normalized(self):
+        grid, values = fingerprint_engine.rebin(self.fine, FINE, 5, 0.50,
+                                                0.90)
+        normalized = fingerprint_engine.normalize(values)
+        self.assertAlmostEqual(sum(normalized), 100.0, places=10)
+
+    def test_rebin_identity(self):
+        grid, values = fingerprint_engine.rebin(self.fine, FINE, 1)
+        self.assertEqual(grid, FINE)
+        self.assertEqual(list(values), list(self.fine))
+
+    def test_rebin_off_grid(self):
+        with self.assertRaises(ValueError):
+            fingerprint_engine.rebin(self.fine, FINE, 5, 0.505, 0.90)
+
+
+if __name__ == "__main__":
+    unittest.main()
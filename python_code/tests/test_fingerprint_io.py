@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# name:    test_fingerprint_io.py
+# author:  nbehrnd@yahoo.com
+# license: GPL version 2
+# date:    2026-10-16 (YYYY-MM-DD)
+#
+""" Round trips of maps through the .dat, .sdat and .fpb formats. """
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+import fingerprint_engine
+import fingerprint_io
+
+
+def synthetic_map(grid, seed, share=0.2):
+    """ A map of a few populated bins, values at 8 decimals as written. """
+    generator = random.Random(seed)
+    return [
+        round(generator.random() * 0.01, 8)
+        if generator.random() < share else 0.0
+        for _ in range(grid.nbin * grid.nbin)
+    ]
+
+
+class RoundTrip(unittest.TestCase):
+    """ Maps written and read again keep their grid and values. """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.grid = fingerprint_engine.Grid(0.40, 1.00, 0.01)
+        self.values = synthetic_map(self.grid, seed=1)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def path(self, name):
+        return os.path.join(self.folder, name)
+
+    def check(self, grid, values):
+        self.assertEqual(grid, self.grid)
+        self.assertEqual(len(values), len(self.values))
+        for read, written in zip(values, self.values):
+            self.assertAlmostEqual(read, written, places=8)
+
+    def test_dat(self):
+        file_name = self.path("map.dat")
+        fingerprint_io.write_dat(file_name, self.grid, self.values)
+        self.check(*fingerprint_io.read_dense(file_name))
+        self.assertEqual(fingerprint_io.read_grid(file_name), self.grid)
+
+    def test_dat_custom_grid(self):
+        self.grid = fingerprint_engine.Grid(0.80, 2.00, 0.05)
+        self.values = synthetic_map(self.grid, seed=2)
+        file_name = self.path("map.dat")
+        fingerprint_io.write_dat(file_name, self.grid, self.values)
+        self.check(*fingerprint_io.read_dense(file_name))
+
+    def test_sparse(self):
+        file_name = self.path("map.sdat")
+        sparse = fingerprint_io.SparseMap.from_dense(self.grid, self.values)
+        fingerprint_io.write_sparse(file_name, sparse)
+        with open(file_name, mode="r") as source:
+            lines = source.read().splitlines()
+        self.assertEqual(len(lines), 1 + len(sparse.bins))
+
+        read = fingerprint_io.read_sparse(file_name)
+        self.assertEqual(sorted(read.bins), sorted(sparse.bins))
+        self.check(read.grid, read.to_dense())
+        self.check(*fingerprint_io.read_dense(file_name))
+        self.assertEqual(fingerprint_io.read_grid(file_name), self.grid)
+
+    def test_binary(self):
+        file_name = self.path("map.fpb")
+        digest = "ab" * 32
+        fingerprint_io.write_binary(file_name, self.grid, self.values,
+                                    total_area=123.5, area_method="kahan",
+                                    source_hash=digest)
+        grid, values, metadata = fingerprint_io.read_binary(file_name)
+        self.assertEqual(grid, self.grid)
+        self.assertEqual(list(values), self.values)  # bit for bit
+        self.assertEqual(metadata["total_area"], 123.5)
+        self.assertEqual(metadata["area_method"], "kahan")
+        self.assertEqual(metadata["source_hash"], digest)
+        self.assertEqual(metadata["map_range"], "custom")
+        self.assertEqual(fingerprint_io.read_grid(file_name), self.grid)
+
+        _, pyramid = fingerprint_io.read_pyramid(file_name)
+        expected = fingerprint_engine.pyramid(values, grid.nbin)
+        self.assertEqual([(list(level), nbin) for level, nbin in pyramid],
+                         [(list(level), nbin) for level, nbin in expected])
+
+    def test_binary_map_range(self):
+        grid = fingerprint_engine.MAP_RANGES["standard"]
+        file_name = self.path("map.fpb")
+        fingerprint_io.write_binary(file_name, grid,
+                                    [0.0] * (grid.nbin * grid.nbin))
+        _, _, metadata = fingerprint_io.read_binary(file_name)
+        self.assertEqual(metadata["map_range"], "standard")
+
+    def test_formats_agree(self):
+        names = [self.path("map" + suffix)
+                 for suffix in fingerprint_io.MAP_SUFFIXES]
+        fingerprint_io.write_binary(names[0], self.grid, self.values)
+        fingerprint_io.write_sparse(
+            names[1], fingerprint_io.SparseMap.from_dense(self.grid,
+                                                          self.values))
+        fingerprint_io.write_dat(names[2], self.grid, self.values)
+        for file_name in names:
+            self.check(*fingerprint_io.read_dense(file_name))
+
+
+if __name__ == "__main__":
+    unittest.main()
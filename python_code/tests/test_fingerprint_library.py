@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# name:    test_fingerprint_library.py
+# author:  nbehrnd@yahoo.com
+# license: GPL version 2
+# date:    2026-10-16 (YYYY-MM-DD)
+#
+""" Difference numbers of a library, complete and resumed. """
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+import fingerprint_engine
+import fingerprint_io
+import fingerprint_library
+import fingerprint_search
+
+GRID = fingerprint_engine.Grid(0.40, 1.00, 0.02)
+COUNT = 7
+TILE = 3  # i.e., 6 tiles
+
+
+def read_rows(output):
+    """ Collect the rows of a .csv of difference numbers, no comments. """
+    with open(output, mode="r") as source:
+        lines = source.read().splitlines()
+    return [line for line in lines[1:] if not line.startswith("#")]
+
+
+class Resume(unittest.TestCase):
+    """ An interrupted run completes to the result of an uninterrupted. """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        generator = random.Random(5)
+        self.maps = []
+        names = []
+        for k in range(COUNT):
+            values = [generator.random() if generator.random() < 0.3 else 0.0
+                      for _ in range(GRID.nbin * GRID.nbin)]
+            names.append(os.path.join(self.folder, "map{}.fpb".format(k)))
+            fingerprint_io.write_binary(names[-1], GRID, values)
+            self.maps.append(values)
+        self.library = os.path.join(self.folder, "maps.fpl")
+        fingerprint_library.build_library(self.library, names)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def compute(self, output):
+        return fingerprint_library.difference_numbers(self.library, output,
+                                                      tile=TILE)
+
+    def test_complete(self):
+        output = os.path.join(self.folder, "pairs.csv")
+        self.assertEqual(self.compute(output), 6)
+        rows = read_rows(output)
+        self.assertEqual(len(rows), COUNT * (COUNT - 1) // 2)
+        for row in rows:
+            reference, probe, number = row.split(",")
+            i = int(os.path.basename(reference)[3:])
+            j = int(os.path.basename(probe)[3:])
+            self.assertLess(i, j)
+            self.assertAlmostEqual(
+                float(number),
+                fingerprint_search.distance(self.maps[i], self.maps[j]),
+                places=4)
+
+    def test_resume(self):
+        complete = os.path.join(self.folder, "complete.csv")
+        self.compute(complete)
+        with open(complete, mode="r") as source:
+            lines = source.read().splitlines(True)
+
+        # interrupt after the second tile, within the rows of the third:
+        tile_lines = [position for position, line in enumerate(lines)
+                      if line.startswith("# tile")]
+        partial = os.path.join(self.folder, "partial.csv")
+        with open(partial, mode="w") as newfile:
+            newfile.write("".join(lines[:tile_lines[1] + 2]))
+            newfile.write(lines[tile_lines[1] + 2][:5])  # a torn line
+
+        self.assertEqual(len(fingerprint_library.completed_tiles(partial)),
+                         2)
+        self.assertEqual(self.compute(partial), 4)
+        self.assertEqual(sorted(read_rows(partial)),
+                         sorted(read_rows(complete)))
+        self.assertEqual(self.compute(partial), 0)  # nothing left to do
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# name:    test_fingerprint_regions.py
+# author:  nbehrnd@yahoo.com
+# license: GPL version 2
+# date:    2026-10-16 (YYYY-MM-DD)
+#
+""" Region sums by summed-area tables against summing up the bins. """
+
+import random
+import unittest
+
+import fingerprint_engine
+import fingerprint_regions
+
+GRID = fingerprint_engine.EXTENDED
+
+
+def direct_sums(values, grid, di_min, di_max, de_min, de_max):
+    """ Sum up the bins whose labels are within the region, one by one. """
+    signed = absolute = 0.0
+    coordinates = [float(label) for label in grid.labels()]
+    for idi, di in enumerate(coordinates):
+        if not di_min - 1e-9 <= di <= di_max + 1e-9:
+            continue
+        for ide, de in enumerate(coordinates):
+            if de_min - 1e-9 <= de <= de_max + 1e-9:
+                value = values[idi * grid.nbin + ide]
+                signed += value
+                absolute += abs(value)
+    return signed, absolute
+
+
+class Regions(unittest.TestCase):
+    """ Each query of a RegionTable equals the sum over its bins. """
+
+    @classmethod
+    def setUpClass(cls):
+        generator = random.Random(11)
+        cls.values = [
+            generator.uniform(-0.01, 0.01) if generator.random() < 0.2
+            else 0.0 for _ in range(GRID.nbin * GRID.nbin)
+        ]
+        cls.table = fingerprint_regions.RegionTable(GRID, cls.values)
+
+    def check(self, computed, expected):
+        for found, direct in zip(computed, expected):
+            self.assertAlmostEqual(found, direct, places=9)
+
+    def test_windows(self):
+        for name, (lower, upper) in fingerprint_regions.WINDOWS.items():
+            self.check(self.table.window(name),
+                       direct_sums(self.values, GRID, lower, upper, lower,
+                                   upper))
+
+    def test_boxes(self):
+        boxes = [
+            (0.90, 1.30, 1.20, 1.60),  # on labels
+            (0.905, 1.297, 1.2, 1.61),  # between labels
+            (1.00, 1.00, 2.00, 2.00),  # a single bin
+            (0.10, 0.50, 2.90, 3.50),  # clipped to the grid
+        ]
+        generator = random.Random(13)
+        for _ in range(20):
+            di = sorted(generator.uniform(0.3, 3.1) for _ in range(2))
+            de = sorted(generator.uniform(0.3, 3.1) for _ in range(2))
+            boxes.append((di[0], di[1], de[0], de[1]))
+        for box in boxes:
+            self.check(self.table.query(*box),
+                       direct_sums(self.values, GRID, *box))
+
+    def test_empty(self):
+        self.assertEqual(self.table.query(1.50, 1.20, 0.90, 1.30),
+                         (0.0, 0.0))
+        self.assertEqual(self.table.query(3.20, 3.50), (0.0, 0.0))
+
+    def test_square(self):
+        self.assertEqual(self.table.query(0.9, 1.3),
+                         self.table.query(0.9, 1.3, 0.9, 1.3))
+
+
+if __name__ == "__main__":
+    unittest.main()
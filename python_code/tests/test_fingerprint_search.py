@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# name:    test_fingerprint_search.py
+# author:  nbehrnd@yahoo.com
+# license: GPL version 2
+# date:    2026-10-16 (YYYY-MM-DD)
+#
+""" The pruned top-k search against comparing the query with each map. """
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+import fingerprint_engine
+import fingerprint_io
+import fingerprint_library
+import fingerprint_search
+
+GRID = fingerprint_engine.Grid(0.40, 1.00, 0.01)
+COUNT = 40
+
+
+class Nearest(unittest.TestCase):
+    """ The search is exact, though it compares fewer maps in full. """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.generator = random.Random(7)
+        size = GRID.nbin * GRID.nbin
+
+        # a few families of similar maps, as of polymorphs:
+        bases = [self.random_map(size) for _ in range(4)]
+        self.maps = []
+        names = []
+        for k in range(COUNT):
+            values = [value * self.generator.uniform(0.8, 1.2)
+                      for value in bases[k % len(bases)]]
+            names.append(os.path.join(self.folder, "map{}.fpb".format(k)))
+            fingerprint_io.write_binary(names[-1], GRID, values)
+            self.maps.append(list(fingerprint_io.read_dense(names[-1])[1]))
+        self.names = names
+        self.library = os.path.join(self.folder, "maps.fpl")
+        fingerprint_library.build_library(self.library, names)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def random_map(self, size):
+        return [self.generator.random() if self.generator.random() < 0.1
+                else 0.0 for _ in range(size)]
+
+    def brute_force(self, query, top):
+        numbers = sorted(
+            (fingerprint_search.distance(query, values), name)
+            for values, name in zip(self.maps, self.names))
+        return numbers[:top]
+
+    def check(self, index, query, top):
+        found, compared = index.nearest(query, top)
+        expected = self.brute_force(query, top)
+        self.assertEqual([name for _, name in found],
+                         [name for _, name in expected])
+        for (number, _), (expected_number, _) in zip(found, expected):
+            self.assertAlmostEqual(number, expected_number, places=9)
+        self.assertLessEqual(compared, COUNT)
+        return compared
+
+    def test_members(self):
+        with fingerprint_search.Index(self.library) as index:
+            for k in (0, 5, 13, 39):
+                for top in (1, 5):
+                    self.check(index, self.maps[k], top)
+
+    def test_perturbed(self):
+        with fingerprint_search.Index(self.library) as index:
+            for k in (2, 21):
+                query = [value * self.generator.uniform(0.95, 1.05)
+                         for value in self.maps[k]]
+                self.check(index, query, 3)
+
+    def test_unrelated(self):
+        size = GRID.nbin * GRID.nbin
+        with fingerprint_search.Index(self.library) as index:
+            for _ in range(3):
+                self.check(index, self.random_map(size), 5)
+
+    def test_all(self):
+        with fingerprint_search.Index(self.library) as index:
+            self.check(index, self.maps[3], COUNT)
+
+    def test_query_file(self):
+        found, _ = fingerprint_search.nearest(self.library, self.names[6], 1)
+        self.assertEqual(found[0][1], self.names[6])
+        self.assertEqual(found[0][0], 0.0)
+
+    def test_other_grid(self):
+        with fingerprint_search.Index(self.library) as index:
+            with self.assertRaises(ValueError):
+                index.nearest([0.0] * 10, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()